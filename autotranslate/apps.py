@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.core.signals import setting_changed
+
+
+def settings_changed(setting, **kwargs):
+    if setting.startswith('AUTOTRANSLATE_') or setting == 'GOOGLE_TRANSLATE_KEY':
+        from autotranslate.utils import reset_translators
+        reset_translators()
 
 
 class AutoTranslateConfig(AppConfig):
     name = 'autotranslate'
+
+    def ready(self):
+        setting_changed.connect(settings_changed, dispatch_uid='autotranslate.settings_changed')
+
+        from django.conf import settings
+        if getattr(settings, 'AUTOTRANSLATE_RUNTIME', False):
+            from autotranslate.runtime import install, is_runtime_process
+            if is_runtime_process():
+                install()
@@ -0,0 +1,50 @@
+"""
+Packs the strings to translate into requests that respect the limits of a translator service.
+"""
+
+
+def iter_batches(strings, max_segments=None, max_characters=None, max_bytes=None):
+    """
+    Yields lists of consecutive strings, so that every list has at most `max_segments` strings,
+    `max_characters` characters and `max_bytes` UTF-8 encoded bytes in total.
+    A string exceeding a limit on its own is yielded in a batch of its own.
+
+    :param strings: iterable of strings
+    :param max_segments: maximum number of strings in a batch, None means unbounded
+    :param max_characters: maximum number of characters in a batch, None means unbounded
+    :param max_bytes: maximum number of UTF-8 encoded bytes in a batch, None means unbounded
+    """
+    batch = []
+    characters = size = 0
+    for text in strings:
+        text_characters = len(text)
+        text_size = len(text.encode('utf-8')) if max_bytes else 0
+
+        if batch and ((max_segments and len(batch) >= max_segments) or
+                      (max_characters and characters + text_characters > max_characters) or
+                      (max_bytes and size + text_size > max_bytes)):
+            yield batch
+            batch = []
+            characters = size = 0
+
+        batch.append(text)
+        characters += text_characters
+        size += text_size
+
+    if batch:
+        yield batch
+
+
+def translate_in_batches(translate_batch, strings, limits):
+    """
+    Translates the strings batch by batch and returns all the translations in order.
+
+    :param translate_batch: callable translating a list of strings, returning a list of translations
+    :param strings: iterable of strings
+    :param limits: dict with the `max_segments`, `max_characters` and `max_bytes` limits
+    """
+    translated = []
+    for batch in iter_batches(strings, limits.get('max_segments'), limits.get('max_characters'),
+                              limits.get('max_bytes')):
+        translated.extend(translate_batch(batch))
+    return translated
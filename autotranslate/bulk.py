@@ -0,0 +1,104 @@
+"""
+Bulk translation of model fields, e.g. the product names stored in per-language columns
+(`name` -> `name_de`, `name_fr`, ...).
+
+The rows are read in chunks, the values of a chunk are sent to the translator service together,
+and the translations are written back with a single `bulk_update` per chunk.
+"""
+import hashlib
+import itertools
+import logging
+
+from autotranslate.metrics import metrics
+from autotranslate.placeholders import fix_translation, protect
+
+logger = logging.getLogger(__name__)
+
+
+def hash_source(value):
+    """
+    Returns a short hash of the source value a translation is made from.
+    """
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+def translate_queryset(queryset, fields, target_languages, source_language='en', target_field='{field}_{language}',
+                       hash_field=None, chunk_size=500, overwrite=False, translator=None):
+    """
+    Translates the fields of the rows of the queryset into the target languages.
+
+    A translation is skipped when its column is filled already, unless `overwrite` is set.
+    With a `hash_field`, the hash of the source value is stored along with the translations
+    and a translation is only skipped while the source value keeps the same hash.
+
+    :param queryset: rows to translate, read with `iterator(chunk_size)`
+    :param fields: names of the fields holding the source values
+    :param target_languages: language codes, e.g. `['de', 'pt-br']`
+    :param target_field: name of the field holding a translation, formatted with the `field` and
+                         the `language` (`-` replaced with `_`, e.g. `name_pt_br`)
+    :param hash_field: name of the field holding the hash of the source value a translation was made from,
+                       formatted with the `field` and the `language`, e.g. `{field}_{language}_hash`;
+                       every language needs its own, a run for some of the languages would otherwise
+                       hide the outdated translations of the other ones
+    :param chunk_size: number of rows translated and updated at once
+    :param translator: translator service, the default one if None
+    :return: dict with the number of `rows`, `translated` values and `updated` rows
+    """
+    from autotranslate.utils import get_translator, unique
+
+    if hash_field and '{language}' not in hash_field:
+        raise ValueError('`hash_field` should hold a field per language, e.g. {field}_{language}_hash')
+
+    tl = translator or get_translator()
+    columns = [(field, language, target_field.format(field=field, language=language.replace('-', '_')),
+                hash_field.format(field=field, language=language.replace('-', '_')) if hash_field else None)
+               for field in fields for language in target_languages]
+    loaded = set(fields)
+    for field, language, target, source_hash in columns:
+        loaded.add(target)
+        if source_hash:
+            loaded.add(source_hash)
+    rows = queryset.only(*loaded).iterator(chunk_size=chunk_size)
+    stats = {'rows': 0, 'translated': 0, 'updated': 0}
+
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            break
+        stats['rows'] += len(chunk)
+
+        # language -> list of (row, target field, hash field, source value)
+        pending = {}
+        for row in chunk:
+            for field, language, target, source_hash in columns:
+                value = getattr(row, field)
+                if not value:
+                    continue
+                if not overwrite and getattr(row, target):
+                    if source_hash is None or getattr(row, source_hash) == hash_source(value):
+                        continue
+                pending.setdefault(language, []).append((row, target, source_hash, value))
+
+        modified = {}
+        updated_fields = set()
+        for language, items in pending.items():
+            strings = unique(protect(value)[0] for row, target, source_hash, value in items)
+            with tl.concurrency(), metrics.timer('translate_seconds'):
+                translated = dict(zip(strings, tl.translate_strings(strings, language, source_language, False)))
+            metrics.incr('strings_total', len(strings))
+            stats['translated'] += len(strings)
+
+            for row, target, source_hash, value in items:
+                setattr(row, target, fix_translation(value, translated[protect(value)[0]]))
+                updated_fields.add(target)
+                if source_hash:
+                    setattr(row, source_hash, hash_source(value))
+                    updated_fields.add(source_hash)
+                modified[row.pk] = row
+
+        if modified:
+            queryset.model._default_manager.bulk_update(list(modified.values()), sorted(updated_fields),
+                                                        batch_size=chunk_size)
+            stats['updated'] += len(modified)
+        logger.info('translated {} rows, {} updated'.format(stats['rows'], stats['updated']))
+    return stats
@@ -0,0 +1,210 @@
+"""
+Translation memory backends.
+
+A translation memory remembers every (source_language, target_language, text)
+triple that has been sent to a translator service, so that subsequent runs only
+have to ask the provider for strings it has never seen before.
+"""
+import hashlib
+import os
+import pathlib
+import sqlite3
+import threading
+
+from autotranslate.metrics import metrics
+
+
+class BaseTranslationCache:
+    """
+    Defines the methods that should be implemented by a translation memory backend.
+    Keeps track of the number of hits and misses served by the backend.
+
+    A `read_only` translation memory never writes to its storage.
+    """
+
+    def __init__(self, read_only=False):
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    @staticmethod
+    def make_key(text, target_language, source_language):
+        """
+        Returns a fixed-length key identifying the translation of `text`.
+        """
+        value = u'{}\x00{}\x00{}'.format(source_language, target_language, text)
+        return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+    def get_many(self, strings, target_language, source_language='en'):
+        """
+        Returns a dict mapping each of the given strings to its cached translation,
+        strings that are not cached are left out.
+        """
+        strings = list(strings)
+        found = self._get_many(strings, target_language, source_language)
+        misses = len(set(strings)) - len(found)
+        with self._counter_lock:
+            self.hits += len(found)
+            self.misses += misses
+        metrics.incr('cache_hits_total', len(found))
+        metrics.incr('cache_misses_total', misses)
+        return found
+
+    def peek_many(self, strings, target_language, source_language='en'):
+        """
+        Returns the set of the given strings that are cached,
+        without counting them as hits or misses nor refreshing them.
+        """
+        return set(self._get_many(list(strings), target_language, source_language, touch=False))
+
+    def set_many(self, translations, target_language, source_language='en'):
+        """
+        Stores a dict mapping strings to their translations.
+        """
+        if translations and not self.read_only:
+            self._set_many(translations, target_language, source_language)
+
+    def _get_many(self, strings, target_language, source_language, touch=True):
+        raise NotImplementedError('._get_many() must be overridden.')
+
+    def _set_many(self, translations, target_language, source_language):
+        raise NotImplementedError('._set_many() must be overridden.')
+
+    def clear(self):
+        raise NotImplementedError('.clear() must be overridden.')
+
+    def close(self):
+        pass
+
+
+class SQLiteTranslationCache(BaseTranslationCache):
+    """
+    Stores translations in a local SQLite file.
+    When more than `max_entries` translations are stored, the least recently used ones are evicted.
+    """
+
+    # sqlite has a limit on the number of host parameters in a single statement
+    query_chunk_size = 500
+
+    def __init__(self, path='.autotranslate-cache.sqlite3', max_entries=100000, read_only=False):
+        super(SQLiteTranslationCache, self).__init__(read_only)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        if read_only:
+            # a missing file is an empty translation memory
+            self._connection = None
+            if os.path.exists(path):
+                uri = '{}?mode=ro'.format(pathlib.Path(os.path.abspath(path)).as_uri())
+                self._connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS translations ('
+                '  key TEXT PRIMARY KEY,'
+                '  translation TEXT NOT NULL,'
+                '  used INTEGER NOT NULL'
+                ')'
+            )
+            self._connection.execute('CREATE INDEX IF NOT EXISTS translations_used ON translations (used)')
+            self._clock = self._connection.execute('SELECT COALESCE(MAX(used), 0) FROM translations').fetchone()[0]
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _get_many(self, strings, target_language, source_language, touch=True):
+        if self._connection is None:
+            return {}
+
+        keys = {}
+        for text in strings:
+            keys[self.make_key(text, target_language, source_language)] = text
+
+        found = {}
+        key_list = list(keys)
+        with self._lock, self._connection:
+            for i in range(0, len(key_list), self.query_chunk_size):
+                chunk = key_list[i:i + self.query_chunk_size]
+                rows = self._connection.execute(
+                    'SELECT key, translation FROM translations WHERE key IN ({})'.format(
+                        ', '.join('?' * len(chunk))), chunk).fetchall()
+                for key, translation in rows:
+                    found[keys[key]] = translation
+
+                # mark the entries as recently used, so they survive the eviction
+                if rows and touch and not self.read_only:
+                    used = self._tick()
+                    self._connection.executemany('UPDATE translations SET used = ? WHERE key = ?',
+                                                 [(used, key) for key, _ in rows])
+        return found
+
+    def _set_many(self, translations, target_language, source_language):
+        with self._lock, self._connection:
+            used = self._tick()
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO translations (key, translation, used) VALUES (?, ?, ?)',
+                [(self.make_key(text, target_language, source_language), translation, used)
+                 for text, translation in translations.items()])
+            self._evict()
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        count = self._connection.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        if count > self.max_entries:
+            self._connection.execute(
+                'DELETE FROM translations WHERE key IN ('
+                '  SELECT key FROM translations ORDER BY used ASC LIMIT ?'
+                ')', (count - self.max_entries,))
+
+    def __len__(self):
+        if self._connection is None:
+            return 0
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM translations')
+
+    def close(self):
+        if self._connection is None:
+            return
+        with self._lock:
+            self._connection.close()
+
+
+class DjangoTranslationCache(BaseTranslationCache):
+    """
+    Stores translations in one of the configured django cache backends.
+    The size of the cache is bounded by the backend itself (e.g. the `MAX_ENTRIES` option).
+    """
+
+    def __init__(self, alias='default', timeout=None, key_prefix='autotranslate', read_only=False):
+        super(DjangoTranslationCache, self).__init__(read_only)
+        from django.core.cache import caches
+        self.cache = caches[alias]
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+
+    def _cache_key(self, text, target_language, source_language):
+        return '{}:{}'.format(self.key_prefix, self.make_key(text, target_language, source_language))
+
+    def _get_many(self, strings, target_language, source_language, touch=True):
+        keys = {}
+        for text in strings:
+            keys[self._cache_key(text, target_language, source_language)] = text
+        return {keys[key]: translation for key, translation in self.cache.get_many(list(keys)).items()}
+
+    def _set_many(self, translations, target_language, source_language):
+        self.cache.set_many({self._cache_key(text, target_language, source_language): translation
+                             for text, translation in translations.items()}, timeout=self.timeout)
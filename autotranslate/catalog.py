@@ -0,0 +1,365 @@
+"""
+Fast reader and writer of large message (`.po`) files, an alternative to polib for the command.
+
+The file is tokenized in a single pass into compact `Entry` objects, which remember where they
+were read from in the text of the file. When the catalog is saved, only the translations (and the
+flags) of the modified entries are written again, the rest of the file is kept byte-for-byte.
+
+The entries behave like polib's `POEntry` for what the command uses: `msgctxt`, `msgid`,
+`msgid_plural`, `msgstr`, `msgstr_plural`, `flags`, `obsolete`, `fuzzy` and `translated()`.
+"""
+import re
+import struct
+import types
+
+from autotranslate.utils import atomic_write
+
+CHARSET_RE = re.compile(br'charset=([\w.:-]+)')
+UNESCAPE_RE = re.compile(r'\\(.)')
+UNESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'v': '\v', 'b': '\b', 'f': '\f'}
+ESCAPES = (('\\', r'\\'), ('\t', r'\t'), ('\r', r'\r'), ('\n', r'\n'), ('\v', r'\v'), ('\b', r'\b'),
+           ('\f', r'\f'), ('"', r'\"'))
+LINE_RE = re.compile(r'[^\n]*\n|[^\n]+')
+WORD_RE = re.compile(r'[^ ]* *')
+
+# the translations of the entries that are not plural
+EMPTY = types.MappingProxyType({})
+
+# width of the lines written for the modified translations, as gettext's tools do
+WRAP_WIDTH = 79
+
+
+def unescape(value):
+    if '\\' not in value:
+        return value
+    return UNESCAPE_RE.sub(lambda match: UNESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def escape(value):
+    for char, escaped in ESCAPES:
+        if char in value:
+            value = value.replace(char, escaped)
+    return value
+
+
+def literal(text):
+    """Returns the value of a quoted string, e.g. `"foo\\n"`."""
+    text = text.strip()
+    return unescape(text[1:-1])
+
+
+class Entry:
+    """
+    A message of the catalog.
+
+    `start` and `msgstr_start` are the offsets of the first line of the entry and of its translations
+    in the text of the file, `original_msgstr` and `original_flags` are the translations and the flags
+    read from the file. The list of the flags is only made when they are used, most entries have none.
+    """
+
+    __slots__ = ('msgctxt', 'msgid', 'msgid_plural', 'msgstr', 'msgstr_plural', '_flags', 'obsolete',
+                 'start', 'msgstr_start', 'original_msgstr', 'original_flags')
+
+    def __init__(self, start):
+        self.msgctxt = None
+        self.msgid = None
+        self.msgid_plural = None
+        self.msgstr = ''
+        self.msgstr_plural = EMPTY
+        self._flags = None
+        self.obsolete = False
+        self.start = start
+        self.msgstr_start = None
+        self.original_msgstr = None
+        self.original_flags = ()
+
+    def __repr__(self):
+        return '<Entry {!r}>'.format(self.msgid)
+
+    @property
+    def flags(self):
+        if self._flags is None:
+            self._flags = list(self.original_flags)
+        return self._flags
+
+    @flags.setter
+    def flags(self, flags):
+        self._flags = flags
+
+    @property
+    def fuzzy(self):
+        return 'fuzzy' in (self.original_flags if self._flags is None else self._flags)
+
+    def translated(self):
+        if self.obsolete or self.fuzzy:
+            return False
+        if self.msgstr != '':
+            return True
+        if self.msgstr_plural:
+            return all(value != '' for value in self.msgstr_plural.values())
+        return False
+
+    def translations(self):
+        if self.msgid_plural is not None:
+            return tuple(sorted(self.msgstr_plural.items()))
+        return self.msgstr
+
+    def flags_modified(self):
+        return self._flags is not None and tuple(self._flags) != self.original_flags
+
+    def modified(self):
+        return self.flags_modified() or self.translations() != self.original_msgstr
+
+
+def store(entry, key, parts):
+    value = ''.join(parts)
+    if key.__class__ is int:
+        if entry.msgstr_plural is EMPTY:
+            entry.msgstr_plural = {}
+        entry.msgstr_plural[key] = value
+    else:
+        setattr(entry, key, value)
+    del parts[:]
+
+
+def parse(text):
+    """
+    Tokenizes the text of a message file.
+
+    :return: tuple of the header entry (the one of the empty msgid, or None) and the list of the other entries
+    """
+    entries = []
+    entry = None
+    # the field being read: 'msgctxt', 'msgid', 'msgid_plural', 'msgstr' or the index of a plural form
+    key = None
+    parts = []
+    offset = 0
+    if text[:1] == '\ufeff':
+        # the byte order mark is skipped, the offsets remain the ones of the text
+        text, offset = text[1:], 1
+    # only the line feeds end the lines, unlike `str.splitlines()`
+    for line in LINE_RE.findall(text):
+        start = offset
+        offset += len(line)
+        first = line[:1]
+        obsolete = False
+        if first == '#':
+            if line[1:2] == '~' and line[2:3] != '|':
+                # the fields of an obsolete entry
+                line = line[2:].lstrip(' ')
+                first = line[:1]
+                obsolete = True
+            else:
+                if key is not None:
+                    # a comment after the fields starts the next entry
+                    store(entry, key, parts)
+                    key = entry = None
+                if entry is None:
+                    entry = Entry(start)
+                    entries.append(entry)
+                if line[1:2] == ',':
+                    entry.original_flags = tuple(flag.strip() for flag in line[2:].split(',') if flag.strip())
+                continue
+
+        if first == '"':
+            if key is not None:
+                parts.append(literal(line))
+            continue
+        if not line.strip():
+            if key is not None:
+                store(entry, key, parts)
+                key = None
+            entry = None
+            continue
+
+        keyword, _, rest = line.partition(' ')
+        if key is not None:
+            store(entry, key, parts)
+        if keyword in ('msgctxt', 'msgid') and (entry is None or entry.msgid is not None):
+            entry = Entry(start)
+            entries.append(entry)
+        if keyword.startswith('msgstr'):
+            key = int(keyword[7:-1]) if keyword[6:7] == '[' else 'msgstr'
+            if entry.msgstr_start is None:
+                entry.msgstr_start = start
+        elif keyword in ('msgctxt', 'msgid', 'msgid_plural'):
+            key = keyword
+            entry.obsolete = obsolete
+        else:
+            raise ValueError('syntax error at offset {}: {!r}'.format(start, line))
+        parts.append(literal(rest))
+    if key is not None:
+        store(entry, key, parts)
+
+    header = None
+    compact = []
+    for entry in entries:
+        if entry.msgid is None:
+            continue
+        entry.original_msgstr = entry.translations()
+        if header is None and entry.msgid == '' and entry.msgctxt is None and not entry.obsolete:
+            header = entry
+            continue
+        compact.append(entry)
+    return header, compact
+
+
+def detect_encoding(data):
+    match = CHARSET_RE.search(data, 0, 8192)
+    if match:
+        encoding = match.group(1).decode('ascii')
+        try:
+            ''.encode(encoding)
+            return encoding
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+def render_field(keyword, value, prefix=''):
+    """Returns the lines of a field, wrapped the way gettext's tools do."""
+    escaped = escape(value)
+    if '\n' not in value[:-1] and len(prefix) + len(keyword) + len(escaped) + 3 <= WRAP_WIDTH:
+        return ['{}{} "{}"'.format(prefix, keyword, escaped)]
+
+    lines = ['{}{} ""'.format(prefix, keyword)]
+    width = WRAP_WIDTH - len(prefix) - 2
+    for chunk in LINE_RE.findall(value):
+        line = ''
+        for word in WORD_RE.findall(escape(chunk)):
+            if line and len(line) + len(word) > width:
+                lines.append('{}"{}"'.format(prefix, line))
+                line = ''
+            line += word
+        if line:
+            lines.append('{}"{}"'.format(prefix, line))
+    return lines
+
+
+class Catalog:
+    """
+    The entries of a message file, read with `pofile()`.
+
+    Iterating over the catalog yields the entries but the header, as polib's `POFile` does.
+    """
+
+    def __init__(self, text, encoding='utf-8'):
+        self.encoding = encoding
+        self.text = text
+        self.header, self.entries = parse(text)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def locate(self, entry):
+        """
+        Returns the offsets of the `#,` line of the entry (`(start, end)`, or None), of the line
+        flags are inserted before if it has none, and of the end of its translations.
+        """
+        text = self.text
+        flags, head = None, None
+        for match in LINE_RE.finditer(text, entry.start):
+            line, start = match.group(), match.start()
+            if start < entry.msgstr_start:
+                if line.startswith('#,'):
+                    flags = (start, match.end())
+                elif head is None and (line[:1] != '#' or line[1:2] in ('|', '~')):
+                    head = start
+                continue
+            field = line[2:].lstrip(' ') if line.startswith('#~') else line
+            if start > entry.msgstr_start and not field.startswith(('"', 'msgstr')):
+                return flags, head, start
+        return flags, head, len(text)
+
+    def __str__(self):
+        text = self.text
+        newline = '\r\n' if '\r\n' in text[:text.find('\n') + 1] else '\n'
+        edits = []
+        for entry in ([self.header] if self.header else []) + self.entries:
+            if entry.msgstr_start is None or not entry.modified():
+                continue
+            flags, head, end = self.locate(entry)
+            if entry.flags_modified():
+                flags_line = '#, {}{}'.format(', '.join(entry.flags), newline) if entry.flags else ''
+                edits.append(flags + (flags_line,) if flags else (head, head, flags_line))
+            if entry.translations() != entry.original_msgstr:
+                prefix = '#~ ' if entry.obsolete else ''
+                if entry.msgid_plural is not None:
+                    lines = []
+                    for index, value in sorted(entry.msgstr_plural.items()):
+                        lines += render_field('msgstr[{}]'.format(index), value, prefix)
+                else:
+                    lines = render_field('msgstr', entry.msgstr, prefix)
+                block = ''.join(line + newline for line in lines)
+                if end == len(text) and not text.endswith('\n'):
+                    # the file did not end with a line break
+                    block = block[:-len(newline)]
+                edits.append((entry.msgstr_start, end, block))
+
+        output = []
+        position = 0
+        for start, end, block in sorted(edits, key=lambda edit: edit[:2]):
+            output += [text[position:start], block]
+            position = end
+        output.append(text[position:])
+        return ''.join(output)
+
+    def to_bytes(self):
+        return str(self).encode(self.encoding)
+
+    def save(self, path):
+        atomic_write(path, self.to_bytes())
+
+    def to_binary(self):
+        """Returns the compiled (`.mo`) catalog: the header and the translated entries."""
+        messages = []
+        if self.header is not None:
+            messages.append((b'', self.header.msgstr.encode(self.encoding)))
+        for entry in self.entries:
+            if not entry.translated():
+                continue
+            msgid = entry.msgid if entry.msgctxt is None else '{}\x04{}'.format(entry.msgctxt, entry.msgid)
+            if entry.msgid_plural is not None:
+                msgid = '{}\x00{}'.format(msgid, entry.msgid_plural)
+                msgstr = '\x00'.join(value for index, value in sorted(entry.msgstr_plural.items()))
+            else:
+                msgstr = entry.msgstr
+            messages.append((msgid.encode(self.encoding), msgstr.encode(self.encoding)))
+        messages.sort()
+
+        count = len(messages)
+        ids_start = 7 * 4 + 16 * count
+        strs_start = ids_start + sum(len(msgid) + 1 for msgid, msgstr in messages)
+        ids_table, strs_table, ids, strs = [], [], [], []
+        ids_offset = strs_offset = 0
+        for msgid, msgstr in messages:
+            ids_table += [len(msgid), ids_start + ids_offset]
+            strs_table += [len(msgstr), strs_start + strs_offset]
+            ids_offset += len(msgid) + 1
+            strs_offset += len(msgstr) + 1
+            ids.append(msgid)
+            strs.append(msgstr)
+        header = struct.pack('<7I', 0x950412de, 0, count, 7 * 4, 7 * 4 + 8 * count, 0, ids_start)
+        table = struct.pack('<{}I'.format(4 * count), *(ids_table + strs_table))
+        return b''.join([header, table, b'\x00'.join(ids), b'\x00', b'\x00'.join(strs), b'\x00'] if count else
+                        [header])
+
+    def save_as_mofile(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_binary())
+
+
+def pofile(path):
+    """
+    Reads a message file into a `Catalog`.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    encoding = detect_encoding(data)
+    return Catalog(data.decode(encoding), encoding)
@@ -0,0 +1,40 @@
+"""
+Checkpoints record the entries of a message file that have already been translated and saved,
+so that an interrupted run can resume where it stopped.
+"""
+import json
+import os
+
+from autotranslate.manifest import hash_entry
+from autotranslate.utils import atomic_write
+
+
+class Checkpoint:
+    """
+    Set of the entry hashes translated so far, stored next to the message file (`<path>.checkpoint`).
+    """
+
+    suffix = '.checkpoint'
+
+    def __init__(self, path):
+        self.path = path + self.suffix
+        self.done = set()
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.done = set(json.load(f).get('done', []))
+
+    def __contains__(self, entry):
+        return hash_entry(entry) in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def add(self, entries):
+        self.done.update(hash_entry(entry) for entry in entries)
+
+    def save(self):
+        atomic_write(self.path, json.dumps({'done': sorted(self.done)}))
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,6 +1,10 @@
 """
 The `compat` module provides support for backwards compatibility with older
 versions of Django/Python, and compatibility wrappers around optional packages.
+
+The optional packages are imported lazily, on first access of the module attribute
+(e.g. `compat.boto3`), so only the translator service in use pays for its import.
+An optional package that isn't installed is None.
 """
 try:
     # Available in Python 3.1+
@@ -9,23 +13,43 @@ except ImportError:
     # Will be removed in Django 1.9
     from django.utils import importlib
 
-try:
-    import googletrans
-except ImportError:
-    googletrans  = None
-except SyntaxError:
-    import sys
-    import warnings
-    warnings.warn('googletrans disabled due lack support of Python-%s' % (
-        sys.version.split()[0][:3]), RuntimeWarning)
-    googletrans = None
+OPTIONAL_PACKAGES = ('googletrans', 'googleapiclient', 'boto3')
 
-try:
-    import googleapiclient
-except ImportError:
-    googleapiclient = None
 
-try:
-    import boto3
-except ImportError:
-    boto3 = None
+def _import_googletrans():
+    try:
+        import googletrans
+    except ImportError:
+        googletrans = None
+    except SyntaxError:
+        import sys
+        import warnings
+        warnings.warn('googletrans disabled due lack support of Python-%s' % (
+            sys.version.split()[0][:3]), RuntimeWarning)
+        googletrans = None
+    return googletrans
+
+
+def _import_googleapiclient():
+    try:
+        import googleapiclient
+    except ImportError:
+        googleapiclient = None
+    return googleapiclient
+
+
+def _import_boto3():
+    try:
+        import boto3
+    except ImportError:
+        boto3 = None
+    return boto3
+
+
+def __getattr__(name):
+    if name not in OPTIONAL_PACKAGES:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    module = globals()['_import_{}'.format(name)]()
+    # cache the module, the next accesses don't go through __getattr__
+    globals()[name] = module
+    return module
@@ -0,0 +1,127 @@
+"""
+Fuzzy translation memory: reuses the translation of a similar message,
+e.g. one that differs only in punctuation, case or a word.
+
+The messages are compared after normalization (lower case, without punctuation) with
+an inverted index of their character n-grams: the messages sharing the most of the rarest
+n-grams of the looked up message are the candidates, and the most similar one is the match.
+"""
+import collections
+import difflib
+import math
+import re
+
+NORMALIZE_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def normalize(text):
+    return ' '.join(NORMALIZE_RE.sub(' ', text.lower()).split())
+
+
+class FuzzyMatch(str):
+    """
+    A translation reused from a similar message, `score` being the similarity of the messages (0 to 1).
+    """
+
+    score = 1.0
+
+
+class FuzzyIndex:
+    """
+    Maps messages to their translations, and looks up the translation of the most similar message.
+
+    :param threshold: minimum similarity of a match, between 0 and 1
+    :param n: length of the n-grams
+    :param max_candidates: number of candidates compared with the looked up message
+    :param max_postings: number of index entries read by a lookup, the rarest n-grams are read first
+    :param min_dice: lowest dice coefficient of the n-grams of a candidate and of the looked up message,
+                     by default the one of two messages of similarity `threshold`: every character
+                     that differs changes at most 2n - 1 n-grams of the two messages
+    """
+
+    def __init__(self, threshold=0.9, n=3, max_candidates=20, max_postings=2000, min_dice=None):
+        assert 0 < threshold <= 1, '`threshold` should be between 0 and 1'
+        self.threshold = threshold
+        self.n = n
+        self.max_candidates = max_candidates
+        self.max_postings = max_postings
+        self.min_dice = max(0.0, 1 - (2 * n - 1) * (1 - threshold)) if min_dice is None else min_dice
+        self.texts = []
+        self.translations = []
+        self.sizes = []
+        self.exact = {}
+        self.postings = collections.defaultdict(list)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def grams(self, text):
+        padded = ' {} '.format(text)
+        return set(padded[i:i + self.n] for i in range(max(1, len(padded) - self.n + 1)))
+
+    def add(self, text, translation):
+        text = normalize(text)
+        if not text or text in self.exact:
+            return
+        index = len(self.texts)
+        self.exact[text] = index
+        self.texts.append(text)
+        self.translations.append(translation)
+        grams = self.grams(text)
+        self.sizes.append(len(grams))
+        for gram in grams:
+            self.postings[gram].append(index)
+
+    def lookup(self, text):
+        """
+        Returns the translation of the most similar message as a `FuzzyMatch`,
+        or None if no message is similar enough.
+        """
+        text = normalize(text)
+        if not text:
+            return None
+        index = self.exact.get(text)
+        if index is not None:
+            return FuzzyMatch(self.translations[index])
+
+        grams = self.grams(text)
+        # the rare n-grams discriminate the candidates, the common ones are read if the budget allows
+        shared = collections.Counter()
+        budget = self.max_postings
+        postings_lists = sorted((self.postings[gram] for gram in grams if gram in self.postings), key=len)
+        # the n-grams missing from the index are shared by no message, the unread ones may be
+        unread = len(postings_lists)
+        for postings in postings_lists:
+            if budget < len(postings) and shared:
+                break
+            shared.update(postings)
+            budget -= len(postings)
+            unread -= 1
+
+        # a candidate shares at least `min_dice * len(grams) / (2 - min_dice)` n-grams, whatever its size
+        min_count = math.ceil(self.min_dice * len(grams) / (2 - self.min_dice)) - unread
+        best, best_score = None, self.threshold
+        for index, count in shared.most_common(self.max_candidates):
+            if count < min_count:
+                break
+            if 2.0 * (count + unread) / (len(grams) + self.sizes[index]) < self.min_dice:
+                continue
+            candidate = self.texts[index]
+            if 2.0 * min(len(text), len(candidate)) / (len(text) + len(candidate)) < best_score:
+                continue
+            if unread and 2.0 * len(grams & self.grams(candidate)) / (len(grams) + self.sizes[index]) \
+                    < self.min_dice:
+                # the exact dice coefficient, cheaper than the similarity
+                continue
+            matcher = difflib.SequenceMatcher(None, text, candidate, autojunk=False)
+            if matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score >= best_score:
+                best, best_score = index, score
+
+        if best is None:
+            return None
+        match = FuzzyMatch(self.translations[best])
+        match.score = best_score
+        return match
@@ -0,0 +1,151 @@
+"""
+Queue of the translation jobs consumed by the `translate_worker` command.
+
+A job translates either the given message files, or the given messages (msgids)
+in all the message files of the given locales.
+"""
+import collections
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+Job = collections.namedtuple('Job', ['id', 'paths', 'locale', 'msgids'])
+
+
+class JobQueue:
+    """
+    Job queue stored in a SQLite database, several workers may consume the same queue.
+
+    A job claimed by a worker that did not renew its lease within `lease` seconds
+    (e.g. because the worker was killed) is handed out again, see `heartbeat()`.
+    """
+
+    def __init__(self, path='.autotranslate-queue.sqlite3', lease=600, clock=time.time):
+        self.path = path
+        self.lease = lease
+        self.clock = clock
+
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        # job id -> time of the claim (or of its last renewal) of the jobs claimed by this queue
+        self._claims = {}
+        # the transactions are handled explicitly, see `get()`
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        with self._lock:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                '  id INTEGER PRIMARY KEY AUTOINCREMENT,'
+                '  payload TEXT NOT NULL,'
+                "  status TEXT NOT NULL DEFAULT 'pending',"
+                '  claimed REAL,'
+                '  error TEXT'
+                ')')
+            self._connection.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)')
+
+    def put(self, paths=None, locale=None, msgids=None):
+        """
+        Queues a job and returns its id.
+
+        :param paths: paths of the message files to translate
+        :param locale: locales whose message files are translated, all of them if empty
+        :param msgids: messages to translate, all the messages of the files if empty
+        """
+        assert paths or msgids, 'a job requires `paths` or `msgids`'
+        payload = json.dumps({'paths': list(paths or []), 'locale': list(locale or []),
+                              'msgids': list(msgids or [])})
+        with self._lock:
+            return self._connection.execute('INSERT INTO jobs (payload) VALUES (?)', (payload,)).lastrowid
+
+    def get(self):
+        """
+        Claims the oldest pending job, returns None if there is none.
+        """
+        now = self.clock()
+        with self._lock:
+            # take the write lock right away, so two workers can't claim the same job
+            self._connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._connection.execute(
+                    "SELECT id, payload FROM jobs WHERE status = 'pending' "
+                    "OR (status = 'running' AND claimed < ?) ORDER BY id LIMIT 1", (now - self.lease,)).fetchone()
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE jobs SET status = 'running', claimed = ? WHERE id = ?", (now, row[0]))
+                self._connection.execute('COMMIT')
+            except Exception:
+                self._connection.execute('ROLLBACK')
+                raise
+
+        if row is None:
+            return None
+        self._claims[row[0]] = now
+        payload = json.loads(row[1])
+        return Job(row[0], payload['paths'], payload['locale'], payload['msgids'])
+
+    def renew(self, job):
+        """
+        Renews the lease of a job claimed by `get()`, returns False if the lease expired
+        and the job has been claimed again in the meantime.
+        """
+        now = self.clock()
+        with self._lock:
+            claimed = self._claims.get(job.id)
+            renewed = claimed is not None and self._connection.execute(
+                "UPDATE jobs SET claimed = ? WHERE id = ? AND status = 'running' AND claimed = ?",
+                (now, job.id, claimed)).rowcount == 1
+            if renewed:
+                self._claims[job.id] = now
+        return renewed
+
+    @contextlib.contextmanager
+    def heartbeat(self, job, interval=None):
+        """
+        Renews the lease of the job every `interval` seconds (by default a third of the lease)
+        in a background thread, while the context runs.
+        """
+        interval = self.lease / 3.0 if interval is None else interval
+        stopped = threading.Event()
+
+        def run():
+            while not stopped.wait(interval):
+                if not self.renew(job):
+                    logger.warning('the lease of job {} expired, it may be run by another worker'.format(job.id))
+                    return
+
+        thread = threading.Thread(target=run, name='autotranslate-heartbeat-{}'.format(job.id), daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stopped.set()
+            thread.join()
+
+    def done(self, job):
+        with self._lock:
+            self._claims.pop(job.id, None)
+            self._connection.execute("DELETE FROM jobs WHERE id = ?", (job.id,))
+
+    def failed(self, job, error):
+        """
+        Marks the job as failed, failed jobs are kept in the queue but never handed out again.
+        """
+        with self._lock:
+            self._claims.pop(job.id, None)
+            self._connection.execute("UPDATE jobs SET status = 'failed', error = ? WHERE id = ?", (error, job.id))
+
+    def count(self, status='pending'):
+        with self._lock:
+            return self._connection.execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
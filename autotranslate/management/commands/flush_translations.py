@@ -0,0 +1,82 @@
+import logging
+
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import CommandError
+
+from autotranslate.management.commands.translate_messages import Command as TranslateCommand, default_options, unique
+from autotranslate.metrics import metrics
+from autotranslate.runtime import get_runtime_store
+from autotranslate.utils import get_translation_cache
+
+logger = logging.getLogger(__name__)
+
+
+class Command(TranslateCommand):
+    help = ('fill up the untranslated messages of the message files with the translations '
+            'learned at runtime (see `autotranslate.runtime`) and the ones of the translation memory, '
+            'without sending any request to the translator service.')
+
+    option_list = default_options + tuple(
+        option for option in TranslateCommand.option_list[len(default_options):]
+        if option.dest in ('locale', 'domain', 'include_apps', 'set_fuzzy', 'source_language', 'compile'))
+
+    def add_arguments(self, parser):
+        parser.add_argument('--locale', '-l', default=[], dest='locale', action='append',
+                            help='flush the translations of the given locale(s) (e.g. pt_BR). '
+                                 'can be used multiple times.')
+        parser.add_argument('--domain', default=[], dest='domain', action='append',
+                            help='flush the translations into the message files of the given domain(s) only '
+                                 '(e.g. djangojs). can be used multiple times.')
+        parser.add_argument('--include-apps', default=False, dest='include_apps', action='store_true',
+                            help='also flush the translations into the message files of the installed apps '
+                                 '(not of the ones installed in site-packages).')
+        parser.add_argument('--set-fuzzy', '-f', default=False, dest='set_fuzzy', action='store_true',
+                            help='set the fuzzy flag on the flushed messages.')
+        parser.add_argument('--source-language', '-s', default='en', dest='source_language', action='store',
+                            help='override the default source language (en) of the messages.')
+        parser.add_argument('--compile', default=False, dest='compile', action='store_true',
+                            help='write the .mo file of every message file that has been modified.')
+
+    def set_options(self, **options):
+        # only the untranslated messages are filled up, and nothing is translated
+        options['skip_translated'] = True
+        options['dedupe'] = True
+        super(Command, self).set_options(**options)
+        store = get_runtime_store()
+        if isinstance(store.cache, (LocMemCache, DummyCache)):
+            # the command would only see the (empty) cache of its own process
+            raise CommandError(
+                'the translations learned at runtime are stored in the `{}` django cache, which is not shared '
+                'by the processes: configure a shared cache (e.g. redis, memcached or the database) with '
+                '`AUTOTRANSLATE_RUNTIME_OPTIONS[\'cache_alias\']`'.format(
+                    getattr(settings, 'AUTOTRANSLATE_RUNTIME_OPTIONS', {}).get('cache_alias', 'default')))
+        self.stores = [store]
+        cache = get_translation_cache(read_only=True)
+        if cache is not None:
+            self.stores.append(cache)
+
+    def handle(self, *args, **options):
+        try:
+            super(Command, self).handle(*args, **options)
+        finally:
+            for store in getattr(self, 'stores', ()):
+                store.close()
+
+    def translate_strings(self, strings, target_language):
+        """
+        Returns the known translations of the strings, None for the unknown ones.
+        """
+        strings = list(strings)
+        translations = {}
+        missing = unique(strings)
+        for store in self.stores:
+            if not missing:
+                break
+            translations.update(store.get_many(missing, target_language, self.source_language))
+            missing = [s for s in missing if s not in translations]
+        metrics.incr('strings_total', len(translations))
+        logger.info('found {} translations into `{}`, {} are missing'.format(
+            len(translations), target_language, len(missing)))
+        return [translations.get(s) for s in strings]
@@ -1,13 +1,29 @@
+import asyncio
+import collections
+import itertools
 import logging
 import os
 import re
+import site
+import sysconfig
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from optparse import make_option
 
 import polib
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from autotranslate.utils import get_translator
+from autotranslate import catalog
+from autotranslate.batching import iter_batches
+from autotranslate.checkpoint import Checkpoint
+from autotranslate.fuzzy import FuzzyIndex, FuzzyMatch
+from autotranslate.manifest import Manifest, hash_entry
+from autotranslate.metrics import metrics
+from autotranslate.placeholders import fix_translation, missing_placeholders, protect, protect_translation
+from autotranslate.services import get_service_limits, share_rate_limits
+from autotranslate.utils import (atomic_write, compile_catalog, get_translation_cache, get_translator,
+                                 get_translator_class, save_catalog, unique)
 
 logger = logging.getLogger(__name__)
 
@@ -27,14 +43,78 @@ class Command(BaseCommand):
         make_option('--locale', '-l', default=[], dest='locale', action='append',
                     help='autotranslate the message files for the given locale(s) (e.g. pt_BR). '
                          'can be used multiple times.'),
+        make_option('--domain', default=[], dest='domain', action='append',
+                    help='autotranslate the message files of the given domain(s) only (e.g. djangojs). '
+                         'can be used multiple times.'),
+        make_option('--include-apps', default=False, dest='include_apps', action='store_true',
+                    help='also autotranslate the message files in the locale directories of the installed apps '
+                         '(not of the ones installed in site-packages).'),
         make_option('--untranslated', '-u', default=False, dest='skip_translated', action='store_true',
                     help='autotranslate the fuzzy and empty messages only.'),
         make_option('--set-fuzzy', '-f', default=False, dest='set_fuzzy', action='store_true',
                     help='set the fuzzy flag on autotranslated messages.'),
         make_option('--source-language', '-s', default='en', dest='source_language', action='store',
                     help='override the default source language (en) used for translation.'),
+        make_option('--jobs', '-j', default=1, dest='jobs', type='int', action='store',
+                    help='number of message files to translate concurrently (default: 1).'),
+        make_option('--processes', default=False, dest='processes', action='store_true',
+                    help='translate the message files in worker processes instead of threads, '
+                         'the rate limits of the services are split between them.'),
+        make_option('--async', default=False, dest='use_async', action='store_true',
+                    help='use the asynchronous translator API, --jobs bounds the files translated at once.'),
+        make_option('--dedupe', '-d', default=False, dest='dedupe', action='store_true',
+                    help='translate the strings shared by the message files of a locale only once.'),
+        make_option('--fan-out', default=False, dest='fan_out_languages', action='store_true',
+                    help='prepare the strings of several locales first, and translate every string shared '
+                         'by several locales into all of them at once.'),
+        make_option('--fan-out-size', default=10, dest='fan_out_size', type='int', action='store',
+                    help='number of locales (or message files, without --dedupe) prepared at once by --fan-out '
+                         '(default: 10).'),
+        make_option('--fuzzy-match', default=None, dest='fuzzy_match', type='float', action='store',
+                    help='fill up the messages similar to an already translated message (similarity between 0 '
+                         'and 1, e.g. 0.9) with its translation, marked as fuzzy, instead of translating them.'),
+        make_option('--incremental', '-i', default=False, dest='incremental', action='store_true',
+                    help='skip the message files and entries that did not change since the last run.'),
+        make_option('--manifest', default=None, dest='manifest', action='store',
+                    help='path of the manifest used by --incremental '
+                         '(default: AUTOTRANSLATE_MANIFEST_PATH or .autotranslate-manifest.json).'),
+        make_option('--checkpoint', '-c', default=False, dest='checkpoint', action='store_true',
+                    help='save the message files after every batch of translations, '
+                         'and resume an interrupted run from the last saved batch.'),
+        make_option('--checkpoint-size', default=100, dest='checkpoint_size', type='int', action='store',
+                    help='number of strings translated between two checkpoints (default: 100).'),
+        make_option('--stream', default=False, dest='stream', action='store_true',
+                    help='translate the message files window by window, instead of collecting '
+                         'all their strings and translations at once.'),
+        make_option('--window-size', default=1000, dest='window_size', type='int', action='store',
+                    help='number of strings translated at once by --stream (default: 1000).'),
+        make_option('--compile', default=False, dest='compile', action='store_true',
+                    help='write the .mo file of every message file that has been modified.'),
+        make_option('--fast-catalog', default=False, dest='fast_catalog', action='store_true',
+                    help='read and write the message files with autotranslate.catalog instead of polib: '
+                         'faster and lighter, only the modified translations are written again.'),
+        make_option('--shard', default=None, dest='shard', action='store',
+                    help='translate the K-th of N parts of the work (K/N, e.g. 2/4), the parts '
+                         'are balanced by the number of characters to translate.'),
+        make_option('--merge', default=[], dest='merge', action='append',
+                    help='merge the translations of the message files in the given directory, the '
+                         'output of a --shard run mirroring a locale path. can be used multiple times.'),
+        make_option('--stats-file', default=None, dest='stats_file', action='store',
+                    help='write the metrics of the run to the file, in the Prometheus text format '
+                         'if the file name ends with .prom, as JSON otherwise.'),
+        make_option('--estimate', default=False, dest='estimate', action='store_true',
+                    help='report the strings, characters and requests the run would send to the '
+                         'translator service and its estimated duration, without translating anything.'),
+        make_option('--estimate-latency', default=0.5, dest='estimate_latency', type='float', action='store',
+                    help='assumed duration of a request in seconds, used by --estimate (default: 0.5).'),
     )
 
+    # options that are passed on to the worker processes
+    worker_options = ('locale', 'skip_translated', 'set_fuzzy', 'source_language', 'dedupe',
+                      'incremental', 'manifest_path', 'checkpoint', 'checkpoint_size', 'stream', 'window_size',
+                      'msgids', 'compile', 'fast_catalog', 'shard_entries', 'include_apps', 'fuzzy_match',
+                      'locale_directories')
+
     def add_arguments(self, parser):
         # Previously, only the standard optparse library was supported and
         # you would have to extend the command option_list variable with optparse.make_option().
@@ -43,42 +123,562 @@ class Command(BaseCommand):
         parser.add_argument('--locale', '-l', default=[], dest='locale', action='append',
                             help='autotranslate the message files for the given locale(s) (e.g. pt_BR). '
                                  'can be used multiple times.')
+        parser.add_argument('--domain', default=[], dest='domain', action='append',
+                            help='autotranslate the message files of the given domain(s) only (e.g. djangojs). '
+                                 'can be used multiple times.')
+        parser.add_argument('--include-apps', default=False, dest='include_apps', action='store_true',
+                            help='also autotranslate the message files in the locale directories '
+                                 'of the installed apps (not of the ones installed in site-packages).')
         parser.add_argument('--untranslated', '-u', default=False, dest='skip_translated', action='store_true',
                             help='autotranslate the fuzzy and empty messages only.')
         parser.add_argument('--set-fuzzy', '-f', default=False, dest='set_fuzzy', action='store_true',
                             help='set the fuzzy flag on autotranslated messages.')
         parser.add_argument('--source-language', '-s', default='en', dest='source_language', action='store',
                             help='override the default source language (en) used for translation.')
+        parser.add_argument('--jobs', '-j', default=1, dest='jobs', type=int, action='store',
+                            help='number of message files to translate concurrently (default: 1).')
+        parser.add_argument('--processes', default=False, dest='processes', action='store_true',
+                            help='translate the message files in worker processes instead of threads, '
+                                 'the rate limits of the services are split between them.')
+        parser.add_argument('--async', default=False, dest='use_async', action='store_true',
+                            help='use the asynchronous translator API, --jobs bounds the files translated at once.')
+        parser.add_argument('--dedupe', '-d', default=False, dest='dedupe', action='store_true',
+                            help='translate the strings shared by the message files of a locale only once.')
+        parser.add_argument('--fan-out', default=False, dest='fan_out_languages', action='store_true',
+                            help='prepare the strings of several locales first, and translate every string shared '
+                                 'by several locales into all of them at once.')
+        parser.add_argument('--fan-out-size', default=10, dest='fan_out_size', type=int, action='store',
+                            help='number of locales (or message files, without --dedupe) prepared at once '
+                                 'by --fan-out (default: 10).')
+        parser.add_argument('--fuzzy-match', default=None, dest='fuzzy_match', type=float, action='store',
+                            help='fill up the messages similar to an already translated message (similarity '
+                                 'between 0 and 1, e.g. 0.9) with its translation, marked as fuzzy, '
+                                 'instead of translating them.')
+        parser.add_argument('--incremental', '-i', default=False, dest='incremental', action='store_true',
+                            help='skip the message files and entries that did not change since the last run.')
+        parser.add_argument('--manifest', default=None, dest='manifest', action='store',
+                            help='path of the manifest used by --incremental '
+                                 '(default: AUTOTRANSLATE_MANIFEST_PATH or .autotranslate-manifest.json).')
+        parser.add_argument('--checkpoint', '-c', default=False, dest='checkpoint', action='store_true',
+                            help='save the message files after every batch of translations, '
+                                 'and resume an interrupted run from the last saved batch.')
+        parser.add_argument('--checkpoint-size', default=100, dest='checkpoint_size', type=int, action='store',
+                            help='number of strings translated between two checkpoints (default: 100).')
+        parser.add_argument('--stream', default=False, dest='stream', action='store_true',
+                            help='translate the message files window by window, instead of collecting '
+                                 'all their strings and translations at once.')
+        parser.add_argument('--window-size', default=1000, dest='window_size', type=int, action='store',
+                            help='number of strings translated at once by --stream (default: 1000).')
+        parser.add_argument('--compile', default=False, dest='compile', action='store_true',
+                            help='write the .mo file of every message file that has been modified.')
+        parser.add_argument('--fast-catalog', default=False, dest='fast_catalog', action='store_true',
+                            help='read and write the message files with autotranslate.catalog instead of '
+                                 'polib: faster and lighter, only the modified translations are written again.')
+        parser.add_argument('--shard', default=None, dest='shard', action='store',
+                            help='translate the K-th of N parts of the work (K/N, e.g. 2/4), the parts '
+                                 'are balanced by the number of characters to translate.')
+        parser.add_argument('--merge', default=[], dest='merge', action='append',
+                            help='merge the translations of the message files in the given directory, the '
+                                 'output of a --shard run mirroring a locale path. can be used multiple times.')
+        parser.add_argument('--stats-file', default=None, dest='stats_file', action='store',
+                            help='write the metrics of the run to the file, in the Prometheus text format '
+                                 'if the file name ends with .prom, as JSON otherwise.')
+        parser.add_argument('--estimate', default=False, dest='estimate', action='store_true',
+                            help='report the strings, characters and requests the run would send to the '
+                                 'translator service and its estimated duration, without translating anything.')
+        parser.add_argument('--estimate-latency', default=0.5, dest='estimate_latency', type=float, action='store',
+                            help='assumed duration of a request in seconds, used by --estimate (default: 0.5).')
 
     def set_options(self, **options):
         self.locale = options['locale']
+        self.domain = options.get('domain') or []
+        self.include_apps = options.get('include_apps', False)
         self.skip_translated = options['skip_translated']
         self.set_fuzzy = options['set_fuzzy']
         self.source_language = options.get('source_language', 'en')
+        self.jobs = options.get('jobs', 1)
+        self.processes = options.get('processes', False)
+        self.use_async = options.get('use_async', False)
+        self.dedupe = options.get('dedupe', False)
+        self.fan_out_languages = options.get('fan_out_languages', False)
+        self.fan_out_size = options.get('fan_out_size', 10)
+        self.fuzzy_match = options.get('fuzzy_match')
+        self.fuzzy_indexes = {}
+        # result of `locale_index()`, computed once per run
+        self.locale_directories = options.get('locale_directories')
+        # text -> result of `protect()`, see `protect()`
+        self._protected = {}
+        self._fuzzy_lock = threading.Lock()
+        self.incremental = options.get('incremental', False)
+        self.manifest_path = options.get('manifest_path') or options.get('manifest') or \
+            getattr(settings, 'AUTOTRANSLATE_MANIFEST_PATH', '.autotranslate-manifest.json')
+        self.manifest = Manifest(self.manifest_path) if self.incremental else None
+        self.checkpoint = options.get('checkpoint', False)
+        self.checkpoint_size = options.get('checkpoint_size', 100)
+        self.stream = options.get('stream', False)
+        self.window_size = options.get('window_size', 1000)
+        self.stats_file = options.get('stats_file')
+        self.compile = options.get('compile', False)
+        self.fast_catalog = options.get('fast_catalog', False)
+        # used by the `translate_worker` command: the messages to translate, all if None
+        self.msgids = options.get('msgids')
+        self.shard = parse_shard(options['shard']) if options.get('shard') else None
+        # maps the paths of the message files split between the shards to the hashes
+        # of the entries assigned to this shard, see `shard_tasks()`
+        self.shard_entries = options.get('shard_entries')
+        self.merge = options.get('merge') or []
+        self.estimate = options.get('estimate', False)
+        self.estimate_latency = options.get('estimate_latency', 0.5)
+
+        if self.jobs < 1:
+            raise CommandError('--jobs should be a positive number')
+        if self.use_async and self.processes:
+            raise CommandError('--async and --processes can not be used together')
+        if self.use_async and self.checkpoint:
+            raise CommandError('--async and --checkpoint can not be used together')
+        if self.checkpoint_size < 1:
+            raise CommandError('--checkpoint-size should be a positive number')
+        if self.use_async and self.stream:
+            raise CommandError('--async and --stream can not be used together')
+        if self.window_size < 1:
+            raise CommandError('--window-size should be a positive number')
+        if self.fan_out_size < 1:
+            raise CommandError('--fan-out-size should be a positive number')
+        if self.fan_out_languages and (self.use_async or self.processes or self.checkpoint or self.stream):
+            raise CommandError('--fan-out can not be used together with --async, --processes, '
+                               '--checkpoint or --stream')
+        if self.shard and self.merge:
+            raise CommandError('--shard and --merge can not be used together')
+        if self.fuzzy_match is not None and not 0 < self.fuzzy_match <= 1:
+            raise CommandError('--fuzzy-match should be between 0 and 1')
+        if self.estimate_latency < 0:
+            raise CommandError('--estimate-latency should not be negative')
+
+    def get_worker_options(self):
+        return {name: getattr(self, name) for name in self.worker_options}
 
     def handle(self, *args, **options):
         self.set_options(**options)
 
         assert getattr(settings, 'USE_I18N', False), 'i18n framework is disabled'
         assert getattr(settings, 'LOCALE_PATHS', []), 'locale paths is not configured properly'
-        for directory in settings.LOCALE_PATHS:
-            # walk through all the paths
-            # and find all the pot files
-            for root, dirs, files in os.walk(directory):
-                for file in files:
+
+        metrics.reset()
+        if self.merge:
+            for directory in self.merge:
+                self.merge_shard(directory)
+            return
+
+        tasks = self.plan(self.find_files())
+        if self.shard:
+            tasks = self.shard_tasks(tasks)
+        if self.estimate:
+            # nothing is translated nor written, not even the manifest
+            self.write_estimate(self.estimate_tasks(tasks))
+            return
+
+        try:
+            if self.use_async:
+                asyncio.run(self.atranslate_tasks(tasks))
+            elif self.fan_out_languages:
+                self.translate_tasks_fanned_out(tasks)
+            elif self.jobs == 1:
+                for target_language, files in tasks:
+                    logger.info('filling up translations for locale `{}`'.format(target_language))
+                    self.record(self.translate_files(target_language, files))
+            else:
+                self.translate_tasks_concurrently(tasks)
+        finally:
+            # the files translated so far are recorded even if the run failed
+            if self.manifest is not None:
+                self.manifest.save()
+            self.report()
+
+    def report(self):
+        """
+        Logs a summary of the metrics of the run, and writes them to the stats file.
+        """
+        logger.info('translated {} strings ({} characters) of {} files in {} requests, '
+                    '{} retries, {} cache hits'.format(
+                        metrics.counter('strings_total'), metrics.counter('characters_total'),
+                        metrics.counter('files_total'), metrics.counter('requests_total'),
+                        metrics.counter('retries_total'), metrics.counter('cache_hits_total')))
+        if self.stats_file:
+            atomic_write(self.stats_file,
+                         metrics.to_prometheus() if self.stats_file.endswith('.prom') else metrics.to_json())
+
+    def estimate_tasks(self, tasks):
+        """
+        Selects the strings to translate exactly like a run would, without translating them.
+        The strings found in the translation memory are left out, the memory is opened read-only.
+
+        :return: list of `(target_language, files, requests)` tuples, where `files` is a list of
+                 `(path, strings, characters)` tuples and `requests` the `(strings, characters, requests)`
+                 that would be sent to the translator service for the task
+        """
+        limits = get_service_limits(get_translator_class())
+        cache = get_translation_cache(read_only=True)
+        estimates = []
+        try:
+            for target_language, files in tasks:
+                file_estimates = []
+                task_strings = []
+                for root, file_name in files:
+                    path = os.path.join(root, file_name)
+                    po = self.load_catalog(path)
+                    strings = self.get_strings_to_translate(self.select_entries(po, path))
+                    file_estimates.append((path, len(strings), sum(len(s) for s in strings)))
+                    task_strings.extend(strings)
+
+                unique_strings = unique(task_strings)
+                if cache is not None:
+                    cached = cache.peek_many(unique_strings, target_language, self.source_language)
+                    unique_strings = [s for s in unique_strings if s not in cached]
+                requests = sum(1 for batch in iter_batches(unique_strings, limits['max_segments'],
+                                                           limits['max_characters'], limits['max_bytes']))
+                estimates.append((target_language, file_estimates,
+                                  (len(unique_strings), sum(len(s) for s in unique_strings), requests)))
+        finally:
+            if cache is not None:
+                cache.close()
+        return estimates
+
+    def estimate_duration(self, requests, characters):
+        """
+        Returns the seconds it would take to send the requests, bounded by the concurrency
+        and the rate limits of the translator service.
+        """
+        limits = get_service_limits(get_translator_class())
+        max_concurrency = limits['max_concurrency']
+        if self.use_async:
+            parallelism = max_concurrency or requests or 1
+        else:
+            parallelism = min(self.jobs, max_concurrency or self.jobs)
+        seconds = requests * self.estimate_latency / parallelism
+        if limits['requests_per_second']:
+            seconds = max(seconds, requests / float(limits['requests_per_second']))
+        if limits['characters_per_second']:
+            seconds = max(seconds, characters / float(limits['characters_per_second']))
+        return seconds
+
+    def write_estimate(self, estimates):
+        total = [0, 0, 0]
+        files = 0
+        for target_language, file_estimates, requests in estimates:
+            for path, strings, characters in file_estimates:
+                self.stdout.write('{}\t{}\t{} strings\t{} characters'.format(
+                    target_language, path, strings, characters))
+            self.stdout.write('{}\t{} files\t{} strings\t{} characters\t{} requests'.format(
+                target_language, len(file_estimates), *requests))
+            files += len(file_estimates)
+            total = [a + b for a, b in zip(total, requests)]
+
+        strings, characters, requests = total
+        self.stdout.write('total\t{} files\t{} strings\t{} characters\t{} requests'.format(
+            files, strings, characters, requests))
+        self.stdout.write('estimated duration: {:.1f}s at {}s per request'.format(
+            self.estimate_duration(requests, characters), self.estimate_latency))
+
+        quota = get_service_limits(get_translator_class())['characters_quota']
+        if quota and characters > quota:
+            self.stdout.write('the {} characters exceed the quota of the translator service ({})'.format(
+                characters, quota))
+
+    def get_locale_paths(self):
+        """
+        Returns the locale directories to search, the `LOCALE_PATHS` followed by
+        the `locale` directories of the installed apps if `include_apps` is set;
+        the apps installed as packages (e.g. `django.contrib.admin`) are left out,
+        their message files are not the project's to rewrite.
+        """
+        paths = list(settings.LOCALE_PATHS)
+        if self.include_apps:
+            from django.apps import apps
+            for app_config in apps.get_app_configs():
+                path = os.path.join(app_config.path, 'locale')
+                if is_installed_package(app_config.path):
+                    logger.debug('skipping the message files of the installed package `{}`'.format(app_config.name))
+                    continue
+                if os.path.isdir(path) and path not in paths:
+                    paths.append(path)
+        return paths
+
+    def locale_index(self):
+        """
+        Returns an ordered dict mapping every target language to its `LC_MESSAGES` directories.
+
+        Only the `<path>/<locale>/LC_MESSAGES` directories of the locale paths are visited,
+        the directories of the locales that are not requested are never listed.
+        The locale paths are visited once per run, the index is reused afterwards.
+        """
+        if self.locale_directories is not None:
+            return self.locale_directories
+        index = collections.OrderedDict()
+        for directory in self.get_locale_paths():
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError:
+                logger.warning('locale path `{}` is not a directory'.format(directory))
+                continue
+
+            for entry in entries:
+                if not entry.is_dir():
+                    continue
+                if self.locale and entry.name not in self.locale:
+                    logger.info('skipping translation for locale `{}`'.format(entry.name))
+                    continue
+                messages = os.path.join(entry.path, 'LC_MESSAGES')
+                if os.path.isdir(messages):
+                    index.setdefault(entry.name, []).append(messages)
+        self.locale_directories = index
+        return index
+
+    def find_files(self):
+        """
+        Yields a `(root, file_name, target_language)` tuple for every message file to translate.
+        """
+        for target_language, directories in self.locale_index().items():
+            for root in directories:
+                for file in sorted(entry.name for entry in os.scandir(root) if entry.is_file()):
                     if not file.endswith('.po'):
                         # process file only
                         # if its a pot file
                         continue
 
-                    # get the target language from the parent folder name
-                    target_language = os.path.basename(os.path.dirname(root))
+                    if self.domain and file[:-len('.po')] not in self.domain:
+                        continue
 
-                    if self.locale and target_language not in self.locale:
-                        logger.info('skipping translation for locale `{}`'.format(target_language))
+                    if self.manifest is not None and self.manifest.is_unchanged(os.path.join(root, file)):
+                        logger.info('skipping unchanged file `{}`'.format(os.path.join(root, file)))
                         continue
 
-                    self.translate_file(root, file, target_language)
+                    yield root, file, target_language
+
+    def plan(self, files):
+        """
+        Groups the message files into tasks, the strings of all the files in a task
+        are deduplicated and sent to the translator service together.
+
+        Without `dedupe` every file is a task of its own,
+        with `dedupe` all the files of a target language make a single task.
+
+        :param files: iterable of `(root, file_name, target_language)` tuples
+        :return: list of `(target_language, [(root, file_name), ...])` tuples
+        """
+        tasks = collections.OrderedDict()
+        for root, file_name, target_language in files:
+            key = target_language if self.dedupe else (target_language, root, file_name)
+            tasks.setdefault(key, (target_language, []))[1].append((root, file_name))
+        return list(tasks.values())
+
+    def shard_tasks(self, tasks):
+        """
+        Returns the part of the tasks assigned to the shard `K/N`.
+
+        The work is split into units weighted by their number of characters to translate:
+        the message files, and chunks of consecutive entries of the files heavier than
+        `1/(4N)` of the total. The heaviest units are assigned first, each to the least
+        loaded shard, so every shard computes the same assignment from the same message files.
+        """
+        index, count = self.shard
+        weighted = []
+        for target_language, files in tasks:
+            for root, file_name in files:
+                path = os.path.join(root, file_name)
+                po = self.load_catalog(path)
+                entries = [(hash_entry(entry), entry_weight(entry))
+                           for entry in self.select_entries(po, path) if self.need_translate(entry)]
+                weighted.append((root, file_name, target_language, entries))
+
+        total = sum(weight for root, file_name, target_language, entries in weighted for h, weight in entries)
+        unit_weight = max(1, -(-total // (count * 4)))
+        units = []
+        for position, (root, file_name, target_language, entries) in enumerate(weighted):
+            file_weight = sum(weight for h, weight in entries)
+            if not file_weight:
+                continue
+            if file_weight <= unit_weight:
+                units.append((file_weight, position, 0, None))
+                continue
+            chunk, chunk_weight = set(), 0
+            for entry_hash, weight in entries:
+                chunk.add(entry_hash)
+                chunk_weight += weight
+                if chunk_weight >= unit_weight:
+                    units.append((chunk_weight, position, len(units), chunk))
+                    chunk, chunk_weight = set(), 0
+            if chunk:
+                units.append((chunk_weight, position, len(units), chunk))
+
+        loads = [0] * count
+        assigned = []
+        for unit in sorted(units, key=lambda unit: (-unit[0], unit[1], unit[2])):
+            shard = min(range(count), key=lambda i: (loads[i], i))
+            loads[shard] += unit[0]
+            if shard == index - 1:
+                assigned.append(unit)
+        logger.info('shard {}/{}: {} of {} characters to translate'.format(index, count, loads[index - 1], total))
+
+        self.shard_entries = {}
+        files = collections.OrderedDict()
+        for weight, position, number, chunk in sorted(assigned, key=lambda unit: (unit[1], unit[2])):
+            root, file_name, target_language, entries = weighted[position]
+            files[position] = (root, file_name, target_language)
+            if chunk is not None:
+                self.shard_entries.setdefault(os.path.join(root, file_name), set()).update(chunk)
+        return self.plan(files.values())
+
+    def merge_shard(self, directory):
+        """
+        Merges the translations of the message files found in the directory, the locale path
+        of a `--shard` run, into the message files of the locale paths with the same relative path.
+        """
+        locale_paths = self.get_locale_paths()
+        for root, dirs, files in os.walk(directory):
+            for file_name in sorted(files):
+                if not file_name.endswith('.po'):
+                    continue
+                shard_path = os.path.join(root, file_name)
+                relative = os.path.relpath(shard_path, directory)
+                if self.locale and relative.split(os.sep)[0] not in self.locale:
+                    continue
+                for locale_path in locale_paths:
+                    path = os.path.join(locale_path, relative)
+                    if os.path.exists(path):
+                        break
+                else:
+                    logger.warning('skipping `{}`, there is no such message file in the locale paths'.format(
+                        shard_path))
+                    continue
+
+                po = self.load_catalog(path)
+                modified = merge_catalog(po, self.load_catalog(shard_path))
+                if modified:
+                    self.save_catalog(po, path)
+                logger.info('merged {} translations of `{}` into `{}`'.format(modified, shard_path, path))
+
+    def translate_tasks_concurrently(self, tasks):
+        """
+        Translates the tasks using a pool of `jobs` workers.
+
+        The log messages are emitted in the same order as the files are found,
+        regardless of the order in which the workers finish.
+        """
+        if self.processes:
+            executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_setup_worker, initargs=(self.jobs,))
+            options = self.get_worker_options()
+            submit = lambda *args: executor.submit(_translate_files, options, *args)
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.jobs)
+            submit = lambda *args: executor.submit(self.translate_files, *args)
+
+        with executor:
+            futures = [submit(target_language, files) for target_language, files in tasks]
+            for (target_language, files), future in zip(tasks, futures):
+                records = future.result()
+                if self.processes:
+                    records, snapshot = records
+                    metrics.merge(snapshot)
+                self.record(records)
+                self.log_translated(target_language, files)
+
+    def translate_tasks_fanned_out(self, tasks):
+        """
+        Translates the tasks in groups of `fan_out_size` tasks: the strings of all the tasks of a group
+        are selected first, then every string is translated into all the target languages of the group
+        that need it at once (e.g. the catalogs of many locales generated from the same sources);
+        the strings needed by the same target languages are sent together. The services translating
+        into a single language per request (see `multi_target`) get all the strings of a language at once.
+        The requests of a group are sent by `jobs` threads.
+        """
+        tasks = list(tasks)
+        for start in range(0, len(tasks), self.fan_out_size):
+            self.translate_group_fanned_out(tasks[start:start + self.fan_out_size])
+
+    def translate_group_fanned_out(self, tasks):
+        prepared = []
+        # string -> the target languages that need it, in order
+        string_languages = collections.OrderedDict()
+        for target_language, files in tasks:
+            paths = [os.path.join(root, file_name) for root, file_name in files]
+            catalogs = [self.load_catalog(path) for path in paths]
+            metrics.incr('files_total', len(catalogs))
+            entries = [self.select_entries(po, path) for po, path in zip(catalogs, paths)]
+            strings = [self.get_strings_to_translate(po_entries) for po_entries in entries]
+            unique_strings = unique(itertools.chain.from_iterable(strings))
+            matches = self.match_fuzzy(unique_strings, target_language)
+            for string in unique_strings:
+                if string not in matches:
+                    string_languages.setdefault(string, collections.OrderedDict())[target_language] = None
+            prepared.append((target_language, files, catalogs, paths, entries, strings, matches))
+
+        tl = get_translator()
+        groups = collections.OrderedDict()
+        if tl.multi_target:
+            # the strings needed by the same target languages are sent together
+            for string, languages in string_languages.items():
+                groups.setdefault(tuple(languages), []).append(string)
+        else:
+            # the service translates into a single language per request,
+            # all the strings of a target language are sent together
+            for string, languages in string_languages.items():
+                for target_language in languages:
+                    groups.setdefault((target_language,), []).append(string)
+        del string_languages
+
+        def translate(target_languages, unique_strings):
+            logger.debug('translating {} strings into {}'.format(len(unique_strings), ', '.join(target_languages)))
+            for target_language in target_languages:
+                self.count_strings(unique_strings)
+            with tl.concurrency(), metrics.timer('translate_seconds'):
+                return tl.translate_strings_multi(unique_strings, list(target_languages), self.source_language)
+
+        # target language -> translations of the strings
+        translated = collections.defaultdict(dict)
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            results = executor.map(translate, groups.keys(), groups.values())
+            for (target_languages, unique_strings), translated_multi in zip(groups.items(), results):
+                for target_language in target_languages:
+                    translated[target_language].update(zip(unique_strings, translated_multi[target_language]))
+
+        for target_language, files, catalogs, paths, entries, strings, matches in prepared:
+            translations = collections.ChainMap(matches, translated[target_language])
+            modified = self.fan_out(
+                entries, strings, [translations[s] for s in itertools.chain.from_iterable(strings)])
+            for po, path, count in zip(catalogs, paths, modified):
+                if count:
+                    self.save_catalog(po, path)
+            self.record(self.make_records(catalogs, paths))
+            self.log_translated(target_language, files)
+
+    async def atranslate_tasks(self, tasks):
+        """
+        Translates the tasks using the asynchronous translator API,
+        at most `jobs` tasks are translated at once.
+        """
+        semaphore = asyncio.Semaphore(self.jobs)
+
+        async def translate(target_language, files):
+            async with semaphore:
+                return await self.atranslate_files(target_language, files)
+
+        futures = [asyncio.ensure_future(translate(*task)) for task in tasks]
+        try:
+            for (target_language, files), future in zip(tasks, futures):
+                self.record(await future)
+                self.log_translated(target_language, files)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def record(self, records):
+        if self.manifest is not None:
+            self.manifest.update(records)
+
+    def log_translated(self, target_language, files):
+        for root, file_name in files:
+            logger.info('filled up translations for locale `{}` in `{}`'.format(
+                target_language, os.path.join(root, file_name)))
 
     def translate_file(self, root, file_name, target_language):
         """
@@ -88,19 +688,287 @@ class Command(BaseCommand):
         :param file_name:       name of the file to be translated (it should be a pot file)
         :param target_language: language in which the file needs to be translated
         """
-        logger.info('filling up translations for locale `{}`'.format(target_language))
+        self.translate_files(target_language, [(root, file_name)])
+
+    def translate_files(self, target_language, files):
+        """
+        Translates several pot files into the same language,
+        every distinct string is sent to the translator service only once.
 
-        po = polib.pofile(os.path.join(root, file_name))
-        strings = self.get_strings_to_translate(po)
+        :param target_language: language in which the files need to be translated
+        :param files:           list of `(root, file_name)` tuples
+        :return:                manifest records of the files, if running incrementally
+        """
+        paths = [os.path.join(root, file_name) for root, file_name in files]
+        catalogs = [self.load_catalog(path) for path in paths]
+        metrics.incr('files_total', len(catalogs))
+        if self.checkpoint:
+            self.translate_checkpointed(target_language, catalogs, paths)
+            return self.make_records(catalogs, paths)
+        if self.stream:
+            self.translate_streamed(target_language, catalogs, paths)
+            return self.make_records(catalogs, paths)
+
+        entries = [self.select_entries(po, path) for po, path in zip(catalogs, paths)]
+        strings = [self.get_strings_to_translate(po_entries) for po_entries in entries]
 
         # translate the strings,
         # all the translated strings are returned
         # in the same order on the same index
         # viz. [a, b] -> [trans_a, trans_b]
+        translated_strings = self.translate_strings(itertools.chain.from_iterable(strings), target_language)
+        modified = self.fan_out(entries, strings, translated_strings)
+        for po, path, count in zip(catalogs, paths, modified):
+            if count:
+                self.save_catalog(po, path)
+        return self.make_records(catalogs, paths)
+
+    def translate_checkpointed(self, target_language, catalogs, paths):
+        """
+        Translates the catalogs batch by batch, every batch is saved into the message files
+        and recorded in their checkpoints right away, so an interrupted run
+        resumes after the last saved batch.
+
+        :param target_language: language in which the catalogs need to be translated
+        :param catalogs:        list of POFile objects
+        :param paths:           list of the paths of the catalogs
+        """
+        checkpoints = [Checkpoint(path) for path in paths]
+        for checkpoint, path in zip(checkpoints, paths):
+            if len(checkpoint):
+                logger.info('resuming `{}`, {} entries were translated already'.format(path, len(checkpoint)))
+
+        pending = ((i, entry)
+                   for i, (po, path) in enumerate(zip(catalogs, paths))
+                   for entry in self.select_entries(po, path)
+                   if self.need_translate(entry) and entry not in checkpoints[i])
+
+        saved = set()
+        for batch in iter_entry_batches(pending, self.checkpoint_size):
+            entries = [entry for i, entry in batch]
+            translated_strings = self.translate_strings(self.get_strings_to_translate(entries), target_language)
+            self.update_translations(entries, translated_strings)
+
+            for i in sorted(set(i for i, entry in batch)):
+                self.save_catalog(catalogs[i], paths[i], compile=False)
+                checkpoints[i].add(entry for j, entry in batch if j == i)
+                checkpoints[i].save()
+                saved.add(i)
+
+        for i, checkpoint in enumerate(checkpoints):
+            if self.compile and i in saved:
+                self.compile_catalog(catalogs[i], paths[i])
+            checkpoint.remove()
+
+    def translate_streamed(self, target_language, catalogs, paths):
+        """
+        Translates the catalogs window by window: the entries to translate are selected lazily,
+        and the translations of every window of `window_size` strings are applied before the
+        next window is selected, so only one window of strings and translations is held at once.
+        The strings shared by several windows are sent to the translator service again, unless a
+        translation memory (see `AUTOTRANSLATE_CACHE`) is configured.
+
+        :param target_language: language in which the catalogs need to be translated
+        :param catalogs:        list of POFile objects
+        :param paths:           list of the paths of the catalogs
+        """
+        pending = ((i, entry)
+                   for i, (po, path) in enumerate(zip(catalogs, paths))
+                   for entry in self.select_entries(po, path)
+                   if self.need_translate(entry))
+
+        modified = [0] * len(catalogs)
+        for batch in iter_entry_batches(pending, self.window_size):
+            translated_strings = iter(self.translate_strings(
+                self.get_strings_to_translate(entry for i, entry in batch), target_language))
+            # the entries of a window are grouped by catalog, in order
+            for i, group in itertools.groupby(batch, key=lambda item: item[0]):
+                entries = [entry for j, entry in group]
+                strings = sum(2 if entry.msgid_plural else 1 for entry in entries)
+                modified[i] += self.update_translations(entries, itertools.islice(translated_strings, strings))
+
+        for po, path, count in zip(catalogs, paths, modified):
+            if count:
+                self.save_catalog(po, path)
+
+    async def atranslate_files(self, target_language, files):
+        """
+        Asynchronous counterpart of `translate_files`.
+        """
+        loop = asyncio.get_running_loop()
+        paths = [os.path.join(root, file_name) for root, file_name in files]
+        catalogs = await asyncio.gather(*[loop.run_in_executor(None, self.load_catalog, path) for path in paths])
+        metrics.incr('files_total', len(catalogs))
+        entries = [self.select_entries(po, path) for po, path in zip(catalogs, paths)]
+        strings = [self.get_strings_to_translate(po_entries) for po_entries in entries]
+
+        unique_strings = unique(itertools.chain.from_iterable(strings))
+        matches = await loop.run_in_executor(None, self.match_fuzzy, unique_strings, target_language)
+        unique_strings = [s for s in unique_strings if s not in matches]
+        self.count_strings(unique_strings)
         tl = get_translator()
-        translated_strings = tl.translate_strings(strings, target_language, self.source_language, False)
-        self.update_translations(po, translated_strings)
-        po.save()
+        translated = []
+        if unique_strings:
+            with metrics.timer('translate_seconds'):
+                translated = await tl.atranslate_strings(unique_strings, target_language, self.source_language, False)
+        translations = dict(zip(unique_strings, translated))
+        translations.update(matches)
+
+        modified = self.fan_out(entries, strings, [translations[s] for s in itertools.chain.from_iterable(strings)])
+        await asyncio.gather(*[loop.run_in_executor(None, self.save_catalog, po, path)
+                               for po, path, count in zip(catalogs, paths, modified) if count])
+        return await loop.run_in_executor(None, self.make_records, catalogs, paths)
+
+    def load_catalog(self, path):
+        with metrics.timer('parse_seconds'):
+            return self.read_catalog(path)
+
+    def read_catalog(self, path):
+        """Returns the entries of the message file, read with polib or `autotranslate.catalog`."""
+        return catalog.pofile(path) if self.fast_catalog else polib.pofile(path)
+
+    def save_catalog(self, po, path, compile=True):
+        """
+        Saves the modified catalog, and writes its `.mo` file if `compile` is set.
+
+        :param compile: False to leave the `.mo` file out, e.g. until the last checkpoint
+        """
+        with metrics.timer('save_seconds'):
+            save_catalog(po, path)
+        metrics.incr('files_saved_total')
+        if self.compile and compile:
+            self.compile_catalog(po, path)
+
+    def compile_catalog(self, po, path):
+        with metrics.timer('compile_seconds'):
+            compile_catalog(po, path)
+        metrics.incr('files_compiled_total')
+
+    def protect(self, text):
+        """
+        Returns the protected text and the token map of `autotranslate.placeholders.protect`,
+        memoized for the run: a message is protected once whatever the number of its target languages.
+        Nothing is memoized with `stream`, the memory stays bounded by the window.
+        """
+        if self.stream:
+            return protect(text)
+        protected = self._protected.get(text)
+        if protected is None:
+            protected = self._protected[text] = protect(text)
+        return protected
+
+    def count_strings(self, unique_strings):
+        metrics.incr('strings_total', len(unique_strings))
+        metrics.incr('characters_total', sum(len(s) for s in unique_strings))
+
+    def translate_strings(self, strings, target_language):
+        """
+        Translates the strings, duplicates are sent to the translator service only once.
+
+        :return: list of the translations in the same order as the strings
+        """
+        strings = list(strings)
+        unique_strings = unique(strings)
+        matches = self.match_fuzzy(unique_strings, target_language)
+        unique_strings = [s for s in unique_strings if s not in matches]
+        logger.debug('translating {} strings ({} unique, {} fuzzy matches) into `{}`'.format(
+            len(strings), len(unique_strings), len(matches), target_language))
+        self.count_strings(unique_strings)
+
+        translated = []
+        if unique_strings:
+            tl = get_translator()
+            with tl.concurrency(), metrics.timer('translate_seconds'):
+                translated = tl.translate_strings(unique_strings, target_language, self.source_language, False)
+        translations = dict(zip(unique_strings, translated))
+        translations.update(matches)
+        return [translations[s] for s in strings]
+
+    def get_fuzzy_index(self, target_language):
+        """
+        Returns the index of the translated messages of all the message files of the language,
+        built once per run.
+        """
+        with self._fuzzy_lock:
+            index = self.fuzzy_indexes.get(target_language)
+            if index is not None:
+                return index
+
+            index = FuzzyIndex(self.fuzzy_match)
+            with metrics.timer('fuzzy_index_seconds'):
+                for root in self.locale_index().get(target_language, []):
+                    for file_name in sorted(entry.name for entry in os.scandir(root) if entry.is_file()):
+                        if not file_name.endswith('.po'):
+                            continue
+                        for entry in self.read_catalog(os.path.join(root, file_name)):
+                            if entry.msgid_plural or entry.obsolete or not entry.translated():
+                                continue
+                            protected, tokens = protect(entry.msgid)
+                            index.add(protected, protect_translation(entry.msgstr, tokens))
+            logger.info('indexed {} translated messages of locale `{}`'.format(len(index), target_language))
+            self.fuzzy_indexes[target_language] = index
+            return index
+
+    def match_fuzzy(self, strings, target_language):
+        """
+        Returns a dict mapping the strings that are similar to a translated message
+        to its translation (a `FuzzyMatch`), if `fuzzy_match` is set.
+        The strings of the entries that are translated already are not matched.
+        """
+        if not self.fuzzy_match or not strings:
+            return {}
+        index = self.get_fuzzy_index(target_language)
+        matches = {}
+        with metrics.timer('fuzzy_match_seconds'):
+            for string in strings:
+                if isinstance(string, TranslatedText):
+                    continue
+                match = index.lookup(string)
+                if match is not None:
+                    matches[string] = match
+        metrics.incr('fuzzy_matches_total', len(matches))
+        return matches
+
+    def fan_out(self, catalogs, strings, translated_strings):
+        """
+        Splits the translations of a task back into its catalogs.
+
+        :param catalogs: list of POFile objects (or of their entries to translate)
+        :param strings: list of the strings to translate of every catalog
+        :param translated_strings: translations of all the strings in the same order
+        :return: list of the number of modified entries in every catalog
+        """
+        offset = 0
+        modified = []
+        for po, po_strings in zip(catalogs, strings):
+            modified.append(self.update_translations(po, translated_strings[offset:offset + len(po_strings)]))
+            offset += len(po_strings)
+        return modified
+
+    def select_entries(self, po, path):
+        """
+        Returns the entries of the catalog that may need to be translated.
+
+        In incremental mode, the translated entries whose source text was already
+        present during the last run are left out.
+        If `msgids` is set, only the entries of these messages are selected.
+        """
+        entries = po
+        if self.incremental:
+            known = self.manifest.known_entries(path)
+            if known:
+                entries = [entry for entry in entries if not (entry.translated() and hash_entry(entry) in known)]
+        if self.msgids is not None:
+            entries = [entry for entry in entries if entry.msgid in self.msgids]
+        if self.shard_entries and path in self.shard_entries:
+            assigned = self.shard_entries[path]
+            entries = [entry for entry in entries if hash_entry(entry) in assigned]
+        return entries
+
+    def make_records(self, catalogs, paths):
+        if not self.incremental:
+            return {}
+        return {path: Manifest.make_record(path, po) for po, path in zip(catalogs, paths)}
 
     def need_translate(self, entry):
         return not entry.obsolete and (not (self.skip_translated and entry.translated()))
@@ -114,50 +982,204 @@ class Command(BaseCommand):
         :rtype: collections.Iterable[six.text_type]
         """
         strings = []
-        for index, entry in enumerate(po):
-            if not self.need_translate(entry):
-                continue
-            strings.append(humanize_placeholders(entry.msgid))
-            if entry.msgid_plural:
-                strings.append(humanize_placeholders(entry.msgid_plural))
+        with metrics.timer('select_seconds'):
+            for index, entry in enumerate(po):
+                if not self.need_translate(entry):
+                    continue
+                # a translated entry would match its own translation in the fuzzy index
+                text = TranslatedText if self.fuzzy_match and entry.translated() else str
+                strings.append(text(self.protect(entry.msgid)[0]))
+                if entry.msgid_plural:
+                    strings.append(text(self.protect(entry.msgid_plural)[0]))
         return strings
 
     def update_translations(self, entries, translated_strings):
         """Update translations in entries.
 
-        The order and number of translations should match to get_strings_to_translate() result.
+        The order and number of translations should match to get_strings_to_translate() result,
+        the entries whose translations are None are left untouched.
 
         :param entries: list of entries to translate
         :type entries: collections.Iterable[polib.POEntry] | polib.POFile
         :param translated_strings: list of translations
         :type translated_strings: collections.Iterable[six.text_type]
+        :return: number of entries that have been modified
+        :rtype: int
         """
+        modified = 0
         translations = iter(translated_strings)
         for entry in entries:
             if not self.need_translate(entry):
                 continue
 
+            previous = (entry.msgstr, dict(entry.msgstr_plural), list(entry.flags))
+            translated = entry.translated()
+            # the token maps of the strings selected by get_strings_to_translate() (memoized by `protect()`)
+            tokens = self.protect(entry.msgid)[1]
+            plural_tokens = self.protect(entry.msgid_plural)[1] if entry.msgid_plural else ()
+
             if entry.msgid_plural:
+                translation, plural_translation = next(translations), next(translations)
+                if translation is None or plural_translation is None:
+                    continue
+                reused = isinstance(translation, FuzzyMatch) or isinstance(plural_translation, FuzzyMatch)
+                if reused and translated:
+                    continue
+
                 # fill the first plural form with the entry.msgid translation
-                translation = next(translations)
-                translation = fix_translation(entry.msgid, translation)
+                translation = fix_translation(entry.msgid, translation, tokens)
                 entry.msgstr_plural[0] = translation
 
                 # fill the rest of plural forms with the entry.msgid_plural translation
-                translation = next(translations)
-                translation = fix_translation(entry.msgid_plural, translation)
+                translation = fix_translation(entry.msgid_plural, plural_translation, plural_tokens)
                 for k, v in entry.msgstr_plural.items():
                     if k != 0:
                         entry.msgstr_plural[k] = translation
             else:
                 translation = next(translations)
-                translation = fix_translation(entry.msgid, translation)
+                if translation is None:
+                    continue
+                reused = isinstance(translation, FuzzyMatch)
+                if reused and translated:
+                    # the string is shared with an untranslated entry, the translation is kept
+                    continue
+                translation = fix_translation(entry.msgid, translation, tokens)
                 entry.msgstr = translation
 
-            # Set the 'fuzzy' flag on translation
-            if self.set_fuzzy and 'fuzzy' not in entry.flags:
+            # Set the 'fuzzy' flag on translation, on the translations reused from a similar message,
+            # or if the translator service broke some of the placeholders
+            broken = self.broken_placeholders(entry, tokens, plural_tokens)
+            if broken:
+                logger.warning('placeholders {} are missing from the translation of `{}`'.format(
+                    ', '.join(broken), entry.msgid))
+            if (self.set_fuzzy or reused or broken) and 'fuzzy' not in entry.flags:
                 entry.flags.append('fuzzy')
 
+            if previous != (entry.msgstr, entry.msgstr_plural, entry.flags):
+                modified += 1
+        return modified
+
+    def broken_placeholders(self, entry, tokens, plural_tokens=()):
+        """
+        :param tokens: token maps of the msgid and of the msgid_plural, returned by `protect`
+        """
+        if entry.msgid_plural:
+            broken = missing_placeholders(entry.msgstr_plural[0], tokens)
+            for k, v in entry.msgstr_plural.items():
+                if k != 0:
+                    return broken + missing_placeholders(v, plural_tokens)
+            return broken
+        return missing_placeholders(entry.msgstr, tokens)
+
+
+class TranslatedText(str):
+    """
+    The protected text of an entry that is translated already, it is translated again
+    by the translator service but never replaced with the translation of a similar message.
+    """
+
+
+def _setup_worker(processes=1):
+    # worker processes started with `spawn` don't inherit the initialized app registry
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    # the workers send their requests at the same time
+    share_rate_limits(processes)
+
+
+def _translate_files(options, target_language, files):
+    # the metrics of the worker are sent back to the parent process
+    metrics.reset()
+    command = Command()
+    command.set_options(**options)
+    records = command.translate_files(target_language, files)
+    return records, metrics.snapshot()
+
+
+def parse_shard(value):
+    """
+    Parses a `K/N` shard specification into a `(K, N)` tuple, 1 <= K <= N.
+    """
+    try:
+        index, count = [int(part) for part in value.split('/')]
+    except ValueError:
+        raise CommandError('--shard should be given as K/N, e.g. 1/4')
+    if not 1 <= index <= count:
+        raise CommandError('--shard K/N requires 1 <= K <= N')
+    return index, count
+
+
+def is_installed_package(path):
+    """
+    Returns True if the path is in one of the site-packages directories of the python installation.
+    """
+    directories = set(site.getsitepackages() + [site.getusersitepackages()])
+    directories.update(sysconfig.get_path(name) for name in ('purelib', 'platlib'))
+    path = os.path.realpath(path)
+    for directory in directories:
+        directory = os.path.realpath(directory)
+        if path == directory or path.startswith(directory + os.sep):
+            return True
+    return any(part in ('site-packages', 'dist-packages') for part in path.split(os.sep))
+
+
+def entry_weight(entry):
+    """Return the number of characters of the entry sent to the translator service."""
+    weight = len(protect(entry.msgid)[0])
+    if entry.msgid_plural:
+        weight += len(protect(entry.msgid_plural)[0])
+    return weight
+
+
+def merge_catalog(po, other):
+    """
+    Copies the translations of the entries of the `other` catalog
+    that differ from the ones of the catalog.
+
+    :return: number of entries of the catalog that have been modified
+    """
+    entries = {(entry.msgctxt, entry.msgid): entry for entry in po if not entry.obsolete}
+    modified = 0
+    for other_entry in other:
+        entry = entries.get((other_entry.msgctxt, other_entry.msgid))
+        if entry is None or other_entry.obsolete:
+            continue
+        if not (other_entry.msgstr or any(other_entry.msgstr_plural.values())):
+            continue
+        if (entry.msgstr, entry.msgstr_plural, entry.flags) != \
+                (other_entry.msgstr, other_entry.msgstr_plural, other_entry.flags):
+            entry.msgstr = other_entry.msgstr
+            entry.msgstr_plural = dict(other_entry.msgstr_plural)
+            entry.flags = list(other_entry.flags)
+            modified += 1
+    return modified
+
+
+def iter_entry_batches(entries, size):
+    """
+    Yields lists of entries holding about `size` strings to translate (the plural entries hold two).
+
+    :param entries: iterable of `(index, entry)` tuples
+    """
+    batch = []
+    strings = 0
+    for item in entries:
+        batch.append(item)
+        strings += 2 if item[1].msgid_plural else 1
+        if strings >= size:
+            yield batch
+            batch = []
+            strings = 0
+    if batch:
+        yield batch
+
+
+HUMANIZE_RE = re.compile(r'%(?:\((\w+)\))?([sd])')
+PLACEHOLDER_RE = re.compile(r'(\s*)(%(?:\(\w+\))?[sd])(\s*)')
+HUMANIZED_RE = re.compile(r'(\s*)(__[\w]+?__)(\s*)')
+
 
 def humanize_placeholders(msgid):
     """Convert placeholders to the (google translate) service friendly form.
@@ -165,33 +1187,22 @@ def humanize_placeholders(msgid):
     %(name)s -> __name__
     %s       -> __item__
     %d       -> __number__
+
+    The command protects the placeholders using `autotranslate.placeholders.protect` instead.
     """
-    return re.sub(
-        r'%(?:\((\w+)\))?([sd])',
+    return HUMANIZE_RE.sub(
         lambda match: r'__{0}__'.format(
             match.group(1).lower() if match.group(1) else 'number' if match.group(2) == 'd' else 'item'),
         msgid)
 
 
 def restore_placeholders(msgid, translation):
-    """Restore placeholders in the translated message."""
-    placehoders = re.findall(r'(\s*)(%(?:\(\w+\))?[sd])(\s*)', msgid)
-    return re.sub(
-        r'(\s*)(__[\w]+?__)(\s*)',
-        lambda matches: '{0}{1}{2}'.format(placehoders[0][0], placehoders[0][1], placehoders.pop(0)[2]),
-        translation)
-
-
-def fix_translation(msgid, translation):
-    # Google Translate removes a lot of formatting, these are the fixes:
-    # - Add newline in the beginning if msgid also has that
-    if msgid.startswith('\n') and not translation.startswith('\n'):
-        translation = u'\n' + translation
-
-    # - Add newline at the end if msgid also has that
-    if msgid.endswith('\n') and not translation.endswith('\n'):
-        translation += u'\n'
-
-    # Remove spaces that have been placed between %(id) tags
-    translation = restore_placeholders(msgid, translation)
-    return translation
+    """Restore the humanized placeholders in the translated message."""
+    placeholders = iter(PLACEHOLDER_RE.findall(msgid))
+
+    def replace(match):
+        placeholder = next(placeholders, None)
+        return match.group() if placeholder is None else '{0}{1}{2}'.format(*placeholder)
+
+    return HUMANIZED_RE.sub(replace, translation)
+
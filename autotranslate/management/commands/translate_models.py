@@ -0,0 +1,128 @@
+import logging
+from optparse import make_option
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.core.management.base import BaseCommand, CommandError
+
+from autotranslate.bulk import translate_queryset
+from autotranslate.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+default_options = () if not hasattr(BaseCommand, 'option_list') \
+    else BaseCommand.option_list
+
+
+class Command(BaseCommand):
+    help = ('autotranslate the fields of a model into per-language fields '
+            '(e.g. `name` into `name_de`, `name_fr`, ...), see `autotranslate.bulk.translate_queryset`.')
+
+    option_list = default_options + (
+        make_option('--model', '-m', default=None, dest='model', action='store',
+                    help='the model to translate, as app_label.ModelName.'),
+        make_option('--field', default=[], dest='fields', action='append',
+                    help='a field holding the source values. can be used multiple times.'),
+        make_option('--language', '-l', default=[], dest='languages', action='append',
+                    help='a target language (default: the LANGUAGES the model has fields for). '
+                         'can be used multiple times.'),
+        make_option('--source-language', '-s', default='en', dest='source_language', action='store',
+                    help='override the default source language (en) used for translation.'),
+        make_option('--target-field', default='{field}_{language}', dest='target_field', action='store',
+                    help='name of the fields holding the translations (default: {field}_{language}).'),
+        make_option('--hash-field', default=None, dest='hash_field', action='store',
+                    help='name of the fields holding the hash of the translated source values, one per language '
+                         '(e.g. {field}_{language}_hash), the translations of the changed values are updated.'),
+        make_option('--chunk-size', default=500, dest='chunk_size', type='int', action='store',
+                    help='number of rows translated and updated at once (default: 500).'),
+        make_option('--overwrite', default=False, dest='overwrite', action='store_true',
+                    help='translate all the values again, even the ones that have been translated already.'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', '-m', default=None, dest='model', action='store',
+                            help='the model to translate, as app_label.ModelName.')
+        parser.add_argument('--field', default=[], dest='fields', action='append',
+                            help='a field holding the source values. can be used multiple times.')
+        parser.add_argument('--language', '-l', default=[], dest='languages', action='append',
+                            help='a target language (default: the LANGUAGES the model has fields for). '
+                                 'can be used multiple times.')
+        parser.add_argument('--source-language', '-s', default='en', dest='source_language', action='store',
+                            help='override the default source language (en) used for translation.')
+        parser.add_argument('--target-field', default='{field}_{language}', dest='target_field', action='store',
+                            help='name of the fields holding the translations (default: {field}_{language}).')
+        parser.add_argument('--hash-field', default=None, dest='hash_field', action='store',
+                            help='name of the fields holding the hash of the translated source values, one per '
+                                 'language (e.g. {field}_{language}_hash), the translations of the changed '
+                                 'values are updated.')
+        parser.add_argument('--chunk-size', default=500, dest='chunk_size', type=int, action='store',
+                            help='number of rows translated and updated at once (default: 500).')
+        parser.add_argument('--overwrite', default=False, dest='overwrite', action='store_true',
+                            help='translate all the values again, even the ones that have been translated already.')
+
+    def handle(self, *args, **options):
+        if not options.get('model') or not options.get('fields'):
+            raise CommandError('--model and --field are required')
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(str(e))
+        if options.get('chunk_size', 500) < 1:
+            raise CommandError('--chunk-size should be a positive number')
+        if options.get('hash_field') and '{language}' not in options['hash_field']:
+            raise CommandError('--hash-field should name a field per language, e.g. {field}_{language}_hash')
+
+        missing = [field for field in options['fields'] if not has_field(model, field)]
+        if missing:
+            raise CommandError('`{}` has no field {}'.format(options['model'], ', '.join(missing)))
+
+        source_language = options.get('source_language', 'en')
+        if options.get('languages'):
+            languages = options['languages']
+            missing = [field for language in languages for field in get_fields(language, options)
+                       if not has_field(model, field)]
+            if missing:
+                raise CommandError('`{}` has no field {}'.format(options['model'], ', '.join(missing)))
+        else:
+            # the languages of the LANGUAGES setting the model has fields for
+            languages = [code for code, name in settings.LANGUAGES
+                         if code.split('-')[0] != source_language.split('-')[0] and
+                         all(has_field(model, field) for field in get_fields(code, options))]
+            if not languages:
+                raise CommandError('`{}` has no fields for the translations into the LANGUAGES, '
+                                   'see --language and --target-field'.format(options['model']))
+
+        metrics.reset()
+        stats = translate_queryset(
+            model._default_manager.order_by('pk'), options['fields'], languages,
+            source_language=source_language,
+            target_field=options.get('target_field', '{field}_{language}'),
+            hash_field=options.get('hash_field'),
+            chunk_size=options.get('chunk_size', 500),
+            overwrite=options.get('overwrite', False),
+        )
+        logger.info('translated {} values of {} rows of `{}`, {} rows updated'.format(
+            stats['translated'], stats['rows'], options['model'], stats['updated']))
+
+
+def has_field(model, name):
+    try:
+        model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+def get_fields(language, options):
+    """
+    Returns the names of the fields holding the translations of the fields into the language,
+    and the hashes of their source values.
+    """
+    language = language.replace('-', '_')
+    names = []
+    for field in options['fields']:
+        names.append(options.get('target_field', '{field}_{language}').format(field=field, language=language))
+        if options.get('hash_field'):
+            names.append(options['hash_field'].format(field=field, language=language))
+    return names
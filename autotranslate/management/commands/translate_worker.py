@@ -0,0 +1,134 @@
+import logging
+import os
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from autotranslate.jobs import JobQueue
+from autotranslate.management.commands.translate_messages import Command as TranslateCommand
+from autotranslate.utils import get_translator
+
+logger = logging.getLogger(__name__)
+
+default_options = () if not hasattr(BaseCommand, 'option_list') \
+    else BaseCommand.option_list
+
+
+class Command(BaseCommand):
+    help = ('run a worker autotranslating the message files of the jobs queued in the job queue, '
+            'see `autotranslate.jobs.JobQueue`. the rate limits of the services (AUTOTRANSLATE_SERVICE_LIMITS) '
+            'apply to every worker.')
+
+    option_list = default_options + (
+        make_option('--queue', default=None, dest='queue', action='store',
+                    help='path of the job queue '
+                         '(default: AUTOTRANSLATE_QUEUE_PATH or .autotranslate-queue.sqlite3).'),
+        make_option('--enqueue', default=[], dest='enqueue', action='append',
+                    help='queue a job translating the given message file and exit. can be used multiple times.'),
+        make_option('--once', default=False, dest='once', action='store_true',
+                    help='exit once the queue is empty, instead of waiting for new jobs.'),
+        make_option('--poll-interval', default=1.0, dest='poll_interval', type='float', action='store',
+                    help='seconds to wait before polling an empty queue again (default: 1).'),
+        make_option('--no-compile', default=True, dest='compile', action='store_false',
+                    help='do not write the .mo files of the modified message files.'),
+        make_option('--fast-catalog', default=False, dest='fast_catalog', action='store_true',
+                    help='read and write the message files with autotranslate.catalog instead of polib.'),
+        make_option('--untranslated', '-u', default=False, dest='skip_translated', action='store_true',
+                    help='autotranslate the fuzzy and empty messages only.'),
+        make_option('--set-fuzzy', '-f', default=False, dest='set_fuzzy', action='store_true',
+                    help='set the fuzzy flag on autotranslated messages.'),
+        make_option('--source-language', '-s', default='en', dest='source_language', action='store',
+                    help='override the default source language (en) used for translation.'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', default=None, dest='queue', action='store',
+                            help='path of the job queue '
+                                 '(default: AUTOTRANSLATE_QUEUE_PATH or .autotranslate-queue.sqlite3).')
+        parser.add_argument('--enqueue', default=[], dest='enqueue', action='append',
+                            help='queue a job translating the given message file and exit. '
+                                 'can be used multiple times.')
+        parser.add_argument('--once', default=False, dest='once', action='store_true',
+                            help='exit once the queue is empty, instead of waiting for new jobs.')
+        parser.add_argument('--poll-interval', default=1.0, dest='poll_interval', type=float, action='store',
+                            help='seconds to wait before polling an empty queue again (default: 1).')
+        parser.add_argument('--no-compile', default=True, dest='compile', action='store_false',
+                            help='do not write the .mo files of the modified message files.')
+        parser.add_argument('--fast-catalog', default=False, dest='fast_catalog', action='store_true',
+                            help='read and write the message files with autotranslate.catalog instead of polib.')
+        parser.add_argument('--untranslated', '-u', default=False, dest='skip_translated', action='store_true',
+                            help='autotranslate the fuzzy and empty messages only.')
+        parser.add_argument('--set-fuzzy', '-f', default=False, dest='set_fuzzy', action='store_true',
+                            help='set the fuzzy flag on autotranslated messages.')
+        parser.add_argument('--source-language', '-s', default='en', dest='source_language', action='store',
+                            help='override the default source language (en) used for translation.')
+
+    def handle(self, *args, **options):
+        path = options.get('queue') or getattr(settings, 'AUTOTRANSLATE_QUEUE_PATH', '.autotranslate-queue.sqlite3')
+        if options.get('poll_interval', 1.0) <= 0:
+            raise CommandError('--poll-interval should be a positive number')
+        self.queue = JobQueue(path)
+        try:
+            if options.get('enqueue'):
+                job = self.queue.put(paths=[os.path.abspath(p) for p in options['enqueue']])
+                logger.info('queued job {}'.format(job))
+                return
+            self.serve(options)
+        finally:
+            self.queue.close()
+
+    def serve(self, options):
+        """
+        Runs the jobs of the queue until it is empty (`once`) or the worker is interrupted.
+        The translator service and its translation memory are constructed once, and reused by all the jobs.
+        """
+        get_translator()
+        logger.info('waiting for jobs in `{}`'.format(self.queue.path))
+        try:
+            while True:
+                job = self.queue.get()
+                if job is None:
+                    if options.get('once'):
+                        return
+                    time.sleep(options.get('poll_interval', 1.0))
+                    continue
+                try:
+                    # the lease is renewed while the job runs, so no other worker claims it
+                    with self.queue.heartbeat(job):
+                        self.run_job(job, options)
+                except Exception as e:
+                    logger.exception('job {} failed'.format(job.id))
+                    self.queue.failed(job, '{}: {}'.format(e.__class__.__name__, e))
+                else:
+                    self.queue.done(job)
+        except KeyboardInterrupt:
+            logger.info('stopped')
+
+    def run_job(self, job, options):
+        command = TranslateCommand()
+        command.set_options(
+            locale=job.locale,
+            skip_translated=options.get('skip_translated', False),
+            set_fuzzy=options.get('set_fuzzy', False),
+            source_language=options.get('source_language', 'en'),
+            dedupe=True,
+            msgids=set(job.msgids) if job.msgids else None,
+            compile=options.get('compile', True),
+            fast_catalog=options.get('fast_catalog', False),
+        )
+        if job.paths:
+            # <locale>/LC_MESSAGES/<domain>.po
+            files = [(os.path.dirname(path), os.path.basename(path),
+                      os.path.basename(os.path.dirname(os.path.dirname(path))))
+                     for path in job.paths]
+            files = [(root, file_name, language) for root, file_name, language in files
+                     if not job.locale or language in job.locale]
+        else:
+            files = command.find_files()
+
+        for target_language, task_files in command.plan(files):
+            command.translate_files(target_language, task_files)
+            command.log_translated(target_language, task_files)
+        logger.info('job {} done'.format(job.id))
@@ -0,0 +1,94 @@
+"""
+The manifest remembers the state of every message file after the last successful run,
+so that the incremental mode can skip the files and entries that haven't changed since.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from autotranslate.utils import atomic_write
+
+
+def hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_entry(entry):
+    """
+    Returns a short hash identifying the source text of a POEntry.
+    """
+    value = u'{}\x04{}\x00{}'.format(entry.msgctxt or '', entry.msgid, entry.msgid_plural or '')
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()[:16]
+
+
+class Manifest:
+    """
+    Maps the path of every message file to its mtime, size, content hash
+    and the hashes of the entries it contained.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.files = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.files = json.load(f).get('files', {})
+
+    @staticmethod
+    def key(path):
+        return os.path.abspath(path)
+
+    def is_unchanged(self, path):
+        """
+        Returns True if the file is in the same state as it was left by the last run.
+        The content is hashed only when the mtime or size differ.
+        """
+        record = self.files.get(self.key(path))
+        if record is None:
+            return False
+
+        stat = os.stat(path)
+        if stat.st_mtime == record['mtime'] and stat.st_size == record['size']:
+            return True
+        if stat.st_size == record['size'] and hash_file(path) == record['sha1']:
+            # only touched, keep the new mtime to avoid hashing it again
+            with self._lock:
+                record['mtime'] = stat.st_mtime
+            return True
+        return False
+
+    def known_entries(self, path):
+        """
+        Returns the set of entry hashes recorded for the file.
+        """
+        record = self.files.get(self.key(path))
+        return set(record['entries']) if record else set()
+
+    @staticmethod
+    def make_record(path, entries):
+        stat = os.stat(path)
+        return {
+            'mtime': stat.st_mtime,
+            'size': stat.st_size,
+            'sha1': hash_file(path),
+            'entries': sorted(hash_entry(entry) for entry in entries if not entry.obsolete),
+        }
+
+    def update(self, records):
+        """
+        :param records: dict mapping file paths to the records returned by `make_record`
+        """
+        with self._lock:
+            for path, record in records.items():
+                self.files[self.key(path)] = record
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({'files': self.files}, indent=1, sort_keys=True)
+        atomic_write(self.path, data)
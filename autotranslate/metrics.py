@@ -0,0 +1,148 @@
+"""
+Process-wide instrumentation of the translation pipeline: counters and latency histograms,
+exported as JSON or in the Prometheus text format (for the node exporter's textfile collector).
+"""
+import contextlib
+import json
+import threading
+import time
+
+# upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float('inf'))
+
+PREFIX = 'autotranslate_'
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters and histograms, identified by a name and optional labels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+            # every histogram is a list of the bucket counts, followed by the count and the sum
+            self.histograms = {}
+
+    def incr(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            histogram[-2] += 1
+            histogram[-1] += seconds
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """
+        Observes the time spent in the block into the histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """
+        Returns a picklable copy of the metrics, e.g. to send them from a worker process.
+        """
+        with self._lock:
+            return dict(self.counters), {key: list(value) for key, value in self.histograms.items()}
+
+    def merge(self, snapshot):
+        counters, histograms = snapshot
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, value in histograms.items():
+                histogram = self.histograms.setdefault(key, [0] * len(value))
+                for i, v in enumerate(value):
+                    histogram[i] += v
+
+    def counter(self, name, **labels):
+        """
+        Returns the value of a counter; without labels, the sum over all the labels.
+        """
+        with self._lock:
+            if labels:
+                return self.counters.get(_key(name, labels), 0)
+            return sum(value for (key, _), value in self.counters.items() if key == name)
+
+    def as_dict(self):
+        counters, histograms = self.snapshot()
+        return {
+            'counters': [
+                {'name': PREFIX + name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            'histograms': [
+                {
+                    'name': PREFIX + name,
+                    'labels': dict(labels),
+                    'count': histogram[-2],
+                    'sum': histogram[-1],
+                    'buckets': {str(bound): count for bound, count in zip(BUCKETS, _cumulative(histogram))},
+                }
+                for (name, labels), histogram in sorted(histograms.items())
+            ],
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        counters, histograms = self.snapshot()
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(counters.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE {}{} counter'.format(PREFIX, name))
+            lines.append('{}{}{} {}'.format(PREFIX, name, _format_labels(labels), value))
+        for (name, labels), histogram in sorted(histograms.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append('# TYPE {}{} histogram'.format(PREFIX, name))
+            for bound, count in zip(BUCKETS, _cumulative(histogram)):
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('{}{}_bucket{} {}'.format(PREFIX, name, _format_labels(labels + (('le', le),)), count))
+            lines.append('{}{}_count{} {}'.format(PREFIX, name, _format_labels(labels), histogram[-2]))
+            lines.append('{}{}_sum{} {}'.format(PREFIX, name, _format_labels(labels), histogram[-1]))
+        return '\n'.join(lines) + '\n'
+
+
+def _cumulative(histogram):
+    total = 0
+    for count in histogram[:len(BUCKETS)]:
+        total += count
+        yield total
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{{{}}}'.format(','.join('{}="{}"'.format(
+        name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')) for name, value in labels))
+
+
+# the metrics of the current process
+metrics = Metrics()
@@ -0,0 +1,131 @@
+"""
+Protects the placeholders and markup of the messages from the translator services.
+
+Every python format specifier (`%(name).2f`, `%s`, `{name}`, `{0:>10}`, ...), HTML tag and entity
+is replaced with a numbered token (`__0__`, `__1__`, ...) in a single pass, the tokens map back to
+the original text once the message has been translated. The space flag of printf (`% d`) is not
+supported, it would take the literal percent signs of the text (`50% off`) for placeholders.
+"""
+import re
+
+PLACEHOLDER_RE = re.compile(r"""
+    %(?:\(\w+\))?[#0+\-]*(?:\*|\d+)?(?:\.(?:\*|\d+))?[hlL]?[diouxXeEfFgGcrsa%]    # printf style
+    | \{\{ | \}\}                                                                # escaped braces
+    | \{[^{}\s]*\}                                                               # str.format style
+    | </?[a-zA-Z][^<>]*>                                                         # html tags
+    | &(?:[a-zA-Z][a-zA-Z0-9]*|\#[0-9]+|\#[xX][0-9a-fA-F]+);                     # html entities
+""", re.VERBOSE)
+
+TOKEN_RE = re.compile(r'(\s*)__\s*(\d+)\s*__(\s*)')
+TOKEN_FORMAT = '__{}__'
+
+WHITESPACE_RE = re.compile(r'\s*')
+
+
+def protect(text):
+    """
+    Replaces the placeholders in the text with numbered tokens.
+
+    :return: tuple of the protected text and the token map, a tuple holding
+             the `(placeholder, whitespace_before, whitespace_after)` of every token,
+             the whitespace is None at the start and the end of the text
+    """
+    tokens = []
+
+    def replace(match):
+        start, end = match.span()
+        first = start
+        while first > 0 and text[first - 1].isspace():
+            first -= 1
+        before = text[first:start] if first else None
+        after = WHITESPACE_RE.match(text, end).group()
+        if end + len(after) == len(text):
+            after = None
+        tokens.append((match.group(), before, after))
+        return TOKEN_FORMAT.format(len(tokens) - 1)
+
+    protected = PLACEHOLDER_RE.sub(replace, text)
+    return protected, tuple(tokens)
+
+
+def restore(translation, tokens):
+    """
+    Replaces the tokens in the translation with the placeholders they stand for.
+    The whitespace around a token is restored as it was around the placeholder,
+    the translator services tend to add or eat spaces around the tokens.
+
+    :param tokens: token map returned by `protect`
+    """
+    if not tokens:
+        return translation
+
+    # end and restored trailing whitespace of the previous token
+    previous = [-1, '']
+
+    def replace(match):
+        index = int(match.group(2))
+        if index >= len(tokens):
+            return match.group()
+        placeholder, before, after = tokens[index]
+        # keep the whitespace at the ends of the translation (it's handled by the caller),
+        # and next to the placeholders that were at the ends of the message
+        if match.start() == 0 or before is None:
+            before = match.group(1)
+        # the whitespace between two tokens has already been restored after the previous one
+        if match.start() == previous[0] and previous[1]:
+            before = ''
+        if match.end() == len(translation) or after is None:
+            after = match.group(3)
+        previous[:] = [match.end(), after]
+        return before + placeholder + after
+
+    return TOKEN_RE.sub(replace, translation)
+
+
+def protect_translation(translation, tokens):
+    """
+    Replaces the placeholders of a translation with the tokens they have in the token map
+    of its source text, e.g. to reuse the translation of a similar message.
+
+    :param tokens: token map returned by `protect` for the source text
+    """
+    if not tokens:
+        return translation
+    unused = list(enumerate(placeholder for placeholder, before, after in tokens))
+
+    def replace(match):
+        for i, (index, placeholder) in enumerate(unused):
+            if placeholder == match.group():
+                del unused[i]
+                return TOKEN_FORMAT.format(index)
+        return match.group()
+
+    return PLACEHOLDER_RE.sub(replace, translation)
+
+
+def missing_placeholders(text, tokens):
+    """
+    Returns the placeholders of the token map that are missing from the restored text.
+    """
+    return [placeholder for placeholder, before, after in tokens if placeholder not in text]
+
+
+def fix_translation(msgid, translation, tokens=None):
+    """
+    Fixes the formatting of the translation of the message, restoring its tokens.
+
+    :param tokens: token map returned by `protect` for the message, computed again if None
+    """
+    # Google Translate removes a lot of formatting, these are the fixes:
+    # - Add newline in the beginning if msgid also has that
+    if msgid.startswith('\n') and not translation.startswith('\n'):
+        translation = u'\n' + translation
+
+    # - Add newline at the end if msgid also has that
+    if msgid.endswith('\n') and not translation.endswith('\n'):
+        translation += u'\n'
+
+    # Restore the placeholders protected by `protect`,
+    # along with the spaces that have been placed around them
+    translation = restore(translation, protect(msgid)[1] if tokens is None else tokens)
+    return translation
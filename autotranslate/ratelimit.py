@@ -0,0 +1,111 @@
+"""
+Rate limiting and retrying of the requests sent to the translator services.
+"""
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `rate` tokens per second, holding at most `capacity` tokens.
+
+    Acquiring more tokens than the capacity is allowed, the bucket then goes into debt
+    and the following callers wait until it is paid off.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        assert rate > 0, '`rate` should be a positive number'
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Blocks until the tokens are available, returns the number of seconds waited.
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # take the tokens right away and let the caller wait for the deficit,
+            # so the callers are served in order
+            needed = min(tokens, self.capacity)
+            wait = max(0.0, (needed - self.tokens) / self.rate)
+            self.tokens -= tokens
+
+        if wait:
+            self.sleep(wait)
+        return wait
+
+
+class RateLimiter:
+    """
+    Limits both the number of requests and the number of characters sent per second.
+    """
+
+    def __init__(self, requests_per_second=None, characters_per_second=None):
+        self.requests = TokenBucket(requests_per_second) if requests_per_second else None
+        self.characters = TokenBucket(characters_per_second) if characters_per_second else None
+
+    def acquire(self, characters=0):
+        waited = 0
+        if self.requests is not None:
+            waited += self.requests.acquire(1)
+        if self.characters is not None and characters:
+            waited += self.characters.acquire(characters)
+        return waited
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key, requests_per_second=None, characters_per_second=None):
+    """
+    Returns the rate limiter shared by all the callers using the same key and rates.
+    """
+    key = (key, requests_per_second, characters_per_second)
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(requests_per_second, characters_per_second)
+        return _limiters[key]
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """
+    Returns the delay before the given retry attempt (starting at 0), exponential with full jitter.
+    """
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retries(func, is_retryable, max_retries=5, base_delay=0.5, max_delay=30.0,
+                      on_retry=None, sleep=time.sleep):
+    """
+    Calls `func` and retries it up to `max_retries` times as long as the raised exception is retryable.
+
+    :param func: callable without arguments
+    :param is_retryable: callable receiving the exception, returns True if the call may be retried
+    :param on_retry: optional callable receiving the exception and the retry attempt
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            logger.warning('request failed ({}: {}), retrying in {:.2f}s'.format(e.__class__.__name__, e, delay))
+            if on_retry is not None:
+                on_retry(e, attempt)
+            sleep(delay)
+            attempt += 1
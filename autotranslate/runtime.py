@@ -0,0 +1,309 @@
+"""
+Runtime translation of the messages missing from the message files.
+
+The runtime translator wraps django's `gettext` and `ngettext`: a message that is not
+in the message files of the active language is returned untranslated, and translated in
+the background by the configured translator service. The translations are kept in
+an in-process LRU, backed by a django cache shared by all the processes, so the
+following lookups return them. A lookup never waits for the translator service
+nor the django cache.
+
+The `flush_translations` command writes the translations learned at runtime
+into the message files.
+
+Enable it with the `AUTOTRANSLATE_RUNTIME` setting, or call `install()`. It is installed in the web
+and worker processes only, not in the management commands but the ones of `AUTOTRANSLATE_RUNTIME_COMMANDS`.
+
+django doesn't provide a hook into `gettext`, the runtime translator replaces the functions of the
+private `django.utils.translation._trans` object, which every django version from 2.0 to 5.2 delegates
+to; `install()` refuses to patch any other implementation.
+"""
+import collections
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+import warnings
+
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import translation
+
+from autotranslate.cache import DjangoTranslationCache
+from autotranslate.metrics import metrics
+from autotranslate.placeholders import fix_translation, protect
+
+logger = logging.getLogger(__name__)
+
+# the django versions the runtime translator has been tested with, see `install()`
+SUPPORTED_DJANGO_VERSIONS = ((2, 0), (5, 2))
+
+
+class RuntimeTranslator:
+    """
+    Translates the messages missing from the message files in the background.
+
+    :param store: translation memory shared by the processes, by default
+                  the `default` django cache (see `AUTOTRANSLATE_RUNTIME_OPTIONS`)
+    :param max_entries: number of translations kept in memory per language
+    :param batch_size: maximum number of messages sent to the translator service at once
+    :param queue_size: maximum number of messages waiting for a translation,
+                       the messages missed while the queue is full are dropped
+    :param source_language: language of the messages, never translated
+    :param failure_cooldown: seconds during which a message that failed to be translated isn't requested again,
+                             doubled after every consecutive failure
+    :param max_failure_cooldown: maximum of the seconds above
+    """
+
+    def __init__(self, store=None, max_entries=10000, batch_size=50, queue_size=1000, source_language=None,
+                 failure_cooldown=60.0, max_failure_cooldown=3600.0, clock=time.monotonic):
+        self.store = store if store is not None else DjangoTranslationCache(key_prefix='autotranslate-runtime')
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.source_language = source_language or 'en'
+        self.failure_cooldown = failure_cooldown
+        self.max_failure_cooldown = max_failure_cooldown
+        self.clock = clock
+        # language code -> locale name, e.g. `pt-br` -> `pt_BR` (the names of the locale directories)
+        # or an empty string for the source language
+        self._locales = {}
+        # locale name -> OrderedDict of the translations, the least recently used first
+        self._memory = {}
+        self._pending = set()
+        # (locale, message) -> (number of consecutive failures, time until which it isn't requested),
+        # the least recently failed first
+        self._failed = collections.OrderedDict()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._gettext = self._ngettext = None
+
+    def install(self):
+        """
+        Replaces django's `gettext` and `ngettext` (and their lazy versions) with the runtime translator.
+        """
+        trans = getattr(translation, '_trans', None)
+        if trans is None or not callable(getattr(trans, 'gettext', None)) or \
+                not callable(getattr(trans, 'ngettext', None)):
+            raise ImproperlyConfigured('the runtime translator does not support django {}: '
+                                       '`django.utils.translation._trans` has no `gettext` and `ngettext`'.format(
+                                           django.get_version()))
+        if not SUPPORTED_DJANGO_VERSIONS[0] <= django.VERSION[:2] <= SUPPORTED_DJANGO_VERSIONS[1]:
+            warnings.warn('the runtime translator has not been tested with django {}'.format(django.get_version()),
+                          RuntimeWarning)
+        self._gettext, self._ngettext = trans.gettext, trans.ngettext
+        trans.gettext, trans.ngettext = self.gettext, self.ngettext
+
+    def uninstall(self):
+        trans = translation._trans
+        trans.gettext, trans.ngettext = self._gettext, self._ngettext
+
+    def gettext(self, message):
+        translated = self._gettext(message)
+        if translated is not message and translated != message:
+            return translated
+        return self.lookup(message, translated)
+
+    def ngettext(self, singular, plural, number):
+        translated = self._ngettext(singular, plural, number)
+        if translated != singular and translated != plural:
+            return translated
+        return self.lookup(singular if number == 1 else plural, translated)
+
+    def lookup(self, message, default):
+        """
+        Returns the translation of the message into the active language if it is known,
+        the default otherwise; the unknown translations are requested in the background.
+        """
+        language = translation.get_language()
+        if language is None:
+            return default
+        locale = self._locales.get(language)
+        if locale is None:
+            locale = self._locales[language] = self.get_locale(language)
+        if not locale:
+            return default
+
+        memory = self._memory.get(locale)
+        if memory is not None:
+            translated = memory.get(message)
+            if translated is not None:
+                try:
+                    memory.move_to_end(message)
+                except KeyError:
+                    # evicted by `remember()` in the meantime
+                    pass
+                return translated
+
+        self.request(locale, message)
+        return default
+
+    def get_locale(self, language):
+        """
+        Returns the locale name of the language code, or an empty string for the source language.
+        """
+        locale = translation.to_locale(language)
+        if locale.split('_')[0] == self.source_language.split('_')[0]:
+            return ''
+        return locale
+
+    def request(self, locale, message):
+        """
+        Queues the message to be translated in the background, unless it is queued already
+        or it failed to be translated recently.
+        """
+        key = (locale, message)
+        with self._lock:
+            if key in self._pending:
+                return
+            failed = self._failed.get(key)
+            if failed is not None and failed[1] > self.clock():
+                return
+            try:
+                self._queue.put_nowait(key)
+            except queue.Full:
+                metrics.incr('runtime_dropped_total')
+                return
+            self._pending.add(key)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='autotranslate-runtime', daemon=True)
+                self._thread.start()
+
+    def remember(self, locale, translations):
+        with self._lock:
+            memory = self._memory.setdefault(locale, collections.OrderedDict())
+            memory.update(translations)
+            while len(memory) > self.max_entries:
+                memory.popitem(last=False)
+
+    def failed(self, locale, messages):
+        """
+        Backs off the messages that failed to be translated, they aren't requested again for a while.
+        """
+        metrics.incr('runtime_errors_total', len(messages))
+        with self._lock:
+            now = self.clock()
+            for message in messages:
+                key = (locale, message)
+                failures = self._failed.pop(key, (0, 0.0))[0] + 1
+                cooldown = min(self.failure_cooldown * 2 ** (failures - 1), self.max_failure_cooldown)
+                self._failed[key] = (failures, now + cooldown)
+            while len(self._failed) > self.max_entries:
+                self._failed.popitem(last=False)
+
+    def join(self):
+        """
+        Blocks until the queued messages have been translated, e.g. in tests.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                by_locale = collections.OrderedDict()
+                for locale, message in batch:
+                    by_locale.setdefault(locale, []).append(message)
+                for locale, messages in by_locale.items():
+                    try:
+                        self.resolve(locale, messages)
+                    except Exception:
+                        logger.exception('runtime translation into `{}` failed'.format(locale))
+                        self.failed(locale, messages)
+            finally:
+                with self._lock:
+                    self._pending.difference_update(batch)
+                for _ in batch:
+                    self._queue.task_done()
+
+    def resolve(self, locale, messages):
+        """
+        Translates the messages, looking them up in the store first.
+        """
+        from autotranslate.utils import get_translator, unique
+
+        strings = [protect(message)[0] for message in messages]
+        translations = self.store.get_many(strings, locale, self.source_language)
+        missing = unique(s for s in strings if s not in translations)
+        if missing:
+            tl = get_translator()
+            with tl.concurrency(), metrics.timer('runtime_translate_seconds'):
+                translated = dict(zip(missing, tl.translate_strings(missing, locale, self.source_language, False)))
+            self.store.set_many(translated, locale, self.source_language)
+            translations.update(translated)
+            metrics.incr('runtime_strings_total', len(missing))
+
+        self.remember(locale, {message: fix_translation(message, translations[string])
+                               for message, string in zip(messages, strings) if string in translations})
+        with self._lock:
+            for message in messages:
+                self._failed.pop((locale, message), None)
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime_translator():
+    """
+    Returns the runtime translator of the process, configured by the `AUTOTRANSLATE_RUNTIME_OPTIONS` setting.
+    """
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                options = dict(getattr(settings, 'AUTOTRANSLATE_RUNTIME_OPTIONS', {}))
+                store = get_runtime_store(options.pop('cache_alias', 'default'), options.pop('timeout', None))
+                _runtime = RuntimeTranslator(store, **options)
+    return _runtime
+
+
+def get_runtime_store(cache_alias=None, timeout=None):
+    """
+    Returns the store of the translations learned at runtime.
+    """
+    if cache_alias is None:
+        cache_alias = getattr(settings, 'AUTOTRANSLATE_RUNTIME_OPTIONS', {}).get('cache_alias', 'default')
+    return DjangoTranslationCache(cache_alias, timeout=timeout, key_prefix='autotranslate-runtime')
+
+
+def get_management_command(argv=None):
+    """
+    Returns the name of the management command run by the process, or None outside of `manage.py`.
+    """
+    argv = sys.argv if argv is None else argv
+    if not argv:
+        return None
+    program = os.path.basename(argv[0])
+    if program in ('manage.py', 'django-admin', 'django-admin.py') or \
+            (program == '__main__.py' and os.path.basename(os.path.dirname(argv[0])) == 'django'):
+        return argv[1] if len(argv) > 1 else 'help'
+    return None
+
+
+def is_runtime_process(argv=None):
+    """
+    Returns True if the runtime translator should be installed in the process: the web and worker processes,
+    and the management commands of the `AUTOTRANSLATE_RUNTIME_COMMANDS` setting (by default `runserver`).
+    """
+    command = get_management_command(argv)
+    return command is None or command in getattr(settings, 'AUTOTRANSLATE_RUNTIME_COMMANDS', ('runserver',))
+
+
+def install():
+    """
+    Installs the runtime translator of the process in place of django's gettext.
+    """
+    runtime = get_runtime_translator()
+    if translation._trans.__dict__.get('gettext') != runtime.gettext:
+        runtime.install()
+    return runtime
@@ -1,15 +1,162 @@
+import asyncio
 import collections
+import contextlib
+import contextvars
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import six
-from autotranslate.compat import googletrans, googleapiclient, boto3
+from autotranslate.batching import iter_batches, translate_in_batches
+from autotranslate import compat
+from autotranslate.metrics import metrics
+from autotranslate.ratelimit import call_with_retries, get_rate_limiter
 
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
+_semaphores = {}
+_semaphores_lock = threading.Lock()
+_executors_lock = threading.Lock()
+
+# the rate limits are enforced per process, the processes started together split them, see `share_rate_limits()`
+_rate_share = 1
+
+# caps the retries of the requests sent in the current context, see `limit_retries()`
+_max_retries = contextvars.ContextVar('autotranslate_max_retries', default=None)
+
+
+SERVICE_LIMITS = ('max_concurrency', 'max_segments', 'max_characters', 'max_bytes',
+                  'requests_per_second', 'characters_per_second',
+                  'max_retries', 'retry_base_delay', 'retry_max_delay',
+                  'characters_quota', 'timeout')
+
+
+def share_rate_limits(processes):
+    """
+    Splits the `requests_per_second` and `characters_per_second` limits of the services across the
+    given number of processes sending requests at the same time, the current process keeps its share.
+    """
+    global _rate_share
+    assert processes >= 1, 'the rate limits are shared by one process at least'
+    _rate_share = processes
+
+
+@contextlib.contextmanager
+def limit_retries(max_retries):
+    """
+    Caps the retries of the failed requests sent in the context, e.g. when another service may be tried instead.
+    """
+    token = _max_retries.set(max_retries)
+    try:
+        yield
+    finally:
+        _max_retries.reset(token)
+
+
+def get_service_limits(service):
+    """
+    Returns the limits configured for the given translator service (class or instance),
+    the `AUTOTRANSLATE_SERVICE_LIMITS` setting takes precedence over the attributes of the service.
+
+    :param service: translator service class or instance
+    :return: dict with the limits, e.g. `{'max_concurrency': 4, 'max_segments': 128, ...}`
+    """
+    service_class = service if isinstance(service, type) else type(service)
+    path = '{}.{}'.format(service_class.__module__, service_class.__name__)
+    configured = getattr(settings, 'AUTOTRANSLATE_SERVICE_LIMITS', {})
+    limits = configured.get(path, configured.get(service_class.__name__, {}))
+    return {name: limits.get(name, getattr(service, name)) for name in SERVICE_LIMITS}
+
 
 class BaseTranslatorService:
     """
     Defines the base methods that should be implemented
     """
 
+    # maximum number of requests that may be sent concurrently to the provider,
+    # shared by all the instances of the service; None means unbounded
+    max_concurrency = None
+
+    # maximum number of strings, characters and UTF-8 encoded bytes
+    # that may be sent in a single request; None means unbounded
+    max_segments = None
+    max_characters = None
+    max_bytes = None
+
+    # the requests sent per second and characters translated per second, shared by all
+    # the instances of the service in a process; None means unbounded
+    requests_per_second = None
+    characters_per_second = None
+
+    # failed requests are retried with an exponential backoff, see `is_retryable()`
+    max_retries = 5
+    retry_base_delay = 0.5
+    retry_max_delay = 30.0
+
+    # used by `RoutingTranslatorService`: number of characters the service may translate
+    # (per process) and the seconds after which a call falls back to the next service
+    characters_quota = None
+    timeout = None
+
+    # True if `translate_strings_multi` translates into several target languages per request
+    multi_target = False
+
+    def concurrency(self):
+        """
+        Returns a context manager which holds one of the provider's concurrency slots.
+        """
+        max_concurrency = get_service_limits(self)['max_concurrency']
+        if not max_concurrency:
+            return contextlib.nullcontext()
+
+        key = (type(self), max_concurrency)
+        with _semaphores_lock:
+            if key not in _semaphores:
+                _semaphores[key] = threading.BoundedSemaphore(max_concurrency)
+            return _semaphores[key]
+
+    def send(self, characters, func, *args, **kwargs):
+        """
+        Sends a request to the provider, waiting for the rate limiter first
+        and retrying the request while it fails with a retryable error.
+
+        :param characters: number of characters translated by the request
+        :param func: callable sending the request
+        """
+        limits = get_service_limits(self)
+        limiter = get_rate_limiter(type(self), *[rate / float(_rate_share) if rate else rate for rate in (
+            limits['requests_per_second'], limits['characters_per_second'])])
+        service = type(self).__name__
+        max_retries = limits['max_retries']
+        if _max_retries.get() is not None:
+            max_retries = min(max_retries, _max_retries.get())
+
+        def request():
+            limiter.acquire(characters)
+            metrics.incr('requests_total', service=service)
+            with metrics.timer('request_seconds', service=service):
+                return func(*args, **kwargs)
+
+        try:
+            response = call_with_retries(request, self.is_retryable, max_retries,
+                                         limits['retry_base_delay'], limits['retry_max_delay'],
+                                         on_retry=lambda e, attempt: metrics.incr('retries_total', service=service))
+        except Exception:
+            metrics.incr('errors_total', service=service)
+            raise
+        metrics.incr('provider_characters_total', characters, service=service)
+        return response
+
+    def is_retryable(self, exception):
+        """
+        Returns True if the request failing with the exception may be retried, e.g. when throttled.
+        """
+        return False
+
     def translate_string(self, text, target_language, source_language='en'):
         """
         Returns a single translated string literal for the target language.
@@ -24,6 +171,65 @@ class BaseTranslatorService:
         """
         raise NotImplementedError('.translate_strings() must be overridden.')
 
+    def translate_strings_multi(self, strings, target_languages, source_language='en'):
+        """
+        Translates the same strings into several target languages.
+
+        By default the strings are translated into every target language in turn,
+        services whose provider accepts several target languages in a request should override this
+        and set `multi_target`.
+
+        :return: dict mapping every target language to the list of the translated strings
+        """
+        strings = list(strings)
+        return {target_language: list(self.translate_strings(strings, target_language, source_language, False))
+                for target_language in target_languages}
+
+    async def atranslate_strings(self, strings, target_language, source_language='en', optimized=False):
+        """
+        Asynchronous counterpart of `translate_strings`, returns a list of the translated strings.
+
+        By default the blocking `translate_strings` runs in a worker thread,
+        services that can send several requests at once should override this.
+        """
+        translated = await self.run_in_executor(
+            self.translate_strings, strings, target_language, source_language, optimized)
+        return list(translated)
+
+    async def run_in_executor(self, func, *args):
+        """
+        Runs the blocking `func` in a worker thread while holding one of the provider's concurrency slots.
+        """
+        def call():
+            with self.concurrency():
+                return func(*args)
+        # the worker thread runs in the context of the caller, see `limit_retries()`
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(self.get_executor(), context.run, call)
+
+    def get_executor(self):
+        """
+        Returns the thread pool used by the asynchronous API, sized after the concurrency limit.
+        """
+        executor = getattr(self, '_executor', None)
+        if executor is None:
+            with _executors_lock:
+                executor = getattr(self, '_executor', None)
+                if executor is None:
+                    max_concurrency = get_service_limits(self)['max_concurrency']
+                    executor = self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                                                   thread_name_prefix=type(self).__name__)
+        return executor
+
+    def close(self):
+        """
+        Releases the resources of the service, e.g. the thread pool of the asynchronous API.
+        The requests running already complete in the background.
+        """
+        executor, self._executor = getattr(self, '_executor', None), None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
 
 class GoogleTranslatorService(BaseTranslatorService):
     """
@@ -31,19 +237,40 @@ class GoogleTranslatorService(BaseTranslatorService):
     https://github.com/ssut/py-googletrans
     """
 
+    # the free web API blocks clients sending too many requests at once
+    max_concurrency = 2
+    max_characters = 5000
+
     def __init__(self):
-        assert googletrans, '`TranslateTranslatorService` requires `translate` package'
-        self.service = googletrans.Translator()
+        assert compat.googletrans, '`TranslateTranslatorService` requires `translate` package'
+        self.service = compat.googletrans.Translator()
 
     def translate_string(self, text, target_language, source_language='en'):
         assert isinstance(text, six.string_types), '`text` should a string literal'
-        return self.service.translate(text,dest=target_language,src=source_language).text
+        return self.send(len(text), self.service.translate, text, dest=target_language, src=source_language).text
 
     def translate_strings(self, strings, target_language, source_language='en', optimized=True):
         assert isinstance(strings, collections.abc.Iterable), '`strings` should a iterable containing string_types'
-        translations =  self.service.translate(list(strings),dest=target_language,src=source_language)
+        return translate_in_batches(lambda batch: self._translate_batch(batch, target_language, source_language),
+                                    strings, get_service_limits(self))
+
+    def _translate_batch(self, strings, target_language, source_language):
+        translations = self.send(sum(len(s) for s in strings), self.service.translate,
+                                 strings, dest=target_language, src=source_language)
         return [item.text for item in translations]
 
+    def is_retryable(self, exception):
+        # network errors and unexpected responses of the http client used by googletrans
+        return type(exception).__module__.split('.')[0] in ('httpx', 'httpcore')
+
+    async def atranslate_strings(self, strings, target_language, source_language='en', optimized=False):
+        # the web API translates a single string per request anyways,
+        # so the requests are sent concurrently over the shared http client
+        return list(await asyncio.gather(*[
+            self.run_in_executor(self.translate_string, text, target_language, source_language)
+            for text in strings
+        ]))
+
 
 class GoogleAPITranslatorService(BaseTranslatorService):
     """
@@ -51,8 +278,13 @@ class GoogleAPITranslatorService(BaseTranslatorService):
     https://github.com/google/google-api-python-client
     """
 
+    max_concurrency = 8
+    # it's recommended to keep a request under 5K characters
+    max_characters = 5000
+    max_segments = 128
+
     def __init__(self, max_segments=128):
-        assert googleapiclient, '`GoogleAPITranslatorService` requires `google-api-python-client` package'
+        assert compat.googleapiclient, '`GoogleAPITranslatorService` requires `google-api-python-client` package'
 
         self.developer_key = getattr(settings, 'GOOGLE_TRANSLATE_KEY', None)
         assert self.developer_key, ('`GOOGLE_TRANSLATE_KEY` is not configured, '
@@ -61,41 +293,59 @@ class GoogleAPITranslatorService(BaseTranslatorService):
         from googleapiclient.discovery import build
         self.service = build('translate', 'v2', developerKey=self.developer_key)
 
+        # `httplib2.Http` isn't thread safe, the asynchronous API
+        # borrows one of these connections for every request
+        self._http_pool = queue.LifoQueue()
+
         # the google translation API has a limit of max
         # 128 translations in a single request
         # and throws `Too many text segments Error`
         self.max_segments = max_segments
-        self.translated_strings = []
 
     def translate_string(self, text, target_language, source_language='en'):
         assert isinstance(text, six.string_types), '`text` should a string literal'
-        response = self.service.translations() \
-            .list(source=source_language, target=target_language, q=[text]).execute()
-        return response.get('translations').pop(0).get('translatedText')
+        return self._translate_batch([text], target_language, source_language)[0]
 
     def translate_strings(self, strings, target_language, source_language='en', optimized=True):
-        try: 
-            assert isinstance(strings, collections.MutableSequence), \
-                '`strings` should be a sequence containing string_types'
-        except:
-            assert isinstance(strings, collections.abc.MutableSequence)
-            assert not optimized, 'optimized=True is not supported in `GoogleAPITranslatorService`'
-        if len(strings) == 0:
-            return []
-        elif len(strings) <= self.max_segments:
-            setattr(self, 'translated_strings', getattr(self, 'translated_strings', []))
-            response = self.service.translations() \
-                .list(source=source_language, target=target_language, q=strings).execute()
-            self.translated_strings.extend([t.get('translatedText') for t in response.get('translations')])
-            return self.translated_strings
-        else:
-            self.translate_strings(strings[0:self.max_segments], target_language, source_language, optimized)
-            _translated_strings = self.translate_strings(strings[self.max_segments:],
-                                                         target_language, source_language, optimized)
+        assert isinstance(strings, collections.abc.MutableSequence), \
+            '`strings` should be a sequence containing string_types'
+        assert not optimized, 'optimized=True is not supported in `GoogleAPITranslatorService`'
+        return translate_in_batches(lambda batch: self._translate_batch(batch, target_language, source_language),
+                                    strings, get_service_limits(self))
+
+    def _translate_batch(self, strings, target_language, source_language):
+        try:
+            http = self._http_pool.get_nowait()
+        except queue.Empty:
+            # with the timeout of the connections made by `discovery.build()` (60 seconds by default)
+            from googleapiclient.http import build_http
+            http = build_http()
+        try:
+            request = self.service.translations().list(source=source_language, target=target_language, q=strings)
+            response = self.send(sum(len(s) for s in strings), request.execute, http=http)
+        finally:
+            self._http_pool.put(http)
+        return [t.get('translatedText') for t in response.get('translations')]
+
+    def close(self):
+        super(GoogleAPITranslatorService, self).close()
+        while True:
+            try:
+                self._http_pool.get_nowait().close()
+            except queue.Empty:
+                break
 
-            # reset the property or it will grow with subsequent calls
-            self.translated_strings = []
-            return _translated_strings
+    def is_retryable(self, exception):
+        from googleapiclient.errors import HttpError
+        return isinstance(exception, HttpError) and exception.resp.status in (429, 500, 502, 503, 504)
+
+    async def atranslate_strings(self, strings, target_language, source_language='en', optimized=False):
+        limits = get_service_limits(self)
+        batches = await asyncio.gather(*[
+            self.run_in_executor(self._translate_batch, batch, target_language, source_language)
+            for batch in iter_batches(strings, limits['max_segments'], limits['max_characters'], limits['max_bytes'])
+        ])
+        return [translation for batch in batches for translation in batch]
 
 
 class AmazonTranslateTranslatorService(BaseTranslatorService):
@@ -104,26 +354,319 @@ class AmazonTranslateTranslatorService(BaseTranslatorService):
     https://boto3.amazonaws.com/v1/documentation/api/latest/reference/services/translate.html
     """
 
+    max_concurrency = 10
+    # `translate_text` accepts a single text of at most 10,000 bytes
+    max_segments = 1
+    max_bytes = 10000
+
     def __init__(self,):
-        assert boto3, '`AmazonTranslateTranslatorService` requires the `boto3` package'
+        assert compat.boto3, '`AmazonTranslateTranslatorService` requires the `boto3` package'
 
-        self.service = boto3.client('translate')
+        # the client is thread safe, size its connection pool
+        # so that every concurrent request gets a connection
+        from botocore.config import Config
+        max_concurrency = get_service_limits(self)['max_concurrency']
+        config = Config(max_pool_connections=max_concurrency) if max_concurrency else None
+        self.service = compat.boto3.client('translate', config=config)
 
     def translate_string(self, text, target_language, source_language='en'):
         assert isinstance(text, six.string_types), '`text` should a string literal'
-        response = self.service.translate_text(
+        max_bytes = get_service_limits(self)['max_bytes']
+        if max_bytes and len(text.encode('utf-8')) > max_bytes:
+            raise ValueError('`AmazonTranslateTranslatorService` translates texts of at most {} bytes, '
+                             'got a text of {} bytes: {!r}'.format(max_bytes, len(text.encode('utf-8')),
+                                                                   text[:50] + '...'))
+        response = self.send(
+            len(text),
+            self.service.translate_text,
             Text=text,
             SourceLanguageCode=source_language,
             TargetLanguageCode=target_language
         )
         return response['TranslatedText']
 
+    def is_retryable(self, exception):
+        from botocore.exceptions import ClientError
+        return isinstance(exception, ClientError) and exception.response.get('Error', {}).get('Code') in (
+            'ThrottlingException', 'TooManyRequestsException',
+            'ServiceUnavailableException', 'InternalServerException',
+        )
+
     def translate_strings(self, strings, target_language, source_language='en', optimized=False):
-        assert isinstance(strings, collections.MutableSequence), \
+        assert isinstance(strings, collections.abc.MutableSequence), \
             '`strings` should be a sequence containing string_types'
+        # `translate_text` translates a single text, every string of a batch is sent on its own
+        return translate_in_batches(
+            lambda batch: [self.translate_string(text, target_language, source_language) for text in batch],
+            strings, get_service_limits(self))
+
+    async def atranslate_strings(self, strings, target_language, source_language='en', optimized=False):
+        return list(await asyncio.gather(*[
+            self.run_in_executor(self.translate_string, text, target_language, source_language)
+            for text in strings
+        ]))
+
+
+class CachedTranslatorService(BaseTranslatorService):
+    """
+    Puts a translation memory (see `autotranslate.cache`) in front of another translator service,
+    only the strings missing from the translation memory are sent to the wrapped service.
+    """
+
+    def __init__(self, service, cache):
+        self.service = service
+        self.cache = cache
+
+    def concurrency(self):
+        # cache hits don't need a slot, the wrapped service is limited in `translate_strings`
+        return contextlib.nullcontext()
+
+    @property
+    def multi_target(self):
+        return self.service.multi_target
+
+    def close(self):
+        super(CachedTranslatorService, self).close()
+        self.service.close()
+        self.cache.close()
+
+    def translate_string(self, text, target_language, source_language='en'):
+        return self.translate_strings([text], target_language, source_language, optimized=False)[0]
+
+    def translate_strings(self, strings, target_language, source_language='en', optimized=True):
+        strings = list(strings)
+        translations = self.cache.get_many(strings, target_language, source_language)
+
+        # every unique string is sent only once, in order of appearance
+        missing = list(collections.OrderedDict.fromkeys(s for s in strings if s not in translations))
+        if missing:
+            with self.service.concurrency():
+                translated = self.service.translate_strings(missing, target_language, source_language, optimized)
+            translated = dict(zip(missing, translated))
+            self.cache.set_many(translated, target_language, source_language)
+            translations.update(translated)
+
+        return [translations[s] for s in strings]
+
+    def translate_strings_multi(self, strings, target_languages, source_language='en'):
+        strings = list(strings)
+        translations = {}
+        # the target languages missing the same strings are sent to the wrapped service together
+        missing = collections.OrderedDict()
+        for target_language in target_languages:
+            translations[target_language] = self.cache.get_many(strings, target_language, source_language)
+            key = tuple(collections.OrderedDict.fromkeys(
+                s for s in strings if s not in translations[target_language]))
+            if key:
+                missing.setdefault(key, []).append(target_language)
+
+        for key, languages in missing.items():
+            with self.service.concurrency():
+                translated = self.service.translate_strings_multi(list(key), languages, source_language)
+            for target_language in languages:
+                translated_strings = dict(zip(key, translated[target_language]))
+                self.cache.set_many(translated_strings, target_language, source_language)
+                translations[target_language].update(translated_strings)
+
+        return {target_language: [translations[target_language][s] for s in strings]
+                for target_language in target_languages}
+
+    async def atranslate_strings(self, strings, target_language, source_language='en', optimized=False):
+        strings = list(strings)
+        loop = asyncio.get_running_loop()
+        translations = await loop.run_in_executor(
+            None, self.cache.get_many, strings, target_language, source_language)
+
+        missing = list(collections.OrderedDict.fromkeys(s for s in strings if s not in translations))
+        if missing:
+            translated = await self.service.atranslate_strings(missing, target_language, source_language, optimized)
+            translated = dict(zip(missing, translated))
+            await loop.run_in_executor(None, self.cache.set_many, translated, target_language, source_language)
+            translations.update(translated)
+
+        return [translations[s] for s in strings]
+
+
+class RoutingTranslatorService(BaseTranslatorService):
+    """
+    Routes the requests across several translator services, and falls back to the next one
+    when a service fails or times out (see the `timeout` limit). The strings are routed batch by batch
+    (see the `max_segments`, `max_characters` and `max_bytes` limits of the router), so a failure or
+    the quota (see the `characters_quota` limit) of a service only affects the following batches.
+
+    The services are tried in the order given by the routes (`AUTOTRANSLATE_ROUTES`, mapping
+    a `'<source>-<target>'` language pair or a target language to a list of services)
+    and sorted by the strategy (`AUTOTRANSLATE_ROUTING_STRATEGY`):
+
+    - `priority`: in the configured order
+    - `latency`: the service with the lowest observed latency first
+    - `quota`: the service with the largest share of its quota left first
+
+    The services without enough quota left for a batch are tried after the other ones, and a failed service
+    is only tried as a last resort for `failure_cooldown` seconds. A service is retried `fallback_max_retries`
+    times at most (see the `max_retries` limit) when another service may be tried next.
+    """
+
+    strategies = ('priority', 'latency', 'quota')
+    failure_cooldown = 60.0
+    fallback_max_retries = 1
+    # the size of the batches routed to a service, which may split them further
+    max_segments = 128
+    max_characters = 5000
+    # weight of the latest request in the moving average of the latency
+    latency_smoothing = 0.3
+
+    def __init__(self, services, routes=None, strategy=None, clock=time.monotonic):
+        assert services, '`RoutingTranslatorService` requires at least one translator service'
+        self.services = list(services)
+        self.routes = routes if routes is not None else getattr(settings, 'AUTOTRANSLATE_ROUTES', {})
+        self.strategy = strategy or getattr(settings, 'AUTOTRANSLATE_ROUTING_STRATEGY', 'priority')
+        assert self.strategy in self.strategies, '`AUTOTRANSLATE_ROUTING_STRATEGY` should be one of {}'.format(
+            ', '.join(self.strategies))
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self.latency = {id(service): None for service in self.services}
+        self.characters = {id(service): 0 for service in self.services}
+        self.failed_until = {id(service): 0.0 for service in self.services}
+
+    def concurrency(self):
+        # the routed services are limited when they are called
+        return contextlib.nullcontext()
+
+    def close(self):
+        super(RoutingTranslatorService, self).close()
+        for service in self.services:
+            service.close()
+
+    @staticmethod
+    def matches(service, name):
+        service_class = type(service)
+        return name in ('{}.{}'.format(service_class.__module__, service_class.__name__), service_class.__name__)
+
+    def quota_left(self, service):
+        quota = get_service_limits(service)['characters_quota']
+        if quota is None:
+            return float('inf')
+        return quota - self.characters[id(service)]
+
+    def quota_fraction(self, service):
+        quota = get_service_limits(service)['characters_quota']
+        if quota is None:
+            return float('inf')
+        return self.quota_left(service) / float(quota) if quota else 0.0
+
+    def candidates(self, characters, target_language, source_language):
+        """
+        Returns the services to try in order, for a batch translating `characters` characters.
+        """
+        route = '{}-{}'.format(source_language, target_language)
+        if not self.routes.get(route):
+            route = target_language
+        names = self.routes.get(route)
+        if names:
+            services = [service for name in names for service in self.services if self.matches(service, name)]
+            if not services:
+                raise RuntimeError('none of the translator services routed from `{}` to `{}` (route `{}`: {}) '
+                                   'is configured'.format(source_language, target_language, route,
+                                                          ', '.join(names)))
+        else:
+            services = list(self.services)
+
+        with self._lock:
+            if self.strategy == 'latency':
+                # the services without any request yet are tried first
+                services.sort(key=lambda service: self.latency[id(service)] or 0.0)
+            elif self.strategy == 'quota':
+                services.sort(key=lambda service: -self.quota_fraction(service))
+
+            # then the services without enough quota left, and the ones cooling down after a failure
+            now = self.clock()
+            services.sort(key=lambda service: (self.failed_until[id(service)] > now,
+                                               self.quota_left(service) < characters))
+        return services
+
+    def succeeded(self, service, seconds, characters):
+        with self._lock:
+            latency = self.latency[id(service)]
+            self.latency[id(service)] = seconds if latency is None else \
+                latency + self.latency_smoothing * (seconds - latency)
+            self.characters[id(service)] += characters
+            self.failed_until[id(service)] = 0.0
+
+    def failed(self, service, exception):
+        metrics.incr('fallbacks_total', service=type(service).__name__)
+        logger.warning('`{}` failed ({}: {}), falling back to the next translator service'.format(
+            type(service).__name__, exception.__class__.__name__, exception))
+        with self._lock:
+            self.failed_until[id(service)] = self.clock() + self.failure_cooldown
+
+    def translate_string(self, text, target_language, source_language='en'):
+        return self.translate_strings([text], target_language, source_language, optimized=False)[0]
+
+    def iter_batches(self, strings):
+        limits = get_service_limits(self)
+        return iter_batches(strings, limits['max_segments'], limits['max_characters'], limits['max_bytes'])
+
+    def translate_strings(self, strings, target_language, source_language='en', optimized=True):
         translated = []
-        for text in strings:
-            translated.append(
-                self.translate_string(text, target_language, source_language)
-            )
+        for batch in self.iter_batches(strings):
+            translated.extend(self._route(batch, target_language, source_language, optimized))
         return translated
+
+    def _route(self, strings, target_language, source_language, optimized):
+        characters = sum(len(s) for s in strings)
+        services = self.candidates(characters, target_language, source_language)
+        error = None
+        for index, service in enumerate(services):
+            max_retries = self.fallback_max_retries if index < len(services) - 1 else None
+            start = self.clock()
+            try:
+                translated = self._translate(service, strings, target_language, source_language, optimized,
+                                             max_retries)
+            except Exception as e:
+                self.failed(service, e)
+                error = e
+                continue
+            self.succeeded(service, self.clock() - start, characters)
+            return translated
+        raise RuntimeError('no translator service could translate the strings from `{}` to `{}`'.format(
+            source_language, target_language)) from error
+
+    def _translate(self, service, strings, target_language, source_language, optimized, max_retries=None):
+        def call():
+            with service.concurrency(), limit_retries(max_retries):
+                return list(service.translate_strings(strings, target_language, source_language, optimized))
+
+        timeout = get_service_limits(service)['timeout']
+        if not timeout:
+            return call()
+        # a call that times out keeps running in the background, its result is discarded
+        return self.get_executor().submit(call).result(timeout=timeout)
+
+    async def atranslate_strings(self, strings, target_language, source_language='en', optimized=False):
+        batches = await asyncio.gather(*[
+            self._aroute(batch, target_language, source_language, optimized) for batch in self.iter_batches(strings)
+        ])
+        return [translation for batch in batches for translation in batch]
+
+    async def _aroute(self, strings, target_language, source_language, optimized):
+        characters = sum(len(s) for s in strings)
+        services = self.candidates(characters, target_language, source_language)
+        error = None
+        for index, service in enumerate(services):
+            max_retries = self.fallback_max_retries if index < len(services) - 1 else None
+            start = self.clock()
+            try:
+                with limit_retries(max_retries):
+                    translated = await asyncio.wait_for(
+                        service.atranslate_strings(strings, target_language, source_language, optimized),
+                        get_service_limits(service)['timeout'])
+            except Exception as e:
+                self.failed(service, e)
+                error = e
+                continue
+            self.succeeded(service, self.clock() - start, characters)
+            return translated
+        raise RuntimeError('no translator service could translate the strings from `{}` to `{}`'.format(
+            source_language, target_language)) from error
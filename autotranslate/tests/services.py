@@ -0,0 +1,46 @@
+import threading
+
+from autotranslate.services import BaseTranslatorService
+
+
+class UpperTranslatorService(BaseTranslatorService):
+    """
+    Translates the strings to upper case, and records every call in `calls`.
+    """
+
+    calls = []
+    lock = threading.Lock()
+
+    def translate_string(self, text, target_language, source_language='en'):
+        return self.translate_strings([text], target_language, source_language)[0]
+
+    def translate_strings(self, strings, target_language, source_language='en', optimized=True):
+        strings = list(strings)
+        with self.lock:
+            self.calls.append((target_language, strings))
+        return [s.upper() for s in strings]
+
+
+class FailingTranslatorService(UpperTranslatorService):
+    """
+    Records every call in `UpperTranslatorService.calls` and fails.
+    """
+
+    def translate_strings(self, strings, target_language, source_language='en', optimized=True):
+        super(FailingTranslatorService, self).translate_strings(strings, target_language, source_language)
+        raise IOError('the translator service is down')
+
+
+class MultiUpperTranslatorService(UpperTranslatorService):
+    """
+    Translates into several target languages per request, records every request in `multi_calls`.
+    """
+
+    multi_target = True
+    multi_calls = []
+
+    def translate_strings_multi(self, strings, target_languages, source_language='en'):
+        strings = list(strings)
+        with self.lock:
+            self.multi_calls.append((list(target_languages), strings))
+        return {target_language: [s.upper() for s in strings] for target_language in target_languages}
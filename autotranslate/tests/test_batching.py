@@ -0,0 +1,34 @@
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from autotranslate.batching import iter_batches, translate_in_batches
+
+
+class BatchingTestCase(unittest.TestCase):
+    def test_max_segments(self):
+        self.assertEqual([['a', 'b'], ['c', 'd'], ['e']], list(iter_batches('abcde', max_segments=2)))
+
+    def test_max_characters(self):
+        self.assertEqual([['aaa', 'bb'], ['cccc', 'd'], ['eeee']],
+                         list(iter_batches(['aaa', 'bb', 'cccc', 'd', 'eeee'], max_characters=5)))
+
+    def test_max_bytes(self):
+        # 'ü' is encoded into 2 bytes
+        self.assertEqual([['üü'], ['ab', 'c']], list(iter_batches(['üü', 'ab', 'c'], max_bytes=4)))
+
+    def test_oversized_string(self):
+        self.assertEqual([['a'], ['bbbbbb'], ['c']], list(iter_batches(['a', 'bbbbbb', 'c'], max_characters=3)))
+
+    def test_translate_in_batches(self):
+        batches = []
+
+        def translate(batch):
+            batches.append(batch)
+            return [s.upper() for s in batch]
+
+        self.assertEqual(['A', 'B', 'C'], translate_in_batches(translate, ['a', 'b', 'c'], {'max_segments': 2}))
+        self.assertEqual([['a', 'b'], ['c']], batches)
+        self.assertEqual([], translate_in_batches(translate, [], {}))
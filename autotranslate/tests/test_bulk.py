@@ -0,0 +1,99 @@
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from django.core.management import CommandError, call_command
+from django.db import connection, models
+from django.test import override_settings
+
+from autotranslate.bulk import hash_source, translate_queryset
+from autotranslate.tests.services import UpperTranslatorService
+
+
+class Product(models.Model):
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=100, blank=True)
+    name_de = models.CharField(max_length=100, blank=True)
+    name_pt_br = models.CharField(max_length=100, blank=True)
+    name_de_hash = models.CharField(max_length=16, blank=True)
+    name_pt_br_hash = models.CharField(max_length=16, blank=True)
+
+    class Meta:
+        app_label = 'autotranslate'
+
+
+class TranslateQuerysetTestCase(unittest.TestCase):
+    def setUp(self):
+        with connection.schema_editor() as editor:
+            editor.create_model(Product)
+        Product.objects.bulk_create([Product(name='Apple'), Product(name='Pear'), Product(name='Apple'),
+                                     Product(name='')])
+        del UpperTranslatorService.calls[:]
+
+        self.settings = override_settings(
+            AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.UpperTranslatorService',
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        with connection.schema_editor() as editor:
+            editor.delete_model(Product)
+
+    def test_translate_queryset(self):
+        stats = translate_queryset(Product.objects.order_by('pk'), ['name'], ['de', 'pt-br'],
+                                   hash_field='{field}_{language}_hash', chunk_size=2)
+        self.assertEqual({'rows': 4, 'translated': 6, 'updated': 3}, stats)
+        # the values are translated once per chunk
+        self.assertEqual([('de', ['Apple', 'Pear']), ('pt-br', ['Apple', 'Pear']), ('de', ['Apple']),
+                          ('pt-br', ['Apple'])], UpperTranslatorService.calls)
+        self.assertEqual([('APPLE', 'APPLE', hash_source('Apple')), ('PEAR', 'PEAR', hash_source('Pear'))],
+                         list(Product.objects.filter(name__in=['Apple', 'Pear']).order_by('pk')
+                              .values_list('name_de', 'name_pt_br', 'name_de_hash'))[:2])
+
+        # only the rows whose source value changed are translated again
+        del UpperTranslatorService.calls[:]
+        Product.objects.filter(name='Pear').update(name='Plum')
+        stats = translate_queryset(Product.objects.order_by('pk'), ['name'], ['de'],
+                                   hash_field='{field}_{language}_hash')
+        self.assertEqual({'rows': 4, 'translated': 1, 'updated': 1}, stats)
+        self.assertEqual([('de', ['Plum'])], UpperTranslatorService.calls)
+
+        # the translations into the other languages are still outdated, and refreshed by their run
+        del UpperTranslatorService.calls[:]
+        stats = translate_queryset(Product.objects.order_by('pk'), ['name'], ['de', 'pt-br'],
+                                   hash_field='{field}_{language}_hash')
+        self.assertEqual({'rows': 4, 'translated': 1, 'updated': 1}, stats)
+        self.assertEqual([('pt-br', ['Plum'])], UpperTranslatorService.calls)
+        self.assertEqual(('PLUM', 'PLUM'), Product.objects.values_list('name_de', 'name_pt_br').get(name='Plum'))
+
+    def test_shared_hash_field(self):
+        with self.assertRaises(ValueError):
+            translate_queryset(Product.objects.all(), ['name'], ['de'], hash_field='{field}_hash')
+
+    def test_command(self):
+        Product.objects.filter(name='Pear').update(name_de='Birne')
+        call_command('translate_models', model='autotranslate.Product', fields=['name'], languages=['de'])
+        self.assertEqual(['APPLE', 'Birne', 'APPLE', ''],
+                         list(Product.objects.order_by('pk').values_list('name_de', flat=True)))
+
+    @override_settings(LANGUAGES=[('en', 'English'), ('de', 'German'), ('fr', 'French'), ('pt-br', 'Portuguese')])
+    def test_command_default_languages(self):
+        # the model has no fields for French
+        call_command('translate_models', model='autotranslate.Product', fields=['name'],
+                     hash_field='{field}_{language}_hash')
+        self.assertEqual([('de', ['Apple', 'Pear']), ('pt-br', ['Apple', 'Pear'])], UpperTranslatorService.calls)
+
+        with self.assertRaisesRegex(CommandError, 'has no fields for the translations'):
+            call_command('translate_models', model='autotranslate.Product', fields=['name'],
+                         target_field='{field}_in_{language}')
+
+    def test_command_missing_fields(self):
+        with self.assertRaisesRegex(CommandError, 'has no field name_fr, name_fr_hash'):
+            call_command('translate_models', model='autotranslate.Product', fields=['name'], languages=['de', 'fr'],
+                         hash_field='{field}_{language}_hash')
+        with self.assertRaisesRegex(CommandError, 'has no field title'):
+            call_command('translate_models', model='autotranslate.Product', fields=['title'], languages=['de'])
+        self.assertEqual([], UpperTranslatorService.calls)
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+import tempfile
+
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from django.test import override_settings
+
+from autotranslate.cache import SQLiteTranslationCache
+from autotranslate.services import CachedTranslatorService
+from autotranslate.tests.services import UpperTranslatorService
+from autotranslate.utils import get_translation_cache, get_translator, reset_translators
+
+
+class SQLiteTranslationCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = SQLiteTranslationCache(os.path.join(self.directory, 'cache.sqlite3'), max_entries=3)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_get_many(self):
+        self.cache.set_many({'foo': 'FOO'}, 'de')
+        self.assertEqual({'foo': 'FOO'}, self.cache.get_many(['foo', 'bar'], 'de'))
+        self.assertEqual({}, self.cache.get_many(['foo'], 'fr'))
+        self.assertEqual(1, self.cache.hits)
+        self.assertEqual(2, self.cache.misses)
+
+    def test_read_only(self):
+        self.cache.set_many({'foo': 'FOO'}, 'de')
+        cache = SQLiteTranslationCache(self.cache.path, read_only=True)
+        self.assertEqual({'foo'}, cache.peek_many(['foo', 'bar'], 'de'))
+        self.assertEqual((0, 0), (cache.hits, cache.misses))
+        cache.set_many({'bar': 'BAR'}, 'de')
+        self.assertEqual(1, len(self.cache))
+        cache.close()
+
+        # the path is escaped in the URI of the read-only connection
+        path = os.path.join(self.directory, 'a dir?#%', 'cache.sqlite3')
+        cache = SQLiteTranslationCache(path)
+        cache.set_many({'foo': 'FOO'}, 'de')
+        cache.close()
+        cache = SQLiteTranslationCache(path, read_only=True)
+        self.assertEqual({'foo': 'FOO'}, cache.get_many(['foo'], 'de'))
+        cache.close()
+
+        # a missing translation memory is not created
+        path = os.path.join(self.directory, 'missing.sqlite3')
+        self.assertEqual(set(), SQLiteTranslationCache(path, read_only=True).peek_many(['foo'], 'de'))
+        self.assertFalse(os.path.exists(path))
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set_many({'a': 'A', 'b': 'B'}, 'de')
+        self.cache.set_many({'c': 'C'}, 'de')
+        self.cache.get_many(['a'], 'de')
+        self.cache.set_many({'d': 'D'}, 'de')
+        self.assertEqual(3, len(self.cache))
+        self.assertEqual({'a', 'c', 'd'}, set(self.cache.get_many(['a', 'b', 'c', 'd'], 'de')))
+
+    def test_cached_translator_service(self):
+        service = UpperTranslatorService()
+        del service.calls[:]
+        translator = CachedTranslatorService(service, self.cache)
+        self.assertEqual(['FOO', 'BAR', 'FOO'], translator.translate_strings(['foo', 'bar', 'foo'], 'de'))
+        self.assertEqual(['BAR', 'BAZ'], translator.translate_strings(['bar', 'baz'], 'de'))
+        self.assertEqual([('de', ['foo', 'bar']), ('de', ['baz'])], service.calls)
+
+    def test_cached_translator_service_multi(self):
+        service = UpperTranslatorService()
+        del service.calls[:]
+        translator = CachedTranslatorService(service, self.cache)
+        translator.translate_strings(['foo'], 'de')
+        self.assertEqual({'de': ['FOO', 'BAR'], 'fr': ['FOO', 'BAR'], 'it': ['FOO', 'BAR']},
+                         translator.translate_strings_multi(['foo', 'bar'], ['de', 'fr', 'it']))
+        self.assertEqual([('de', ['foo']), ('de', ['bar']), ('fr', ['foo', 'bar']), ('it', ['foo', 'bar'])],
+                         service.calls)
+
+    def test_cached_translator_service_async(self):
+        service = UpperTranslatorService()
+        del service.calls[:]
+        translator = CachedTranslatorService(service, self.cache)
+        translator.translate_strings(['foo'], 'de')
+        self.assertEqual(['FOO', 'BAR'], asyncio.run(translator.atranslate_strings(['foo', 'bar'], 'de')))
+        self.assertEqual([('de', ['foo']), ('de', ['bar'])], service.calls)
+
+    def test_reset_translators(self):
+        with override_settings(AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.UpperTranslatorService',
+                               AUTOTRANSLATE_CACHE='autotranslate.cache.SQLiteTranslationCache',
+                               AUTOTRANSLATE_CACHE_OPTIONS={'path': os.path.join(self.directory, 'reset.sqlite3')}):
+            translator = get_translator()
+            executor = translator.service.get_executor()
+            reset_translators()
+            # the translation memory is closed and the thread pool shut down
+            with self.assertRaises(sqlite3.ProgrammingError):
+                translator.cache.get_many(['foo'], 'de')
+            with self.assertRaises(RuntimeError):
+                executor.submit(int)
+            self.assertIsNot(translator, get_translator())
+
+    @override_settings(AUTOTRANSLATE_CACHE='autotranslate.tests.test_cache.CustomTranslationCache')
+    def test_get_translation_cache_overrides(self):
+        # the overrides are only passed to the translation memories accepting them
+        self.assertIsInstance(get_translation_cache(read_only=True), CustomTranslationCache)
+
+
+class CustomTranslationCache(SQLiteTranslationCache):
+    def __init__(self):
+        super(CustomTranslationCache, self).__init__(':memory:')
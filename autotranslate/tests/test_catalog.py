@@ -0,0 +1,112 @@
+import gettext
+import io
+import os
+import shutil
+import tempfile
+
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import polib
+
+from autotranslate import catalog
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+CATALOG = '''# Translators
+msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+"Plural-Forms: nplurals=2; plural=(n != 1);\\n"
+
+#: models.py:1
+msgid "Location"
+msgstr "Ort"
+
+#: models.py:2
+#, python-format
+msgid "%(count)s item"
+msgid_plural "%(count)s items"
+msgstr[0] ""
+msgstr[1] ""
+
+msgctxt "month"
+msgid ""
+"May"
+msgstr ""
+
+#~ msgid "Gone"
+#~ msgstr "Weg"
+'''
+
+
+class CatalogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'django.po')
+        with open(self.path, 'w') as f:
+            f.write(CATALOG)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def entries(self, po):
+        return [(entry.msgctxt, entry.msgid, entry.msgid_plural or None, entry.msgstr,
+                 dict(entry.msgstr_plural), entry.flags, entry.obsolete, entry.translated()) for entry in po]
+
+    def test_parse(self):
+        for path in (self.path, os.path.join(DATA_DIR, 'django.po')):
+            po = catalog.pofile(path)
+            self.assertEqual(self.entries(polib.pofile(path)), self.entries(po))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), po.to_bytes())
+
+    def test_save_modified_entries(self):
+        po = catalog.pofile(self.path)
+        location, item, month, gone = po
+        item.msgstr_plural = {0: '%(count)s Artikel', 1: '%(count)s Artikel'}
+        item.flags.append('fuzzy')
+        month.msgstr = 'Mai ' * 30
+        po.save(self.path)
+
+        with open(self.path) as f:
+            text = f.read()
+        expected = CATALOG.replace('#, python-format', '#, python-format, fuzzy') \
+            .replace('msgstr[0] ""\nmsgstr[1] ""', 'msgstr[0] "%(count)s Artikel"\nmsgstr[1] "%(count)s Artikel"') \
+            .replace('"May"\nmsgstr ""', '"May"\nmsgstr ""\n"{}"\n"{}"'.format('Mai ' * 19, 'Mai ' * 11))
+        self.assertEqual(expected, text)
+        self.assertEqual(self.entries(polib.pofile(self.path)), self.entries(catalog.pofile(self.path)))
+
+    def test_flags_line_is_added(self):
+        with open(self.path, 'w', newline='') as f:
+            f.write(CATALOG.replace('\n', '\r\n').rstrip())
+        po = catalog.pofile(self.path)
+        po[0].flags.append('fuzzy')
+        po[3].msgstr = 'Fort'
+        po.save(self.path)
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertIn(b'#: models.py:1\r\n#, fuzzy\r\nmsgid "Location"\r\n', data)
+        self.assertTrue(data.endswith(b'#~ msgid "Gone"\r\n#~ msgstr "Fort"'))
+
+    def test_multiline_translation(self):
+        po = catalog.pofile(self.path)
+        po[0].msgstr = 'Erste Zeile\nZweite "Zeile"\n'
+        po.save(self.path)
+        with open(self.path) as f:
+            self.assertIn('msgstr ""\n"Erste Zeile\\n"\n"Zweite \\"Zeile\\"\\n"\n', f.read())
+        self.assertEqual('Erste Zeile\nZweite "Zeile"\n', polib.pofile(self.path).find('Location').msgstr)
+
+    def test_to_binary(self):
+        po = catalog.pofile(self.path)
+        po[1].msgstr_plural = {0: '%(count)s Artikel', 1: '%(count)s Artikel'}
+        po[2].msgstr = 'Mai'
+        translations = gettext.GNUTranslations(io.BytesIO(po.to_binary()))
+        self.assertEqual('Ort', translations.gettext('Location'))
+        self.assertEqual('%(count)s Artikel', translations.ngettext('%(count)s item', '%(count)s items', 2))
+        self.assertEqual('Mai', translations.pgettext('month', 'May'))
+        self.assertEqual('Gone', translations.gettext('Gone'))
@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from autotranslate import compat
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LazyImportTestCase(unittest.TestCase):
+    def test_optional_packages_are_not_imported(self):
+        code = ('import sys; '
+                'import autotranslate.services, autotranslate.management.commands.translate_messages; '
+                'print(",".join(sorted(set(sys.modules) & {"googletrans", "googleapiclient", "boto3", "botocore"})))')
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT_DIR,
+                                         env=dict(os.environ, PYTHONPATH=ROOT_DIR))
+        self.assertEqual(b'', output.strip())
+
+    def test_missing_package(self):
+        self.assertIn(compat.boto3, (None, sys.modules.get('boto3')))
+        with self.assertRaises(AttributeError):
+            compat.missing_package
@@ -0,0 +1,38 @@
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from autotranslate.fuzzy import FuzzyIndex, FuzzyMatch
+from autotranslate.placeholders import protect, protect_translation, restore
+
+
+class FuzzyIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = FuzzyIndex(threshold=0.85)
+        self.index.add('Save the changes', 'Änderungen speichern')
+        self.index.add('Delete the selected item', 'Das ausgewählte Element löschen')
+        self.index.add('Location', 'Ort')
+
+    def test_exact_match(self):
+        match = self.index.lookup('Save the changes!')
+        self.assertIsInstance(match, FuzzyMatch)
+        self.assertEqual(('Änderungen speichern', 1.0), (match, match.score))
+        self.assertEqual('Ort', self.index.lookup('LOCATION:'))
+
+    def test_similar_match(self):
+        match = self.index.lookup('Delete the selected items')
+        self.assertEqual('Das ausgewählte Element löschen', match)
+        self.assertTrue(0.85 <= match.score < 1)
+
+    def test_no_match(self):
+        self.assertIsNone(self.index.lookup('Delete the account'))
+        self.assertIsNone(self.index.lookup('...'))
+
+    def test_protect_translation(self):
+        protected, tokens = protect('Hello %(name)s, you have %d messages')
+        translation = protect_translation('%(name)s, Sie haben %d Nachrichten', tokens)
+        self.assertEqual('__0__, Sie haben __1__ Nachrichten', translation)
+        self.assertEqual('%(user)s, Sie haben %d Nachrichten',
+                         restore(translation, protect('Hi %(user)s, you have %d messages')[1]))
@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import polib
+from django.core.management import call_command
+from django.test import override_settings
+
+from autotranslate.jobs import JobQueue
+from autotranslate.tests.services import UpperTranslatorService
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+class JobQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 1000.0
+        self.queue = JobQueue(os.path.join(self.directory, 'queue.sqlite3'), lease=60, clock=lambda: self.now)
+
+    def tearDown(self):
+        self.queue.close()
+        shutil.rmtree(self.directory)
+
+    def test_get(self):
+        first = self.queue.put(paths=['a.po'])
+        self.queue.put(msgids=['Location'], locale=['de'])
+        self.assertEqual(2, self.queue.count())
+
+        job = self.queue.get()
+        self.assertEqual((first, ['a.po'], [], []), job)
+        self.queue.done(job)
+        job = self.queue.get()
+        self.assertEqual((['de'], ['Location']), (job.locale, job.msgids))
+        self.queue.failed(job, 'error')
+        self.assertIsNone(self.queue.get())
+        self.assertEqual(1, self.queue.count('failed'))
+
+    def test_expired_lease(self):
+        self.queue.put(paths=['a.po'])
+        job = self.queue.get()
+        self.assertIsNone(self.queue.get())
+        self.now += 61
+        self.assertEqual(job.id, self.queue.get().id)
+
+    def test_renew(self):
+        self.queue.put(paths=['a.po'])
+        job = self.queue.get()
+        self.now += 50
+        self.assertTrue(self.queue.renew(job))
+        self.now += 50
+        self.assertIsNone(self.queue.get())
+
+        # the lease expired, and the job has been claimed by another worker
+        self.now += 61
+        other = JobQueue(self.queue.path, lease=60, clock=lambda: self.now)
+        self.assertEqual(job.id, other.get().id)
+        self.assertFalse(self.queue.renew(job))
+        other.close()
+
+    def test_heartbeat(self):
+        queue = JobQueue(os.path.join(self.directory, 'heartbeat.sqlite3'), lease=0.3)
+        queue.put(paths=['a.po'])
+        job = queue.get()
+        with queue.heartbeat(job, interval=0.05):
+            time.sleep(0.5)
+            self.assertIsNone(queue.get())
+        queue.close()
+
+
+class WorkerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for locale in ('de', 'fr'):
+            os.makedirs(os.path.join(self.directory, locale, 'LC_MESSAGES'))
+            shutil.copy(os.path.join(DATA_DIR, 'django.po'), self.po_path(locale))
+        del UpperTranslatorService.calls[:]
+
+        self.settings = override_settings(
+            LOCALE_PATHS=[self.directory],
+            AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.UpperTranslatorService',
+            AUTOTRANSLATE_QUEUE_PATH=os.path.join(self.directory, 'queue.sqlite3'),
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def po_path(self, locale):
+        return os.path.join(self.directory, locale, 'LC_MESSAGES', 'django.po')
+
+    def test_worker(self):
+        call_command('translate_worker', enqueue=[self.po_path('de')])
+        queue = JobQueue(os.path.join(self.directory, 'queue.sqlite3'))
+        queue.put(msgids=['Location'], locale=['fr'])
+        queue.close()
+
+        call_command('translate_worker', once=True)
+        self.assertEqual([('de', ['Location', 'City', 'Cities']), ('fr', ['Location'])], UpperTranslatorService.calls)
+        self.assertEqual('LOCATION', polib.pofile(self.po_path('de')).find('Location').msgstr)
+        self.assertEqual('LOCATION', polib.mofile(self.po_path('de')[:-3] + '.mo').find('Location').msgstr)
+        fr = polib.pofile(self.po_path('fr'))
+        self.assertEqual('LOCATION', fr.find('Location').msgstr)
+        self.assertEqual('', fr.find('City').msgstr_plural[0])
@@ -0,0 +1,39 @@
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from autotranslate.metrics import Metrics
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+
+    def test_counters(self):
+        self.metrics.incr('requests_total', service='Amazon')
+        self.metrics.incr('requests_total', 2, service='Google')
+        self.assertEqual(1, self.metrics.counter('requests_total', service='Amazon'))
+        self.assertEqual(3, self.metrics.counter('requests_total'))
+
+    def test_prometheus(self):
+        self.metrics.incr('requests_total', service='Amazon')
+        self.metrics.observe('request_seconds', 0.3, service='Amazon')
+        self.metrics.observe('request_seconds', 100, service='Amazon')
+        text = self.metrics.to_prometheus()
+        self.assertIn('# TYPE autotranslate_requests_total counter\n', text)
+        self.assertIn('autotranslate_requests_total{service="Amazon"} 1\n', text)
+        self.assertIn('autotranslate_request_seconds_bucket{service="Amazon",le="0.25"} 0\n', text)
+        self.assertIn('autotranslate_request_seconds_bucket{service="Amazon",le="0.5"} 1\n', text)
+        self.assertIn('autotranslate_request_seconds_bucket{service="Amazon",le="+Inf"} 2\n', text)
+        self.assertIn('autotranslate_request_seconds_count{service="Amazon"} 2\n', text)
+
+    def test_merge(self):
+        other = Metrics()
+        other.incr('files_total', 2)
+        other.observe('save_seconds', 0.1)
+        self.metrics.incr('files_total')
+        self.metrics.merge(other.snapshot())
+        self.assertEqual(3, self.metrics.counter('files_total'))
+        self.assertEqual(1, self.metrics.as_dict()['histograms'][0]['count'])
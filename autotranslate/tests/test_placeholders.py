@@ -0,0 +1,50 @@
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from autotranslate.placeholders import missing_placeholders, protect, restore
+
+
+class ProtectTestCase(unittest.TestCase):
+    def assertProtected(self, expected, text):
+        protected, tokens = protect(text)
+        self.assertEqual(expected, protected)
+        self.assertEqual(text, restore(protected, tokens))
+
+    def test_printf_placeholders(self):
+        self.assertProtected('foo __0__ bar __1__', 'foo %(item)s bar %d')
+        self.assertProtected('__0__ __1__ __2__', '%(amount).2f %-5d %%')
+
+    def test_literal_percent_signs(self):
+        self.assertProtected('Save 50% on shipping', 'Save 50% on shipping')
+        self.assertProtected('100% sure', '100% sure')
+        self.assertProtected('Up to 20% discount, __0__ left', 'Up to 20% discount, %(count)d left')
+
+    def test_format_placeholders(self):
+        self.assertProtected('foo __0__ bar __1__ __2____3__', 'foo {name} bar {0:>10} {}{}')
+        self.assertProtected('__0__ foo __1__', '{{ foo }}')
+
+    def test_html(self):
+        self.assertProtected('__0__foo__1__ __2__ bar__3__', '<a href="/foo">foo</a> &amp; bar&#160;')
+        self.assertProtected('1 < 2', '1 < 2')
+
+
+class RestoreTestCase(unittest.TestCase):
+    def test_restore_whitespace(self):
+        tokens = protect('foo %s%s bar')[1]
+        self.assertEqual('baz %s%s zilot', restore('baz __0__ __1__ zilot', tokens))
+        self.assertEqual('baz %s%s zilot', restore('baz __ 0 __ __1__ zilot', tokens))
+
+    def test_restore_reordered(self):
+        tokens = protect('%(count)d files in %(folder)s')[1]
+        self.assertEqual('in %(folder)s %(count)d Dateien', restore('in __1__ __0__ Dateien', tokens))
+
+    def test_unknown_tokens(self):
+        self.assertEqual('foo __3__', restore('foo __3__', protect('foo %s')[1]))
+
+    def test_missing_placeholders(self):
+        tokens = protect('<b>%(name)s</b>')[1]
+        self.assertEqual([], missing_placeholders('<b>%(name)s</b>', tokens))
+        self.assertEqual(['%(name)s'], missing_placeholders('<b></b>', tokens))
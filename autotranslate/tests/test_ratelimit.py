@@ -0,0 +1,100 @@
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from django.test import override_settings
+
+from autotranslate.ratelimit import TokenBucket, call_with_retries, get_rate_limiter
+from autotranslate.services import share_rate_limits
+from autotranslate.tests.services import UpperTranslatorService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class Throttled(Exception):
+    pass
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    def test_acquire(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, clock=clock, sleep=clock.sleep)
+        self.assertEqual(0, bucket.acquire())
+        self.assertEqual(0, bucket.acquire())
+        self.assertEqual(0.5, bucket.acquire())
+        clock.now += 10
+        self.assertEqual(0, bucket.acquire(2))
+
+    def test_acquire_more_than_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+        self.assertEqual(0, bucket.acquire(25))
+        # the bucket is in debt of 15 tokens
+        self.assertEqual(1.6, bucket.acquire(1))
+
+
+class RetryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.delays = []
+
+    def flaky(self, failures):
+        calls = []
+
+        def func():
+            calls.append(None)
+            if len(calls) <= failures:
+                raise Throttled()
+            return len(calls)
+        return func
+
+    def test_retries(self):
+        with self.assertLogs('autotranslate.ratelimit', 'WARNING') as logs:
+            result = call_with_retries(self.flaky(2), lambda e: isinstance(e, Throttled), max_retries=3,
+                                       base_delay=1, max_delay=3, sleep=self.delays.append)
+        self.assertEqual(2, len(logs.records))
+        self.assertEqual(3, result)
+        self.assertEqual(2, len(self.delays))
+        self.assertTrue(0 <= self.delays[0] <= 1 and 0 <= self.delays[1] <= 2)
+
+    def test_gives_up(self):
+        with self.assertRaises(Throttled), self.assertLogs('autotranslate.ratelimit', 'WARNING'):
+            call_with_retries(self.flaky(5), lambda e: True, max_retries=2, sleep=self.delays.append)
+        self.assertEqual(2, len(self.delays))
+
+    def test_not_retryable(self):
+        with self.assertRaises(Throttled):
+            call_with_retries(self.flaky(1), lambda e: False, sleep=self.delays.append)
+        self.assertEqual([], self.delays)
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={'UpperTranslatorService': {'max_retries': 1}})
+    def test_service_send(self):
+        service = UpperTranslatorService()
+        service.is_retryable = lambda e: isinstance(e, Throttled)
+        service.retry_base_delay = 0
+        with self.assertLogs('autotranslate.ratelimit', 'WARNING'):
+            self.assertEqual(2, service.send(3, self.flaky(1)))
+        with self.assertRaises(Throttled), self.assertLogs('autotranslate.ratelimit', 'WARNING'):
+            service.send(3, self.flaky(2))
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={
+        'UpperTranslatorService': {'requests_per_second': 10, 'characters_per_second': 1000}})
+    def test_share_rate_limits(self):
+        # e.g. in the worker processes of `translate_messages --processes 4`
+        share_rate_limits(4)
+        self.addCleanup(share_rate_limits, 1)
+        self.assertEqual(1, UpperTranslatorService().send(3, self.flaky(0)))
+        limiter = get_rate_limiter(UpperTranslatorService, 2.5, 250.0)
+        self.assertEqual(2.5, limiter.requests.rate)
+        # the request has been throttled by the limiter of the share
+        self.assertLess(limiter.requests.tokens, limiter.requests.capacity)
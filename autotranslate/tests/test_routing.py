@@ -0,0 +1,168 @@
+import asyncio
+
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from django.test import override_settings
+
+from autotranslate.services import BaseTranslatorService, RoutingTranslatorService
+from autotranslate.utils import get_translator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class PrefixTranslatorService(BaseTranslatorService):
+    def __init__(self, prefix, clock=None, latency=0.0, fail=False):
+        self.prefix = prefix
+        self.clock = clock
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    def translate_strings(self, strings, target_language, source_language='en', optimized=True):
+        self.calls += 1
+        if self.clock is not None:
+            self.clock.now += self.latency
+        if self.fail:
+            raise IOError('{} is down'.format(self.prefix))
+        return ['{}:{}'.format(self.prefix, s) for s in strings]
+
+
+class AmazonService(PrefixTranslatorService):
+    pass
+
+
+class GoogleService(PrefixTranslatorService):
+    pass
+
+
+class FlakyService(BaseTranslatorService):
+    """
+    Sends every request through `send()`, the requests fail with a retryable error.
+    """
+
+    def __init__(self):
+        self.attempts = 0
+
+    def translate_strings(self, strings, target_language, source_language='en', optimized=True):
+        return self.send(sum(len(s) for s in strings), self.request, strings)
+
+    def request(self, strings):
+        self.attempts += 1
+        raise IOError('throttled')
+
+    def is_retryable(self, exception):
+        return True
+
+
+class RoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.amazon = AmazonService('amazon', self.clock, latency=2.0)
+        self.google = GoogleService('google', self.clock, latency=1.0)
+
+    def router(self, **kwargs):
+        kwargs.setdefault('routes', {})
+        return RoutingTranslatorService([self.amazon, self.google], clock=self.clock, **kwargs)
+
+    def test_priority(self):
+        self.assertEqual(['amazon:foo'], self.router().translate_strings(['foo'], 'de'))
+
+    def test_routes(self):
+        router = self.router(routes={'ja': ['GoogleService'], 'en-fr': ['GoogleService', 'AmazonService']})
+        self.assertEqual(['google:foo'], router.translate_strings(['foo'], 'ja'))
+        self.assertEqual(['google:foo'], router.translate_strings(['foo'], 'fr'))
+        self.assertEqual(['amazon:foo'], router.translate_strings(['foo'], 'de'))
+
+    def test_fallback(self):
+        self.amazon.fail = True
+        router = self.router()
+        with self.assertLogs('autotranslate.services', 'WARNING') as logs:
+            self.assertEqual(['google:foo'], router.translate_strings(['foo'], 'de'))
+        self.assertIn('`AmazonService` failed', logs.output[0])
+        # the failed service is cooling down
+        self.assertEqual(['google:bar'], router.translate_strings(['bar'], 'de'))
+        self.assertEqual(1, self.amazon.calls)
+
+        self.clock.now += router.failure_cooldown
+        self.amazon.fail = False
+        self.assertEqual(['amazon:baz'], router.translate_strings(['baz'], 'de'))
+
+    def test_all_failing(self):
+        self.amazon.fail = self.google.fail = True
+        with self.assertRaisesRegex(RuntimeError, 'from `en` to `de`'), \
+                self.assertLogs('autotranslate.services', 'WARNING') as logs:
+            self.router().translate_strings(['foo'], 'de')
+        self.assertEqual(2, len(logs.records))
+
+    def test_unmatched_route(self):
+        router = self.router(routes={'en-ja': ['DeepLService']})
+        with self.assertRaisesRegex(RuntimeError, 'routed from `en` to `ja` \\(route `en-ja`: DeepLService\\)'):
+            router.translate_strings(['foo'], 'ja')
+        self.assertEqual(0, self.amazon.calls + self.google.calls)
+
+    def test_latency(self):
+        router = self.router(strategy='latency')
+        router.translate_strings(['foo'], 'de')
+        router.translate_strings(['foo'], 'de')
+        # both have been tried once, google is faster
+        self.assertEqual(['google:foo'], router.translate_strings(['foo'], 'de'))
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={'AmazonService': {'characters_quota': 5}})
+    def test_quota(self):
+        router = self.router()
+        self.assertEqual(['amazon:abc'], router.translate_strings(['abc'], 'de'))
+        self.assertEqual(['google:abc'], router.translate_strings(['abc'], 'de'))
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={'AmazonService': {'characters_quota': 2},
+                                                     'GoogleService': {'characters_quota': 2}})
+    def test_quota_is_a_preference(self):
+        # the quota is per process, the services are still tried when every quota is used up
+        self.assertEqual(['amazon:abc'], self.router().translate_strings(['abc'], 'de'))
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={'AmazonService': {'characters_quota': 5},
+                                                     'RoutingTranslatorService': {'max_segments': 1}})
+    def test_routes_batches(self):
+        router = self.router()
+        self.assertEqual(['amazon:abc', 'google:abc', 'google:abc'], router.translate_strings(['abc'] * 3, 'de'))
+        self.assertEqual(1, self.amazon.calls)
+        self.assertEqual(2, self.google.calls)
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={'FlakyService': {'max_retries': 3, 'retry_base_delay': 0}})
+    def test_fallback_caps_retries(self):
+        flaky = FlakyService()
+        router = RoutingTranslatorService([flaky, self.google], routes={}, clock=self.clock)
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(['google:foo'], router.translate_strings(['foo'], 'de'))
+        self.assertEqual(1 + router.fallback_max_retries, flaky.attempts)
+
+        # the last service to try is retried as configured
+        flaky.attempts = 0
+        router = RoutingTranslatorService([flaky], routes={}, clock=self.clock)
+        with self.assertRaises(RuntimeError), self.assertLogs(level='WARNING'):
+            router.translate_strings(['foo'], 'de')
+        self.assertEqual(4, flaky.attempts)
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={'FlakyService': {'max_retries': 3, 'retry_base_delay': 0}})
+    def test_async_fallback_caps_retries(self):
+        flaky = FlakyService()
+        router = RoutingTranslatorService([flaky, self.google], routes={}, clock=self.clock)
+        with self.assertLogs(level='WARNING'):
+            self.assertEqual(['google:foo'], asyncio.run(router.atranslate_strings(['foo'], 'de')))
+        self.assertEqual(1 + router.fallback_max_retries, flaky.attempts)
+
+    @override_settings(AUTOTRANSLATE_TRANSLATOR_SERVICE=['autotranslate.tests.services.UpperTranslatorService',
+                                                         'autotranslate.tests.services.UpperTranslatorService'])
+    def test_get_translator(self):
+        translator = get_translator()
+        self.assertIsInstance(translator, RoutingTranslatorService)
+        self.assertEqual(2, len(translator.services))
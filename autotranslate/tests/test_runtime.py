@@ -0,0 +1,184 @@
+import os
+import shutil
+import sys
+import tempfile
+
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+import polib
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+from django.utils import translation
+
+from autotranslate.runtime import RuntimeTranslator, get_runtime_store, is_runtime_process
+from autotranslate.tests.services import UpperTranslatorService
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+class RuntimeTranslatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.settings = override_settings(
+            AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.UpperTranslatorService',
+        )
+        self.settings.enable()
+        cache.clear()
+        del UpperTranslatorService.calls[:]
+        self.runtime = RuntimeTranslator(get_runtime_store(), max_entries=2)
+        self.runtime.install()
+
+    def tearDown(self):
+        self.runtime.uninstall()
+        self.settings.disable()
+        cache.clear()
+
+    def test_gettext(self):
+        with translation.override('de'):
+            # the catalogs of django are used first
+            self.assertEqual('Ja', translation.gettext('Yes'))
+            # the missing messages are translated in the background
+            self.assertEqual('Hello %(name)s', translation.gettext('Hello %(name)s'))
+            self.assertEqual('Hello %(name)s', translation.gettext('Hello %(name)s'))
+            self.runtime.join()
+            self.assertEqual('HELLO %(name)s', translation.gettext('Hello %(name)s'))
+            self.assertEqual('Apples', translation.ngettext('Apple', 'Apples', 2))
+            self.runtime.join()
+            self.assertEqual('APPLES', translation.ngettext('Apple', 'Apples', 2))
+
+        with translation.override('en'):
+            self.assertEqual('Hello %(name)s', translation.gettext('Hello %(name)s'))
+        self.runtime.join()
+        self.assertEqual([('de', ['Hello __0__']), ('de', ['Apples'])], UpperTranslatorService.calls)
+
+    def test_command_module_not_loaded(self):
+        # the web processes don't load the translate_messages command
+        module = 'autotranslate.management.commands.translate_messages'
+        with mock.patch.dict(sys.modules):
+            sys.modules.pop(module, None)
+            self.runtime.resolve('de', ['Hello'])
+            self.assertNotIn(module, sys.modules)
+        self.assertEqual([('de', ['Hello'])], UpperTranslatorService.calls)
+
+    def test_store_is_shared(self):
+        with translation.override('de'):
+            translation.gettext('Hello')
+            self.runtime.join()
+
+        # another process finds the translation in the django cache
+        runtime = RuntimeTranslator(get_runtime_store())
+        runtime._gettext = self.runtime._gettext
+        with translation.override('de'):
+            runtime.gettext('Hello')
+            runtime.join()
+            self.assertEqual('HELLO', runtime.gettext('Hello'))
+        self.assertEqual([('de', ['Hello'])], UpperTranslatorService.calls)
+
+    def test_evicts_least_recently_used(self):
+        self.runtime.remember('de', {'a': 'A', 'b': 'B'})
+        with translation.override('de'):
+            self.assertEqual('A', translation.gettext('a'))
+        self.runtime.remember('de', {'c': 'C'})
+        self.assertEqual(['a', 'c'], list(self.runtime._memory['de']))
+
+    @override_settings(AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.FailingTranslatorService')
+    def test_failures_back_off(self):
+        clock = FakeClock()
+        runtime = RuntimeTranslator(get_runtime_store(), failure_cooldown=10, clock=clock)
+        runtime._gettext = self.runtime._gettext
+        with translation.override('de'), self.assertLogs('autotranslate.runtime', 'ERROR'):
+            runtime.gettext('Hello')
+            runtime.join()
+            # the failed message isn't requested again during the cooldown
+            clock.now = 9
+            self.assertEqual('Hello', runtime.gettext('Hello'))
+            runtime.join()
+            self.assertEqual(1, len(UpperTranslatorService.calls))
+
+            clock.now = 10
+            runtime.gettext('Hello')
+            runtime.join()
+            self.assertEqual(2, len(UpperTranslatorService.calls))
+            # the cooldown doubles after every consecutive failure
+            clock.now = 29
+            runtime.gettext('Hello')
+            runtime.join()
+            self.assertEqual(2, len(UpperTranslatorService.calls))
+
+    def test_install_unsupported_django(self):
+        with mock.patch.object(translation, '_trans', object()):
+            with self.assertRaises(ImproperlyConfigured):
+                RuntimeTranslator(get_runtime_store()).install()
+
+    def test_is_runtime_process(self):
+        self.assertTrue(is_runtime_process(['gunicorn', 'project.wsgi']))
+        self.assertTrue(is_runtime_process(['manage.py', 'runserver']))
+        self.assertFalse(is_runtime_process(['manage.py', 'translate_messages']))
+        self.assertFalse(is_runtime_process(['/usr/lib/python3/site-packages/django/__main__.py', 'migrate']))
+        with override_settings(AUTOTRANSLATE_RUNTIME_COMMANDS=['rqworker']):
+            self.assertTrue(is_runtime_process(['django-admin', 'rqworker']))
+            self.assertFalse(is_runtime_process(['manage.py', 'runserver']))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlushTranslationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.directory, 'de', 'LC_MESSAGES'))
+        shutil.copy(os.path.join(DATA_DIR, 'django.po'), self.po_path())
+        del UpperTranslatorService.calls[:]
+
+        # the store is shared by the processes
+        self.settings = override_settings(
+            LOCALE_PATHS=[self.directory],
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'runtime': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                            'LOCATION': os.path.join(self.directory, 'cache')},
+            },
+            AUTOTRANSLATE_RUNTIME_OPTIONS={'cache_alias': 'runtime'},
+            AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.UpperTranslatorService',
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def po_path(self):
+        return os.path.join(self.directory, 'de', 'LC_MESSAGES', 'django.po')
+
+    def test_flush(self):
+        runtime = RuntimeTranslator(get_runtime_store())
+        runtime.resolve('de', ['Location'])
+        del UpperTranslatorService.calls[:]
+
+        call_command('flush_translations', set_fuzzy=True)
+        po = polib.pofile(self.po_path())
+        self.assertEqual('LOCATION', po.find('Location').msgstr)
+        self.assertIn('fuzzy', po.find('Location').flags)
+        self.assertEqual('', po.find('City').msgstr_plural[0])
+        self.assertEqual([], UpperTranslatorService.calls)
+
+    def test_flush_local_cache(self):
+        with override_settings(AUTOTRANSLATE_RUNTIME_OPTIONS={'cache_alias': 'default'}):
+            with self.assertRaisesRegex(CommandError, 'not shared by the processes'):
+                call_command('flush_translations')
@@ -0,0 +1,67 @@
+import threading
+import time
+
+try:
+    # python2.6
+    import unittest2 as unittest
+except ImportError:
+    import unittest
+
+from django.test import override_settings
+
+from autotranslate import services
+from autotranslate.services import AmazonTranslateTranslatorService
+from autotranslate.tests.services import UpperTranslatorService
+
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
+
+class FakeAmazonClient:
+    def __init__(self):
+        self.texts = []
+
+    def translate_text(self, Text, SourceLanguageCode, TargetLanguageCode):
+        self.texts.append(Text)
+        return {'TranslatedText': '{}:{}'.format(TargetLanguageCode, Text)}
+
+
+class AmazonTranslateTranslatorServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        # boto3 isn't required, the client is replaced
+        self.service = AmazonTranslateTranslatorService.__new__(AmazonTranslateTranslatorService)
+        self.service.service = FakeAmazonClient()
+
+    @override_settings(AUTOTRANSLATE_SERVICE_LIMITS={'AmazonTranslateTranslatorService': {'max_segments': 3}})
+    def test_translate_strings_in_batches(self):
+        self.assertEqual(['de:a', 'de:b', 'de:c', 'de:d'],
+                         self.service.translate_strings(['a', 'b', 'c', 'd'], 'de'))
+        self.assertEqual(['a', 'b', 'c', 'd'], self.service.service.texts)
+
+    def test_oversized_string(self):
+        with self.assertRaisesRegex(ValueError, 'at most 10000 bytes, got a text of 10002 bytes'):
+            self.service.translate_strings(['a', 'ü' * 5001], 'de')
+
+
+class GetExecutorTestCase(unittest.TestCase):
+    def test_concurrent_calls(self):
+        service = UpperTranslatorService()
+        get_service_limits = services.get_service_limits
+
+        def slow_get_service_limits(service):
+            # widens the window between the check and the creation of the executor
+            time.sleep(0.05)
+            return get_service_limits(service)
+
+        executors = []
+        with mock.patch('autotranslate.services.get_service_limits', slow_get_service_limits):
+            threads = [threading.Thread(target=lambda: executors.append(service.get_executor())) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(4, len(executors))
+        self.assertEqual(1, len(set(map(id, executors))))
+        service.close()
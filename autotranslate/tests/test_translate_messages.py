@@ -1,4 +1,8 @@
 import os
+import shutil
+import tempfile
+import tracemalloc
+import types
 
 try:
     # python2.6
@@ -6,9 +10,21 @@ try:
 except ImportError:
     import unittest
 
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+
 import polib
+from django.core.management import call_command
+from django.test import override_settings
 
 from autotranslate.management.commands.translate_messages import humanize_placeholders, restore_placeholders, Command
+from autotranslate.metrics import metrics
+from autotranslate.tests.services import MultiUpperTranslatorService, UpperTranslatorService
+from autotranslate.utils import atomic_write, compile_catalog
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
 
 
 class HumanizeTestCase(unittest.TestCase):
@@ -73,3 +89,401 @@ class POFileTestCase(unittest.TestCase):
         self.assertEqual(['PLURAL'] * (len(entry.msgstr_plural) - 1),
                          [v for k, v in entry.msgstr_plural.items() if k != 0])
         self.assertTrue(entry.translated())
+
+
+class CommandTestCase(unittest.TestCase):
+    locales = ('de', 'fr', 'it')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        for locale in self.locales:
+            os.makedirs(os.path.join(self.directory, locale, 'LC_MESSAGES'))
+            shutil.copy(os.path.join(DATA_DIR, 'django.po'), self.po_path(locale))
+        del UpperTranslatorService.calls[:]
+
+        self.settings = override_settings(
+            LOCALE_PATHS=[self.directory],
+            AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.UpperTranslatorService',
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.directory)
+
+    def po_path(self, locale):
+        return os.path.join(self.directory, locale, 'LC_MESSAGES', 'django.po')
+
+    def assertTranslated(self, locale):
+        po = polib.pofile(self.po_path(locale))
+        self.assertEqual('LOCATION', po.find('Location').msgstr)
+        self.assertEqual('CITY', po.find('City').msgstr_plural[0])
+        self.assertEqual('CITIES', po.find('City').msgstr_plural[1])
+
+    def test_translate(self):
+        call_command('translate_messages')
+        for locale in self.locales:
+            self.assertTranslated(locale)
+
+    def test_translate_locale(self):
+        call_command('translate_messages', locale=['fr'])
+        self.assertTranslated('fr')
+        self.assertEqual(['fr'], [language for language, strings in UpperTranslatorService.calls])
+
+    def test_translate_concurrently(self):
+        call_command('translate_messages', jobs=3)
+        for locale in self.locales:
+            self.assertTranslated(locale)
+        self.assertEqual(sorted(self.locales),
+                         sorted(language for language, strings in UpperTranslatorService.calls))
+
+    def test_translate_async(self):
+        call_command('translate_messages', use_async=True, jobs=2)
+        for locale in self.locales:
+            self.assertTranslated(locale)
+        # the stages are timed as in the synchronous runs
+        histograms = {h['name']: h['count'] for h in metrics.as_dict()['histograms']}
+        self.assertEqual(len(self.locales), histograms['autotranslate_translate_seconds'])
+        self.assertEqual(len(self.locales), histograms['autotranslate_parse_seconds'])
+
+    def test_translate_dedupe(self):
+        shutil.copy(self.po_path('de'), os.path.join(self.directory, 'de', 'LC_MESSAGES', 'djangojs.po'))
+        call_command('translate_messages', locale=['de'], dedupe=True)
+        self.assertTranslated('de')
+        self.assertEqual([('de', ['Location', 'City', 'Cities'])], UpperTranslatorService.calls)
+        po = polib.pofile(os.path.join(self.directory, 'de', 'LC_MESSAGES', 'djangojs.po'))
+        self.assertEqual('LOCATION', po.find('Location').msgstr)
+
+    def test_translate_incremental(self):
+        options = dict(locale=['de'], incremental=True, manifest=os.path.join(self.directory, 'manifest.json'))
+        call_command('translate_messages', **options)
+        self.assertTranslated('de')
+        self.assertEqual(1, len(UpperTranslatorService.calls))
+
+        # nothing changed, the file isn't even parsed
+        mtime = os.stat(self.po_path('de')).st_mtime
+        call_command('translate_messages', **options)
+        self.assertEqual(1, len(UpperTranslatorService.calls))
+        self.assertEqual(mtime, os.stat(self.po_path('de')).st_mtime)
+
+        # only the new entry is translated
+        po = polib.pofile(self.po_path('de'))
+        po.append(polib.POEntry(msgid='Country', msgstr=''))
+        po.save()
+        call_command('translate_messages', **options)
+        self.assertEqual(('de', ['Country']), UpperTranslatorService.calls[-1])
+        self.assertEqual('COUNTRY', polib.pofile(self.po_path('de')).find('Country').msgstr)
+
+    def test_unmodified_file_is_not_saved(self):
+        call_command('translate_messages', locale=['de'])
+        mtime = os.stat(self.po_path('de')).st_mtime_ns
+        call_command('translate_messages', locale=['de'])
+        self.assertEqual(mtime, os.stat(self.po_path('de')).st_mtime_ns)
+
+    def test_translate_checkpoint(self):
+        po = polib.pofile(self.po_path('de'))
+        for i in range(5):
+            po.append(polib.POEntry(msgid='String {}'.format(i), msgstr=''))
+        po.save()
+
+        # fail while translating the second batch
+        original = UpperTranslatorService.translate_strings
+
+        def translate_strings(service, strings, *args, **kwargs):
+            if len(UpperTranslatorService.calls) == 1:
+                raise IOError('connection lost')
+            return original(service, strings, *args, **kwargs)
+
+        UpperTranslatorService.translate_strings = translate_strings
+        try:
+            with self.assertRaises(IOError):
+                call_command('translate_messages', locale=['de'], checkpoint=True, checkpoint_size=3)
+        finally:
+            UpperTranslatorService.translate_strings = original
+
+        # the first batch has been saved
+        po = polib.pofile(self.po_path('de'))
+        self.assertEqual('LOCATION', po.find('Location').msgstr)
+        self.assertEqual('', po.find('String 0').msgstr)
+        self.assertTrue(os.path.exists(self.po_path('de') + '.checkpoint'))
+
+        call_command('translate_messages', locale=['de'], checkpoint=True, checkpoint_size=3)
+        self.assertEqual([('de', ['Location', 'City', 'Cities']),
+                          ('de', ['String 0', 'String 1', 'String 2']),
+                          ('de', ['String 3', 'String 4'])], UpperTranslatorService.calls)
+        self.assertTranslated('de')
+        self.assertEqual('STRING 4', polib.pofile(self.po_path('de')).find('String 4').msgstr)
+        self.assertFalse(os.path.exists(self.po_path('de') + '.checkpoint'))
+
+    def test_translator_is_constructed_once(self):
+        from autotranslate.utils import get_translator
+
+        constructed = []
+        original = UpperTranslatorService.__init__
+        UpperTranslatorService.__init__ = lambda service: constructed.append(service)
+        try:
+            call_command('translate_messages', jobs=3)
+        finally:
+            UpperTranslatorService.__init__ = original
+        self.assertEqual(1, len(constructed))
+        self.assertIs(constructed[0], get_translator())
+
+        # the translators are reset with the settings
+        with override_settings(AUTOTRANSLATE_CACHE=None):
+            self.assertIsNot(constructed[0], get_translator())
+
+    def test_stats_file(self):
+        import json
+
+        stats_file = os.path.join(self.directory, 'stats.json')
+        call_command('translate_messages', locale=['de', 'fr'], stats_file=stats_file)
+        with open(stats_file) as f:
+            counters = {c['name']: c['value'] for c in json.load(f)['counters'] if not c['labels']}
+        self.assertEqual(2, counters['autotranslate_files_total'])
+        self.assertEqual(6, counters['autotranslate_strings_total'])
+
+        stats_file = os.path.join(self.directory, 'stats.prom')
+        call_command('translate_messages', locale=['de'], stats_file=stats_file)
+        with open(stats_file) as f:
+            stats = f.read()
+        self.assertIn('autotranslate_files_total 1\n', stats)
+        self.assertIn('autotranslate_parse_seconds_bucket{le="+Inf"} 1\n', stats)
+
+    def test_estimate(self):
+        import io
+
+        with open(self.po_path('de'), 'rb') as f:
+            content = f.read()
+        out = io.StringIO()
+        call_command('translate_messages', estimate=True, estimate_latency=2, stdout=out)
+        output = out.getvalue()
+
+        self.assertEqual([], UpperTranslatorService.calls)
+        with open(self.po_path('de'), 'rb') as f:
+            self.assertEqual(content, f.read())
+        self.assertIn('{}\t3 strings\t18 characters'.format(self.po_path('de')), output)
+        self.assertIn('total\t3 files\t9 strings\t54 characters\t3 requests', output)
+        self.assertIn('estimated duration: 6.0s at 2s per request', output)
+
+    def test_translate_domain(self):
+        shutil.copy(self.po_path('de'), os.path.join(self.directory, 'de', 'LC_MESSAGES', 'djangojs.po'))
+        call_command('translate_messages', locale=['de'], domain=['djangojs'])
+        self.assertEqual('', polib.pofile(self.po_path('de')).find('Location').msgstr)
+        self.assertEqual('LOCATION', polib.pofile(
+            os.path.join(self.directory, 'de', 'LC_MESSAGES', 'djangojs.po')).find('Location').msgstr)
+
+    def test_find_files(self):
+        # only the LC_MESSAGES directories of the requested locales are searched
+        os.makedirs(os.path.join(self.directory, 'node_modules', 'de', 'LC_MESSAGES'))
+        shutil.copy(self.po_path('de'), os.path.join(self.directory, 'node_modules', 'de', 'LC_MESSAGES'))
+        shutil.copy(self.po_path('de'), os.path.join(self.directory, 'de'))
+
+        cmd = Command()
+        cmd.set_options(locale=['de', 'it'], set_fuzzy=False, skip_translated=False)
+        self.assertEqual([(os.path.join(self.directory, 'de', 'LC_MESSAGES'), 'django.po', 'de'),
+                          (os.path.join(self.directory, 'it', 'LC_MESSAGES'), 'django.po', 'it')],
+                         list(cmd.find_files()))
+
+        # the apps of the project are searched, not the ones installed as packages (django.contrib.admin)
+        from django.apps import apps
+        app = os.path.join(self.directory, 'app')
+        os.makedirs(os.path.join(app, 'locale', 'de', 'LC_MESSAGES'))
+        shutil.copy(self.po_path('de'), os.path.join(app, 'locale', 'de', 'LC_MESSAGES', 'djangojs.po'))
+        app_configs = list(apps.get_app_configs()) + [types.SimpleNamespace(name='app', path=app)]
+        cmd.set_options(locale=['de'], set_fuzzy=False, skip_translated=False, include_apps=True, domain=['djangojs'])
+        with mock.patch.object(apps, 'get_app_configs', return_value=app_configs):
+            self.assertEqual([(os.path.join(app, 'locale', 'de', 'LC_MESSAGES'), 'djangojs.po', 'de')],
+                             list(cmd.find_files()))
+
+    def test_translate_streamed(self):
+        shutil.copy(self.po_path('de'), os.path.join(self.directory, 'de', 'LC_MESSAGES', 'djangojs.po'))
+        call_command('translate_messages', locale=['de'], dedupe=True, stream=True, window_size=2)
+        self.assertTranslated('de')
+        self.assertEqual('LOCATION', polib.pofile(
+            os.path.join(self.directory, 'de', 'LC_MESSAGES', 'djangojs.po')).find('Location').msgstr)
+        # the windows span the message files, only the translations of a window are kept
+        self.assertEqual([('de', ['Location', 'City', 'Cities']),
+                          ('de', ['Location', 'City', 'Cities'])], UpperTranslatorService.calls)
+
+    def test_translate_streamed_translation_memory(self):
+        shutil.copy(self.po_path('de'), os.path.join(self.directory, 'de', 'LC_MESSAGES', 'djangojs.po'))
+        with override_settings(AUTOTRANSLATE_CACHE='autotranslate.cache.SQLiteTranslationCache',
+                               AUTOTRANSLATE_CACHE_OPTIONS={'path': os.path.join(self.directory, 'cache.sqlite3')}):
+            call_command('translate_messages', locale=['de'], dedupe=True, stream=True, window_size=2)
+        self.assertTranslated('de')
+        # the strings of the previous windows are found in the translation memory
+        self.assertEqual([('de', ['Location', 'City', 'Cities'])], UpperTranslatorService.calls)
+
+    def test_translate_streamed_memory(self):
+        path = os.path.join(self.directory, 'de', 'LC_MESSAGES', 'django.po')
+        po = polib.POFile()
+        for i in range(5000):
+            po.append(polib.POEntry(msgid='Message %(count)s of the catalog {}'.format(i), msgstr=''))
+        po.save(path)
+        po = polib.pofile(path)
+
+        command = Command()
+        command.set_options(locale=['de'], set_fuzzy=False, skip_translated=False, stream=True, window_size=50)
+        command.save_catalog = lambda po, path: None
+        tracemalloc.start()
+        try:
+            command.translate_streamed('de', [po], [path])
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual('MESSAGE %(count)s OF THE CATALOG 4999', po[-1].msgstr)
+        # beyond the translations stored into the catalog, only about a window is held at once
+        self.assertLess(peak - current, 128 * 1024)
+        self.assertEqual({}, command._protected)
+
+    def test_translate_fan_out(self):
+        po = polib.pofile(self.po_path('it'))
+        po.find('Location').msgstr = 'Posizione'
+        po.save()
+
+        call_command('translate_messages', skip_translated=True, fan_out_languages=True)
+        for locale in ('de', 'fr'):
+            self.assertTranslated(locale)
+        self.assertEqual('Posizione', polib.pofile(self.po_path('it')).find('Location').msgstr)
+        # the service translates into one language per request, a request is sent per language
+        self.assertEqual([('de', ['Location', 'City', 'Cities']), ('fr', ['Location', 'City', 'Cities']),
+                          ('it', ['City', 'Cities'])], UpperTranslatorService.calls)
+
+    @override_settings(AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.MultiUpperTranslatorService')
+    def test_translate_fan_out_multi_target(self):
+        del MultiUpperTranslatorService.multi_calls[:]
+        po = polib.pofile(self.po_path('it'))
+        po.find('Location').msgstr = 'Posizione'
+        po.save()
+
+        call_command('translate_messages', skip_translated=True, fan_out_languages=True, jobs=2)
+        for locale in ('de', 'fr'):
+            self.assertTranslated(locale)
+        # every string is translated into all the locales that need it at once
+        self.assertEqual([(['de', 'fr'], ['Location']), (['de', 'fr', 'it'], ['City', 'Cities'])],
+                         sorted(MultiUpperTranslatorService.multi_calls))
+
+    @override_settings(AUTOTRANSLATE_TRANSLATOR_SERVICE='autotranslate.tests.services.MultiUpperTranslatorService')
+    def test_translate_fan_out_size(self):
+        del MultiUpperTranslatorService.multi_calls[:]
+        call_command('translate_messages', fan_out_languages=True, fan_out_size=2)
+        for locale in self.locales:
+            self.assertTranslated(locale)
+        # the locales are prepared two at a time
+        self.assertEqual([list(self.locales[:2]), list(self.locales[2:])],
+                         [languages for languages, strings in MultiUpperTranslatorService.multi_calls])
+
+    def test_compile(self):
+        call_command('translate_messages', locale=['de'], compile=True)
+        mo_path = os.path.join(self.directory, 'de', 'LC_MESSAGES', 'django.mo')
+        self.assertEqual('LOCATION', polib.mofile(mo_path).find('Location').msgstr)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'fr', 'LC_MESSAGES', 'django.mo')))
+
+        # the catalogs that are not modified are not compiled again
+        os.remove(mo_path)
+        call_command('translate_messages', locale=['de'], compile=True)
+        self.assertFalse(os.path.exists(mo_path))
+
+    def test_compile_mode(self):
+        mo_path = os.path.join(self.directory, 'de', 'LC_MESSAGES', 'django.mo')
+        umask = os.umask(0o027)
+        try:
+            compile_catalog(polib.pofile(self.po_path('de')), self.po_path('de'))
+            # a new file gets the mode `open()` would give it
+            self.assertEqual(0o640, os.stat(mo_path).st_mode & 0o777)
+            # the mode of the replaced file is kept
+            os.chmod(mo_path, 0o604)
+            compile_catalog(polib.pofile(self.po_path('de')), self.po_path('de'))
+            self.assertEqual(0o604, os.stat(mo_path).st_mode & 0o777)
+        finally:
+            os.umask(umask)
+
+    def test_atomic_write_mode(self):
+        path = os.path.join(self.directory, 'stats.json')
+        umask = os.umask(0o027)
+        try:
+            atomic_write(path, '{}')
+            self.assertEqual(0o640, os.stat(path).st_mode & 0o777)
+            os.chmod(path, 0o604)
+            atomic_write(path, '{}')
+            self.assertEqual(0o604, os.stat(path).st_mode & 0o777)
+        finally:
+            os.umask(umask)
+
+    def test_fast_catalog(self):
+        with open(self.po_path('de'), 'rb') as f:
+            original = f.read()
+        call_command('translate_messages', locale=['de'], fast_catalog=True, set_fuzzy=True)
+        self.assertTranslated('de')
+        self.assertTrue(polib.pofile(self.po_path('de')).find('Location').fuzzy)
+
+        # only the translations and flags are written, the rest of the file is kept as is
+        with open(self.po_path('de'), 'rb') as f:
+            lines = f.read().splitlines()
+        kept = (b'msgstr', b'#, fuzzy')
+        self.assertEqual([line for line in original.splitlines() if not line.startswith(kept)],
+                         [line for line in lines if not line.startswith(kept)])
+
+    def test_shard_and_merge(self):
+        shards = []
+        strings = []
+        for shard in ('1/2', '2/2'):
+            directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, directory)
+            shutil.rmtree(directory)
+            shutil.copytree(self.directory, directory)
+            with override_settings(LOCALE_PATHS=[directory]):
+                call_command('translate_messages', shard=shard)
+            shards.append(directory)
+            strings.append([s for language, call in UpperTranslatorService.calls for s in call])
+            del UpperTranslatorService.calls[:]
+
+        # the entries of the files are split between the shards, by number of characters
+        self.assertEqual(sorted(['Location', 'City', 'Cities'] * 3), sorted(strings[0] + strings[1]))
+        self.assertEqual([28, 26], [sum(len(s) for s in shard_strings) for shard_strings in strings])
+
+        call_command('translate_messages', merge=shards)
+        for locale in self.locales:
+            self.assertTranslated(locale)
+
+    def test_invalid_shard(self):
+        from django.core.management.base import CommandError
+
+        for shard in ('3/2', '0/2', '1'):
+            with self.assertRaises(CommandError):
+                call_command('translate_messages', shard=shard)
+
+    def test_fuzzy_match(self):
+        po = polib.pofile(self.po_path('de'))
+        po.find('Location').msgstr = 'Ort'
+        po.append(polib.POEntry(msgid='Location:', msgstr=''))
+        po.append(polib.POEntry(msgid='Country', msgstr=''))
+        po.save()
+
+        logger = 'autotranslate.management.commands.translate_messages'
+        with self.assertLogs(logger, 'INFO') as logs:
+            call_command('translate_messages', locale=['de'], skip_translated=True, fuzzy_match=0.9)
+        # the locale paths are listed once per run, not again to index the translated messages
+        skipped = [message for message in logs.output if 'skipping translation for locale' in message]
+        self.assertTrue(skipped)
+        self.assertEqual(len(set(skipped)), len(skipped))
+        po = polib.pofile(self.po_path('de'))
+        self.assertEqual('Ort', po.find('Location:').msgstr)
+        self.assertIn('fuzzy', po.find('Location:').flags)
+        self.assertEqual('COUNTRY', po.find('Country').msgstr)
+        self.assertNotIn('fuzzy', po.find('Country').flags)
+        self.assertEqual([('de', ['City', 'Cities', 'Country'])], UpperTranslatorService.calls)
+
+    def test_fuzzy_match_translated_entries(self):
+        po = polib.pofile(self.po_path('de'))
+        po.find('Location').msgstr = 'Ort'
+        po.append(polib.POEntry(msgid='Location:', msgstr=''))
+        po.save()
+
+        # the translated entries are translated again, not matched with their own translation
+        call_command('translate_messages', locale=['de'], fuzzy_match=0.9)
+        po = polib.pofile(self.po_path('de'))
+        self.assertEqual('LOCATION', po.find('Location').msgstr)
+        self.assertEqual([], po.find('Location').flags)
+        self.assertEqual('Ort', po.find('Location:').msgstr)
+        self.assertIn('fuzzy', po.find('Location:').flags)
@@ -1,3 +1,9 @@
+import collections
+import inspect
+import os
+import tempfile
+import threading
+
 import six
 
 from autotranslate.compat import importlib
@@ -32,11 +38,178 @@ def import_from_string(val, setting_name):
         raise ImportError('Could not import {} for API setting {}. {}: {}.'
                           .format(val, setting_name, e.__class__.__name__, e))
 
+_translators = {}
+_translators_lock = threading.Lock()
+
+
 def get_translator():
     """
     Returns the default translator.
+
+    The translator is constructed once, when first requested, and shared by all
+    the callers of the process; the translator services are thread safe.
+    When several translator services are configured, the requests are routed
+    across them (see `autotranslate.services.RoutingTranslatorService`).
     """
     TranslatorService = getattr(settings, 'AUTOTRANSLATE_TRANSLATOR_SERVICE',
                                 'autotranslate.services.GoogleTranslatorService')
-    translator = perform_import(TranslatorService, 'AUTOTRANSLATE_TRANSLATOR_SERVICE')()
+    if isinstance(TranslatorService, list):
+        TranslatorService = tuple(TranslatorService)
+    key = (TranslatorService, getattr(settings, 'AUTOTRANSLATE_CACHE', None))
+
+    translator = _translators.get(key)
+    if translator is None:
+        with _translators_lock:
+            translator = _translators.get(key)
+            if translator is None:
+                translator = _translators[key] = create_translator(TranslatorService)
     return translator
+
+
+def get_translator_class():
+    """
+    Returns the class of the configured translator service, without constructing it;
+    the first one if several translator services are configured.
+    """
+    TranslatorService = perform_import(getattr(settings, 'AUTOTRANSLATE_TRANSLATOR_SERVICE',
+                                               'autotranslate.services.GoogleTranslatorService'),
+                                       'AUTOTRANSLATE_TRANSLATOR_SERVICE')
+    if isinstance(TranslatorService, (list, tuple)):
+        return TranslatorService[0]
+    return TranslatorService
+
+
+def create_translator(TranslatorService):
+    """
+    Returns a new instance of the translator service, behind the translation memory if configured.
+    """
+    TranslatorService = perform_import(TranslatorService, 'AUTOTRANSLATE_TRANSLATOR_SERVICE')
+    if isinstance(TranslatorService, (list, tuple)):
+        from autotranslate.services import RoutingTranslatorService
+        translator = RoutingTranslatorService([Service() for Service in TranslatorService])
+    else:
+        translator = TranslatorService()
+
+    cache = get_translation_cache()
+    if cache is not None:
+        from autotranslate.services import CachedTranslatorService
+        translator = CachedTranslatorService(translator, cache)
+    return translator
+
+
+def reset_translators():
+    """
+    Closes the translators constructed so far and forgets them, e.g. when the settings change:
+    their translation memories are closed and their thread pools shut down.
+    """
+    with _translators_lock:
+        translators = list(_translators.values())
+        _translators.clear()
+    for translator in translators:
+        translator.close()
+
+
+def unique(strings):
+    """Return the distinct strings, in order of appearance."""
+    return list(collections.OrderedDict.fromkeys(strings))
+
+
+def get_translation_cache(**overrides):
+    """
+    Returns the configured translation memory, or None if it is disabled.
+
+    :param overrides: options overriding the `AUTOTRANSLATE_CACHE_OPTIONS`, e.g. `read_only=True`,
+                      only passed to the translation memories accepting them
+    """
+    TranslationCache = getattr(settings, 'AUTOTRANSLATE_CACHE', None)
+    if not TranslationCache:
+        return None
+    TranslationCache = perform_import(TranslationCache, 'AUTOTRANSLATE_CACHE')
+    parameters = inspect.signature(TranslationCache).parameters
+    accepts_any = any(parameter.kind == parameter.VAR_KEYWORD for parameter in parameters.values())
+    options = dict(getattr(settings, 'AUTOTRANSLATE_CACHE_OPTIONS', {}))
+    options.update((name, value) for name, value in overrides.items() if accepts_any or name in parameters)
+    return TranslationCache(**options)
+
+
+_umask_lock = threading.Lock()
+
+
+def get_umask():
+    """
+    Returns the file mode creation mask of the process.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    # the mask can only be read by setting it
+    with _umask_lock:
+        umask = os.umask(0o022)
+        os.umask(umask)
+    return umask
+
+
+def get_file_mode(path):
+    """
+    Returns the permission bits of the file, or the ones `open()` would give to a new file.
+    """
+    try:
+        return os.stat(path).st_mode & 0o777
+    except FileNotFoundError:
+        return 0o666 & ~get_umask()
+
+
+def atomic_write(path, data, encoding='utf-8'):
+    """
+    Writes the string (or bytes) to the file atomically, the data is written to
+    a temporary file in the same directory which then replaces the file.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.{}.'.format(name))
+    try:
+        with (os.fdopen(fd, 'wb') if isinstance(data, bytes) else os.fdopen(fd, 'w', encoding=encoding)) as f:
+            f.write(data)
+        # the temporary file is only readable by its owner
+        os.chmod(tmp_path, get_file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_catalog(po, path):
+    """
+    Saves the POFile (or `autotranslate.catalog.Catalog`) atomically,
+    a crash never leaves a truncated message file behind.
+    """
+    if hasattr(po, 'to_bytes'):
+        atomic_write(path, po.to_bytes())
+    else:
+        atomic_write(path, po.__unicode__(), encoding=po.encoding)
+
+
+def compile_catalog(po, path):
+    """
+    Writes the compiled (`.mo`) catalog of the POFile (or `Catalog`) next to the message file, atomically.
+
+    :param path: path of the message (`.po`) file
+    """
+    mo_path = os.path.splitext(path)[0] + '.mo'
+    directory, name = os.path.split(os.path.abspath(mo_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.{}.'.format(name))
+    os.close(fd)
+    try:
+        po.save_as_mofile(tmp_path)
+        # the temporary file is only readable by its owner
+        os.chmod(tmp_path, get_file_mode(mo_path))
+        os.replace(tmp_path, mo_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return mo_path
@@ -0,0 +1,85 @@
+"""
+Benchmarks the message file reader and writer of `autotranslate.catalog` against polib.
+
+Generates a synthetic message file and reports, for both, the time to parse it, the memory
+held by the parsed entries, and the time to save it once some of its entries are translated.
+
+usage: python benchmarks/catalog.py --entries 50000 --modified 0.1
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.translate_messages import make_catalog  # noqa: E402
+
+
+def best_of(func, repeat):
+    """Return the result of the function and the best of its durations."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        durations.append(time.perf_counter() - start)
+    return result, min(durations)
+
+
+def measure(name, load, save, path, options):
+    po, parse_seconds = best_of(lambda: load(path), options.repeat)
+
+    tracemalloc.start()
+    po = load(path)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    step = max(1, int(1 / options.modified)) if options.modified else 0
+    for index, entry in enumerate(po):
+        if step and index % step == 0:
+            if entry.msgid_plural:
+                entry.msgstr_plural[0] = entry.msgid.upper()
+                entry.msgstr_plural[1] = entry.msgid_plural.upper()
+            else:
+                entry.msgstr = entry.msgid.upper()
+    output = path + '.' + name
+    _, save_seconds = best_of(lambda: save(po, output), options.repeat)
+    print('{:<10}{:>12.3f}{:>12.3f}{:>14.1f}'.format(name, parse_seconds, save_seconds, memory / 1024.0 / 1024.0))
+    return output
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--entries', type=int, default=20000, help='entries of the message file (default: 20000)')
+    parser.add_argument('--plurals', type=float, default=0.1, help='ratio of plural entries (default: 0.1)')
+    parser.add_argument('--modified', type=float, default=0.1,
+                        help='ratio of the entries translated before saving (default: 0.1)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of every measure, the best is kept (default: 3)')
+    options = parser.parse_args(argv)
+
+    import polib
+    from autotranslate import catalog
+    from autotranslate.utils import save_catalog
+
+    directory = tempfile.mkdtemp(prefix='autotranslate-benchmark-')
+    try:
+        path = os.path.join(directory, 'django.po')
+        make_catalog(path, options.entries, options.plurals, duplicates=0.0, seed=0)
+        print('{} entries, {:.1f} MiB, {:.0%} of the entries modified'.format(
+            options.entries, os.path.getsize(path) / 1024.0 / 1024.0, options.modified))
+        print('{:<10}{:>12}{:>12}{:>14}'.format('', 'parse (s)', 'save (s)', 'entries (MiB)'))
+        measure('polib', polib.pofile, save_catalog, path, options)
+        output = measure('catalog', catalog.pofile, save_catalog, path, options)
+
+        # both files hold the same translations
+        assert [(entry.msgid, entry.msgstr, entry.msgstr_plural) for entry in polib.pofile(output)] == \
+            [(entry.msgid, entry.msgstr, entry.msgstr_plural) for entry in polib.pofile(path + '.polib')]
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
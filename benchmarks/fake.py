@@ -0,0 +1,65 @@
+"""
+In-process translator service used by the benchmarks.
+"""
+import random
+import threading
+import time
+
+from autotranslate.services import BaseTranslatorService
+
+
+class FakeThrottlingError(Exception):
+    pass
+
+
+class FakeTranslatorService(BaseTranslatorService):
+    """
+    Reverses the strings, after sleeping `latency` seconds per request (plus `latency_per_string`
+    per string) and failing a request with a retryable error with a probability of `error_rate`.
+
+    Configure it through the class attributes, they are read by every instance.
+    """
+
+    latency = 0.0
+    latency_per_string = 0.0
+    error_rate = 0.0
+
+    max_segments = 128
+    max_concurrency = None
+    retry_base_delay = 0.0
+
+    # statistics, shared by all the instances
+    requests = 0
+    errors = 0
+    strings = 0
+    characters = 0
+    lock = threading.Lock()
+
+    @classmethod
+    def reset(cls):
+        cls.requests = cls.errors = cls.strings = cls.characters = 0
+
+    def translate_string(self, text, target_language, source_language='en'):
+        return self.translate_strings([text], target_language, source_language)[0]
+
+    def translate_strings(self, strings, target_language, source_language='en', optimized=True):
+        translated = []
+        strings = list(strings)
+        for i in range(0, len(strings), self.max_segments or len(strings) or 1):
+            batch = strings[i:i + self.max_segments] if self.max_segments else strings
+            translated.extend(self.send(sum(len(s) for s in batch), self._request, batch))
+        return translated
+
+    def _request(self, strings):
+        time.sleep(self.latency + self.latency_per_string * len(strings))
+        with self.lock:
+            type(self).requests += 1
+            if self.error_rate and random.random() < self.error_rate:
+                type(self).errors += 1
+                raise FakeThrottlingError('slow down')
+            type(self).strings += len(strings)
+            type(self).characters += sum(len(s) for s in strings)
+        return [s[::-1] for s in strings]
+
+    def is_retryable(self, exception):
+        return isinstance(exception, FakeThrottlingError)
@@ -0,0 +1,76 @@
+"""
+Benchmarks the fuzzy translation memory (`autotranslate.fuzzy.FuzzyIndex`) on a large synthetic catalog.
+
+Reports the time to index the messages, the time per lookup of unrelated messages and of
+near-duplicates (an edited character), and how many near-duplicates are found compared with
+an exhaustive search (every n-gram read, `max_postings` unbounded).
+
+usage: python benchmarks/fuzzy.py --entries 100000 --lookups 2000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autotranslate.fuzzy import FuzzyIndex  # noqa: E402
+
+COMMON_WORDS = ('the', 'a', 'to', 'of', 'and', 'your', 'is', 'in', 'for', 'this')
+
+
+def make_messages(count, rng):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = [''.join(rng.choice(letters) for _ in range(rng.randint(3, 9))) for _ in range(3000)]
+
+    def message():
+        return ' '.join(rng.choice(COMMON_WORDS if rng.random() < 0.4 else words)
+                        for _ in range(rng.randint(3, 12))).capitalize()
+    return message, [message() for _ in range(count)]
+
+
+def edit(message, rng):
+    position = rng.randrange(len(message))
+    return message[:position] + rng.choice('abcdefghijklmnopqrstuvwxyz') + message[position + 1:]
+
+
+def lookups(index, queries):
+    start = time.perf_counter()
+    found = sum(index.lookup(query) is not None for query in queries)
+    return found, (time.perf_counter() - start) / len(queries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--entries', type=int, default=100000, help='indexed messages (default: 100000)')
+    parser.add_argument('--lookups', type=int, default=2000, help='looked up messages per case (default: 2000)')
+    parser.add_argument('--threshold', type=float, default=0.9, help='minimum similarity (default: 0.9)')
+    parser.add_argument('--max-postings', type=int, default=None,
+                        help="index entries read by a lookup (default: FuzzyIndex's)")
+    options = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    message, messages = make_messages(options.entries, rng)
+    index = FuzzyIndex(options.threshold)
+    if options.max_postings:
+        index.max_postings = options.max_postings
+    start = time.perf_counter()
+    for text in messages:
+        index.add(text, text.upper())
+    print('indexed:             {} messages in {:.2f}s'.format(len(index), time.perf_counter() - start))
+
+    unrelated = [message() for _ in range(options.lookups)]
+    near = [edit(rng.choice(messages), rng) for _ in range(options.lookups)]
+    found, seconds = lookups(index, unrelated)
+    print('unrelated messages:  {:.3f} ms/lookup, {} found'.format(seconds * 1000, found))
+    found, seconds = lookups(index, near)
+    print('near-duplicates:     {:.3f} ms/lookup, {} found'.format(seconds * 1000, found))
+
+    index.max_postings = sys.maxsize
+    exhaustive, seconds = lookups(index, near)
+    print('exhaustive search:   {:.3f} ms/lookup, {} found'.format(seconds * 1000, exhaustive))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Measures the import time of the modules loaded by `manage.py translate_messages`,
+and lists the optional provider packages that get imported along.
+
+usage: python benchmarks/import_time.py [--repeat 5]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ('autotranslate.services', 'autotranslate.management.commands.translate_messages')
+OPTIONAL_PACKAGES = ('googletrans', 'googleapiclient', 'boto3', 'botocore')
+
+IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def measure(module):
+    """
+    Returns the cumulative import time of the module in microseconds, and the modules it imported.
+    """
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+        cwd=ROOT_DIR, env=dict(os.environ, PYTHONPATH=ROOT_DIR),
+        stderr=subprocess.PIPE, check=True, universal_newlines=True,
+    ).stderr
+
+    cumulative = 0
+    imported = set()
+    for line in output.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        imported.add(match.group(4))
+        if match.group(4) == module:
+            cumulative = int(match.group(2))
+    return cumulative, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=5, help='number of measurements per module (default: 5)')
+    options = parser.parse_args(argv)
+
+    for module in MODULES:
+        timings = []
+        for _ in range(options.repeat):
+            cumulative, imported = measure(module)
+            timings.append(cumulative)
+        optional = sorted(name for name in imported if name.split('.')[0] in OPTIONAL_PACKAGES)
+        print('{}: {:.1f}ms (best of {})'.format(module, min(timings) / 1000.0, options.repeat))
+        print('    optional packages imported: {}'.format(', '.join(optional) or 'none'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmarks the overhead of the runtime translator (`autotranslate.runtime`) on django's gettext.
+
+Reports the time per `gettext` call of django alone and through the runtime translator,
+for a message found in the message files, a message translated at runtime (in-process LRU hit)
+and a message missing from both (queued for translation), along with the peak memory allocated by a call.
+
+usage: python benchmarks/runtime.py --calls 200000
+"""
+import argparse
+import os
+import sys
+import threading
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def measure(func, calls):
+    """Return the seconds per call and the peak of the memory allocated by a call."""
+    func()
+    seconds = min(timeit.repeat(func, number=calls, repeat=3)) / calls
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for _ in range(1000):
+        func()
+    allocated = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return seconds, allocated
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--calls', type=int, default=100000, help='gettext calls per measure (default: 100000)')
+    parser.add_argument('--language', default='de', help='active language (default: de)')
+    options = parser.parse_args(argv)
+
+    settings.configure(
+        USE_I18N=True,
+        INSTALLED_APPS=['django.contrib.admin', 'django.contrib.auth', 'django.contrib.contenttypes',
+                        'autotranslate'],
+        AUTOTRANSLATE_TRANSLATOR_SERVICE='benchmarks.fake.FakeTranslatorService',
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    django.setup()
+
+    from django.utils import translation
+    from autotranslate.runtime import RuntimeTranslator, get_runtime_store
+
+    translation.activate(options.language)
+    message = 'Log in'
+    learned = 'A message translated at runtime'
+
+    cases = [('message files', lambda: translation.gettext(message))]
+    baseline = [measure(func, options.calls) for name, func in cases]
+
+    runtime = RuntimeTranslator(get_runtime_store(), queue_size=1)
+    runtime.install()
+    runtime.remember(translation.to_locale(options.language), {learned: learned.upper()})
+    # measure the lookups only: no background thread drains the queue, which stays full,
+    # so the missed messages are dropped instead of being translated
+    runtime._thread = threading.current_thread()
+    runtime.request('xx', 'filler')
+    cases += [('runtime LRU hit', lambda: translation.gettext(learned)),
+              ('runtime miss', lambda: translation.gettext('A message missing everywhere'))]
+
+    print('{:<20}{:>14}{:>16}'.format('gettext', 'ns/call', 'peak bytes'))
+    for (name, func), base in zip(cases[:1], baseline):
+        print('{:<20}{:>14.0f}{:>16.0f}   (django alone)'.format(name, base[0] * 1e9, base[1]))
+    for name, func in cases:
+        seconds, allocated = measure(func, options.calls)
+        print('{:<20}{:>14.0f}{:>16.0f}'.format(name, seconds * 1e9, allocated))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmarks the `translate_messages` command against an in-process fake translator service.
+
+Generates synthetic message files into a temporary directory and reports the throughput,
+the number of provider requests and how the time splits between parsing, translating and saving
+the message files. The peak memory is measured in a second run on fresh message files,
+tracemalloc slows down the code it traces.
+
+usage: python benchmarks/translate_messages.py --entries 5000 --locales 10 --latency 0.05 -- --jobs 4
+The arguments after `--` are passed on to the command.
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+WORDS = ('the', 'file', 'user', 'account', 'save', 'cancel', 'delete', 'message', 'order', 'invoice',
+         'product', 'city', 'country', 'address', 'password', 'email', 'login', 'logout', 'page', 'item')
+
+
+def make_catalog(path, entries, plurals, duplicates, seed):
+    import polib
+
+    rng = random.Random(seed)
+    po = polib.POFile()
+    po.metadata = {
+        'Content-Type': 'text/plain; charset=UTF-8',
+        'Plural-Forms': 'nplurals=2; plural=(n != 1);',
+    }
+    msgids = set()
+    while len(msgids) < entries:
+        if msgids and rng.random() < duplicates:
+            # shared by the other catalogs, generated from a fixed seed
+            msgid = 'Shared %(name)s message {}'.format(rng.randrange(entries))
+        else:
+            msgid = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 12))).capitalize()
+            msgid = '{} %s {}'.format(msgid, len(msgids)) if rng.random() < 0.3 else '{} {}'.format(msgid, len(msgids))
+        if msgid in msgids:
+            continue
+        msgids.add(msgid)
+        if rng.random() < plurals:
+            po.append(polib.POEntry(msgid=msgid, msgid_plural=msgid + 's', msgstr_plural={0: '', 1: ''}))
+        else:
+            po.append(polib.POEntry(msgid=msgid, msgstr=''))
+    po.save(path)
+
+
+def generate(directory, options):
+    for locale in range(options.locales):
+        locale_dir = os.path.join(directory, 'l{:03d}'.format(locale), 'LC_MESSAGES')
+        os.makedirs(locale_dir)
+        for domain in range(options.files):
+            name = 'django.po' if domain == 0 else 'django{}.po'.format(domain)
+            make_catalog(os.path.join(locale_dir, name), options.entries, options.plurals,
+                         options.duplicates, seed=domain)
+
+
+def run_command(directory, options, command_args):
+    """Generates the message files and runs the command on them."""
+    from autotranslate.management.commands.translate_messages import Command
+
+    for name in os.listdir(directory):
+        shutil.rmtree(os.path.join(directory, name))
+    generate(directory, options)
+    command = Command()
+    parser = command.create_parser('manage.py', 'translate_messages')
+    command.execute(**vars(parser.parse_args(command_args)))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command_args = []
+    if '--' in argv:
+        command_args = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--entries', type=int, default=1000, help='entries per message file (default: 1000)')
+    parser.add_argument('--locales', type=int, default=4, help='number of locales (default: 4)')
+    parser.add_argument('--files', type=int, default=1, help='message files per locale (default: 1)')
+    parser.add_argument('--plurals', type=float, default=0.1, help='ratio of plural entries (default: 0.1)')
+    parser.add_argument('--duplicates', type=float, default=0.3,
+                        help='ratio of entries shared by the message files of a locale (default: 0.3)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per request (default: 0)')
+    parser.add_argument('--latency-per-string', type=float, default=0.0,
+                        help='additional seconds per translated string (default: 0)')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='probability of a request failing with a retryable error (default: 0)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the run measuring the peak memory')
+    parser.add_argument('--keep', action='store_true', help='keep the generated message files')
+    options = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix='autotranslate-benchmark-')
+    settings.configure(
+        USE_I18N=True,
+        LOCALE_PATHS=[directory],
+        INSTALLED_APPS=['autotranslate'],
+        AUTOTRANSLATE_TRANSLATOR_SERVICE='benchmarks.fake.FakeTranslatorService',
+    )
+    django.setup()
+
+    from benchmarks.fake import FakeTranslatorService
+    FakeTranslatorService.latency = options.latency
+    FakeTranslatorService.latency_per_string = options.latency_per_string
+    FakeTranslatorService.error_rate = options.error_rate
+    FakeTranslatorService.reset()
+
+    try:
+        from autotranslate.metrics import metrics
+
+        start = time.perf_counter()
+        run_command(directory, options, command_args)
+        elapsed = time.perf_counter() - start
+        # the metrics are reset by every run of the command
+        histograms = {h['name']: h for h in metrics.as_dict()['histograms'] if not h['labels']}
+        requests, errors = FakeTranslatorService.requests, FakeTranslatorService.errors
+        strings, characters = FakeTranslatorService.strings, FakeTranslatorService.characters
+
+        peak_memory = None
+        if not options.no_memory:
+            tracemalloc.start()
+            run_command(directory, options, command_args)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        entries = options.entries * options.locales * options.files
+        print('message files:      {}'.format(options.locales * options.files))
+        print('entries:            {}'.format(entries))
+        print('wall time:          {:.3f}s'.format(elapsed))
+        print('entries/sec:        {:.1f}'.format(entries / elapsed))
+        print('strings translated: {} ({:.1f}/sec)'.format(strings, strings / elapsed))
+        print('characters:         {}'.format(characters))
+        print('provider requests:  {} ({} failed)'.format(requests, errors))
+        if peak_memory is not None:
+            print('peak memory:        {:.1f} MiB'.format(peak_memory / 1024.0 / 1024.0))
+        # with several workers (or --async tasks) the stages overlap, the times are summed over all of them
+        for stage in ('parse', 'select', 'translate', 'save'):
+            histogram = histograms.get('autotranslate_{}_seconds'.format(stage), {'sum': 0.0})
+            print('{:<20}{:.3f}s'.format(stage + ':', histogram['sum']))
+    finally:
+        if options.keep:
+            print('message files kept in {}'.format(directory))
+        else:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,7 @@ def get_requirements():
 setup(
     name='django-autotranslate',
     version='1.3.0',
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*', 'tests', 'tests.*']),
     install_requires=get_requirements(),
     include_package_data=True,
     license='MIT License',